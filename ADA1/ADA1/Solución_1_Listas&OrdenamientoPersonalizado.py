@@ -1,6 +1,17 @@
-import re
+import io
 import time
 
+from cache_vistas import CacheVistas, sumar_contadores
+from distribuciones import DistribucionJugadores
+from estadisticas import AcumuladorEstadisticas
+from indice_ranking import IndiceRanking, counting_sort
+from indices_secundarios import IndicesSecundarios
+from instrumentacion import contar, fase, registrar_metodo
+from instantanea import iterar_registros_en_cache
+from lector_datos import iterar_entidades, iterar_registros, reportar_error
+from paralelo import mapear_en_procesos, mezclar_rankings
+from reporte import crear_escritor, escribir_unidos, formatear_estadisticas_listas
+
 #Solución 1: Utilizando Listas y Ordenamiento Personalizado
 #En la primera solución, utilizaremos listas para almacenar
 #jugadores, equipos y sedes, y aplicaremos técnicas de ordenamiento 
@@ -10,75 +21,255 @@ import time
 #y ordenar datos de manera directa.
 
 class Jugador:
+    __slots__ = ("id", "nombre", "edad", "rendimiento", "equipos")
+
     def __init__(self, id, nombre, edad, rendimiento):
         self.id = id
         self.nombre = nombre
         self.edad = edad
         self.rendimiento = rendimiento
+        self.equipos = []
 
     def __repr__(self):
         return f"{self.nombre} ({self.id}), Edad: {self.edad}, Rendimiento: {self.rendimiento}"
 
 
+# Equipo y Sede mantienen sus totales al día en cada modificación, así que
+# consultar un promedio cuesta O(1) en lugar de recorrer a todos los jugadores.
+# Los órdenes y estadísticas se guardan en cache (ver cache_vistas.py) hasta
+# la siguiente modificación.
 class Equipo:
+    __slots__ = ("id", "deporte", "jugadores", "sedes", "suma_rendimiento", "cache", "histogramas")
+
     def __init__(self, id, deporte):
         self.id = id
         self.deporte = deporte
         self.jugadores = []
+        self.sedes = []
+        self.suma_rendimiento = 0
+        self.cache = CacheVistas()
+        # Distribución mantenida de los jugadores (ver distribucion_actual)
+        self.histogramas = None
 
     def agregar_jugador(self, jugador):
         self.jugadores.append(jugador)
+        jugador.equipos.append(self)
+        self.suma_rendimiento += jugador.rendimiento
+        self.notificar_sedes(jugador, 1)
+
+    def remover_jugador(self, jugador):
+        self.jugadores.remove(jugador)
+        jugador.equipos.remove(self)
+        self.suma_rendimiento -= jugador.rendimiento
+        self.notificar_sedes(jugador, -1)
+
+    # Cambia el rendimiento del jugador y corrige los totales de todos los
+    # equipos a los que pertenece, no solo los de este
+    def actualizar_rendimiento(self, jugador, rendimiento):
+        if self not in jugador.equipos:
+            raise ValueError(f"El jugador {jugador.id} no pertenece al equipo {self.id}")
+        anterior = (jugador.rendimiento, jugador.edad)
+        diferencia = rendimiento - jugador.rendimiento
+        jugador.rendimiento = rendimiento
+        for equipo in jugador.equipos:
+            equipo.suma_rendimiento += diferencia
+            equipo.notificar_sedes(jugador, 0, anterior)
+
+    # Con diferencia 0, anterior es el (rendimiento, edad) del jugador antes
+    # del cambio; sin él las distribuciones mantenidas se vuelven a armar
+    def notificar_sedes(self, jugador, diferencia_jugadores, anterior=None):
+        self.cache.invalidar()
+        if self.histogramas is not None and not self.histogramas.aplicar_cambio(jugador, diferencia_jugadores, anterior):
+            self.histogramas = None
+        for sede in self.sedes:
+            sede.equipo_modificado(self, jugador, diferencia_jugadores, anterior)
+
+    # Para cambios que no alteran los totales, como reordenar los jugadores
+    def invalidar_cache(self):
+        self.cache.invalidar()
+        for sede in self.sedes:
+            sede.invalidar_cache()
 
     def rendimiento_promedio(self):
         if not self.jugadores:
             return 0
-        total_rendimiento = sum(jugador.rendimiento for jugador in self.jugadores)
-        return total_rendimiento / len(self.jugadores)
+        return self.suma_rendimiento / len(self.jugadores)
+
+    # Jugadores ordenados por (rendimiento, -edad), sin modificar el equipo
+    def jugadores_ordenados(self):
+        return self.cache.obtener("jugadores", lambda: merge_sort(self.jugadores, key=lambda j: (j.rendimiento, -j.edad)))
+
+    # Histogramas de rendimiento y edad del equipo; se arman la primera vez
+    # que se piden y desde entonces se mantienen con cada aviso de notificar_sedes
+    def distribucion_actual(self):
+        if self.histogramas is None:
+            self.histogramas = DistribucionJugadores(self.jugadores)
+        return self.histogramas
+
+    # Copia de la distribución mantenida, que se puede modificar o combinar
+    def distribucion(self):
+        return self.distribucion_actual().copiar()
 
     def ordenar_jugadores(self):
-        self.jugadores = merge_sort(self.jugadores, key=lambda j: (j.rendimiento, -j.edad))
+        self.jugadores = list(self.jugadores_ordenados())
+        self.invalidar_cache()
 
     def __repr__(self):
         return f"{self.deporte}: {self.jugadores}"
 
 
 class Sede:
+    __slots__ = ("id", "nombre", "equipos", "asociaciones", "cantidad_jugadores", "promedios_por_deporte", "cache",
+                 "distribuciones")
+
+    # Deportes que forman el rendimiento de la sede
+    DEPORTES_RENDIMIENTO = ("Futbol", "Volleyball")
+
     def __init__(self, id, nombre):
         self.id = id
         self.nombre = nombre
         self.equipos = []
+        self.asociaciones = []
+        self.cantidad_jugadores = 0
+        # deporte -> [suma de los promedios de sus equipos, cantidad de equipos]
+        self.promedios_por_deporte = {}
+        self.cache = CacheVistas()
+        # (distribución por deporte, deporte de cada equipo); ver distribucion_actual
+        self.distribuciones = None
 
     def agregar_equipo(self, equipo):
         self.equipos.append(equipo)
+        equipo.sedes.append(self)
+        self.cantidad_jugadores += len(equipo.jugadores)
+        totales = self.promedios_por_deporte.setdefault(equipo.deporte, [0, 0])
+        totales[0] += equipo.rendimiento_promedio()
+        totales[1] += 1
+        self.notificar_asociaciones(equipo.jugadores, 1, equipo, True)
+
+    def remover_equipo(self, equipo):
+        self.equipos.remove(equipo)
+        equipo.sedes.remove(self)
+        self.cantidad_jugadores -= len(equipo.jugadores)
+        self.recalcular_deporte(equipo.deporte)
+        self.notificar_asociaciones(equipo.jugadores, -1, equipo, True)
+
+    def equipo_modificado(self, equipo, jugador, diferencia_jugadores, anterior=None):
+        self.cantidad_jugadores += diferencia_jugadores
+        self.recalcular_deporte(equipo.deporte)
+        self.actualizar_distribuciones(equipo, jugador, diferencia_jugadores, anterior)
+        self.notificar_asociaciones([jugador], diferencia_jugadores, equipo)
+
+    # diferencia es 1 (jugadores agregados), -1 (removidos) o 0 (rendimiento cambiado)
+    # Invalida también las cachés aunque la lista de jugadores esté vacía
+    # (un equipo sin jugadores igual cambia el rendimiento de la sede)
+    # equipo es el equipo de esos jugadores; con equipo_completo el cambio es
+    # del equipo mismo (entró o salió de la sede, o cambió su deporte con 0)
+    def notificar_asociaciones(self, jugadores, diferencia, equipo=None, equipo_completo=False):
+        self.invalidar_cache()
+        if equipo_completo:
+            self.distribuciones = None
+        for asociacion in self.asociaciones:
+            if equipo_completo:
+                asociacion.equipo_modificado(equipo, diferencia)
+            for jugador in jugadores:
+                asociacion.jugador_modificado(jugador, diferencia, equipo)
+
+    def invalidar_cache(self):
+        self.cache.invalidar()
+        for asociacion in self.asociaciones:
+            asociacion.cache.invalidar()
+
+    # La suma de promedios de un deporte se vuelve a sumar en el orden de los
+    # equipos (y no con restas) para que el resultado sea idéntico al de
+    # calcularla desde cero; solo se recorren los equipos de la sede
+    def recalcular_deporte(self, deporte):
+        promedios = [e.rendimiento_promedio() for e in self.equipos if e.deporte == deporte]
+        if promedios:
+            self.promedios_por_deporte[deporte] = [sum(promedios), len(promedios)]
+        else:
+            self.promedios_por_deporte.pop(deporte, None)
+
+    # Estadísticas parciales de la sede, combinables con AcumuladorEstadisticas.merge
+    # El acumulador guardado solo se combina dentro de otros, nunca se modifica
+    def acumular_estadisticas(self):
+        return self.cache.obtener("estadisticas", self.calcular_acumulador)
+
+    def calcular_acumulador(self):
+        acumulador = AcumuladorEstadisticas()
+        for equipo in self.equipos:
+            acumulador.agregar_equipo(equipo)
+            acumulador.agregar_jugadores(equipo.jugadores)
+        return acumulador
+
+    # Distribución de la sede (o solo de un deporte): se suman una vez las de
+    # sus equipos y desde entonces se mantienen con cada aviso de un jugador.
+    # Se vuelven a sumar si entra o sale un equipo o cambia su deporte; hasta
+    # ese aviso cada equipo cuenta con el deporte que tenía al sumarse.
+    def distribucion_actual(self, deporte=None):
+        if self.distribuciones is None:
+            self.distribuciones = self.acumular_distribuciones()
+        por_deporte, _ = self.distribuciones
+        if deporte not in por_deporte:
+            return DistribucionJugadores()
+        return por_deporte[deporte]
+
+    # Copia de la distribución mantenida, que se puede modificar o combinar
+    def distribucion(self, deporte=None):
+        return self.distribucion_actual(deporte).copiar()
+
+    # Distribución de toda la sede (clave None) y de cada deporte, y el
+    # deporte con el que se contó cada equipo
+    def acumular_distribuciones(self):
+        por_deporte = {None: DistribucionJugadores()}
+        deportes = {}
+        for equipo in self.equipos:
+            distribucion = equipo.distribucion_actual()
+            deportes[id(equipo)] = equipo.deporte
+            if equipo.deporte not in por_deporte:
+                por_deporte[equipo.deporte] = DistribucionJugadores()
+            por_deporte[None].merge(distribucion)
+            por_deporte[equipo.deporte].merge(distribucion)
+        return por_deporte, deportes
+
+    def actualizar_distribuciones(self, equipo, jugador, diferencia, anterior=None):
+        if self.distribuciones is None:
+            return
+        por_deporte, deportes = self.distribuciones
+        if id(equipo) not in deportes:
+            self.distribuciones = None
+            return
+        for deporte in (None, deportes[id(equipo)]):
+            if not por_deporte[deporte].aplicar_cambio(jugador, diferencia, anterior):
+                self.distribuciones = None
+                return
 
     def rendimiento_promedio(self):
         if not self.equipos:
             return 0
-        
-        rendimientos_futbol = []
-        rendimientos_volleyball = []
-        
-        for equipo in self.equipos:
-            if equipo.deporte == "Futbol":
-                rendimientos_futbol.append(equipo.rendimiento_promedio())
-            elif equipo.deporte == "Volleyball":
-                rendimientos_volleyball.append(equipo.rendimiento_promedio())
-        
-        rendimiento_futbol_promedio = sum(rendimientos_futbol) / len(rendimientos_futbol) if rendimientos_futbol else 0
-        rendimiento_volleyball_promedio = sum(rendimientos_volleyball) / len(rendimientos_volleyball) if rendimientos_volleyball else 0
-        
-        return rendimiento_futbol_promedio + rendimiento_volleyball_promedio
+
+        rendimiento = 0
+        for deporte in self.DEPORTES_RENDIMIENTO:
+            suma, cantidad = self.promedios_por_deporte.get(deporte, (0, 0))
+            rendimiento += suma / cantidad if cantidad else 0
+        return rendimiento
+
+    # Equipos ordenados en una lista nueva, sin modificar la sede
+    def equipos_ordenados(self):
+        return self.cache.obtener("equipos", lambda: merge_sort(self.equipos, key=lambda e: (e.rendimiento_promedio(), -len(e.jugadores))))
 
     def ordenar_equipos(self):
-        self.equipos = merge_sort(self.equipos, key=lambda e: (e.rendimiento_promedio(), -len(e.jugadores)))
+        self.equipos = list(self.equipos_ordenados())
+        self.invalidar_cache()
 
     def __repr__(self):
-        self.ordenar_equipos()
+        return "\n".join(self.lineas_resumen(self.equipos_ordenados()))
 
+    # Encabezado de la sede con su primer equipo de Volleyball y de Futbol
+    def lineas_resumen(self, equipos):
         resultados = [f"{self.nombre}, Rendimiento: {self.rendimiento_promedio()}"]
 
-        futbol_equipo = next((equipo for equipo in self.equipos if equipo.deporte == "Futbol"), None)
-        volleyball_equipo = next((equipo for equipo in self.equipos if equipo.deporte == "Volleyball"), None)
+        futbol_equipo = next((equipo for equipo in equipos if equipo.deporte == "Futbol"), None)
+        volleyball_equipo = next((equipo for equipo in equipos if equipo.deporte == "Volleyball"), None)
 
         if volleyball_equipo:
             resultados.append(f"Volleyball, Rendimiento: {volleyball_equipo.rendimiento_promedio()}")
@@ -88,169 +279,387 @@ class Sede:
             resultados.append(f"Futbol, Rendimiento: {futbol_equipo.rendimiento_promedio()}")
             resultados.append("{" + ', '.join(str(jugador.id) for jugador in futbol_equipo.jugadores) + "}")
 
-        return "\n".join(resultados)
+        return resultados
+
+    # Sección de la sede en el reporte de la asociación; los equipos se
+    # ordenan una sola vez para el encabezado y el detalle
+    def lineas_salida(self, equipos=None):
+        if equipos is None:
+            return self.cache.obtener("lineas", lambda: self.lineas_salida(self.equipos_ordenados()))
+        lineas = self.lineas_resumen(equipos)
+        for equipo in equipos:
+            lineas.append(f"{equipo.deporte}, Rendimiento: {equipo.rendimiento_promedio()}")
+            lineas.append("{" + ', '.join(str(jugador.id) for jugador in equipo.jugadores) + "}")
+        lineas.append("")
+        return lineas
+
+
+# Invocaciones contadas cuando la instrumentación está activa
+registrar_metodo(Equipo, "rendimiento_promedio", "equipo.rendimiento_promedio")
+registrar_metodo(Sede, "rendimiento_promedio", "sede.rendimiento_promedio")
 
 
 class Asociacion:
     def __init__(self):
         self.sedes = []
+        self.indice = None
+        self.indices = None
+        self.cache = CacheVistas()
 
     def agregar_sede(self, sede):
         self.sedes.append(sede)
+        sede.asociaciones.append(self)
+        self.cache.invalidar()
+        if self.indice is not None:
+            for equipo in sede.equipos:
+                for jugador in equipo.jugadores:
+                    self.indice.agregar(jugador)
+        if self.indices is not None:
+            for equipo in sede.equipos:
+                self.indices.agregar_equipo(equipo, equipo.jugadores)
+
+    # Índice de ranking persistente (posiciones, rangos y percentiles); se
+    # construye la primera vez que se pide y luego se mantiene con cada cambio
+    def indice_ranking(self):
+        if self.indice is None:
+            self.indice = IndiceRanking(jugador for sede in self.sedes for equipo in sede.equipos for jugador in equipo.jugadores)
+        return self.indice
+
+    # Índices por deporte, edad, nombre e id (indices_secundarios.py); igual
+    # que el de ranking, se construyen al pedirlos y luego se mantienen
+    def indices_secundarios(self):
+        if self.indices is None:
+            self.indices = IndicesSecundarios(self, ((equipo, equipo.jugadores) for sede in self.sedes for equipo in sede.equipos))
+        return self.indices
+
+    def equipo_modificado(self, equipo, diferencia):
+        if self.indices is not None:
+            self.indices.equipo_modificado(equipo, diferencia)
+
+    def jugador_modificado(self, jugador, diferencia, equipo=None):
+        if self.indices is not None:
+            self.indices.jugador_modificado(jugador, diferencia, equipo)
+        if self.indice is None:
+            return
+        if diferencia > 0:
+            self.indice.agregar(jugador)
+        elif diferencia < 0:
+            self.indice.remover(jugador)
+        else:
+            self.indice.actualizar(jugador)
+
+    # Sedes ordenadas en una lista nueva, sin modificar la asociación
+    def sedes_ordenadas(self):
+        return self.cache.obtener("sedes", lambda: merge_sort(self.sedes, key=lambda s: (s.rendimiento_promedio(), -s.cantidad_jugadores)))
 
     def ordenar_sedes(self):
-        self.sedes = merge_sort(self.sedes, key=lambda s: (s.rendimiento_promedio(), -sum(len(e.jugadores) for e in s.equipos)))
-
-    def ranking_jugadores(self):
-        todos_jugadores = [jugador for sede in self.sedes for equipo in sede.equipos for jugador in equipo.jugadores]
-        return merge_sort(todos_jugadores, key=lambda j: j.rendimiento)
-
-    def calcular_estadisticas(self):
-        todos_equipos = [equipo for sede in self.sedes for equipo in sede.equipos]
-        todos_jugadores = [jugador for sede in self.sedes for equipo in sede.equipos for jugador in equipo.jugadores]
-
-        equipo_mayor_rendimiento = max(todos_equipos, key=lambda e: e.rendimiento_promedio(), default=None)
-        equipo_menor_rendimiento = min(todos_equipos, key=lambda e: e.rendimiento_promedio(), default=None)
-        jugador_mayor_rendimiento = max(todos_jugadores, key=lambda j: j.rendimiento, default=None)
-        jugador_menor_rendimiento = min(todos_jugadores, key=lambda j: j.rendimiento, default=None)
-        jugador_mas_joven = min(todos_jugadores, key=lambda j: j.edad, default=None)
-        jugador_mas_veterano = max(todos_jugadores, key=lambda j: j.edad, default=None)
-        promedio_edad = sum(jugador.edad for jugador in todos_jugadores) / len(todos_jugadores)
-        promedio_rendimiento = sum(jugador.rendimiento for jugador in todos_jugadores) / len(todos_jugadores)
-
-        resultado = {
-            "equipo_mayor_rendimiento": equipo_mayor_rendimiento,
-            "equipo_menor_rendimiento": equipo_menor_rendimiento,
-            "jugador_mayor_rendimiento": jugador_mayor_rendimiento,
-            "jugador_menor_rendimiento": jugador_menor_rendimiento,
-            "jugador_mas_joven": jugador_mas_joven,
-            "jugador_mas_veterano": jugador_mas_veterano,
-            "promedio_edad": promedio_edad,
-            "promedio_rendimiento": promedio_rendimiento
-        }
+        self.sedes = list(self.sedes_ordenadas())
+        self.cache.invalidar()
+
+    # sedes permite recorrerlas en otro orden (por ejemplo el del reporte);
+    # solo se guarda en caché el recorrido de self.sedes
+    def ranking_jugadores(self, sedes=None):
+        if sedes is None:
+            return self.cache.obtener("ranking", lambda: self.ranking_jugadores(self.sedes))
+        todos_jugadores = [jugador for sede in sedes for equipo in sede.equipos for jugador in equipo.jugadores]
+        # El rendimiento es un entero acotado: counting sort en O(n + rango),
+        # con Merge Sort como respaldo si hay valores fuera del dominio
+        try:
+            return counting_sort(todos_jugadores)
+        except ValueError:
+            return merge_sort(todos_jugadores, key=lambda j: j.rendimiento)
+
+    # Un solo recorrido: cada sede acumula sus estadísticas parciales y se
+    # combinan en orden, con el mismo resultado que los max/min por separado
+    def acumular_estadisticas(self, sedes=None):
+        acumulador = AcumuladorEstadisticas()
+        for sede in self.sedes if sedes is None else sedes:
+            acumulador.merge(sede.acumular_estadisticas())
+        return acumulador
+
+    def calcular_estadisticas(self, sedes=None):
+        if sedes is None:
+            return self.cache.obtener("estadisticas", lambda: self.acumular_estadisticas().resultado())
+        return self.acumular_estadisticas(sedes).resultado()
+
+    # Las distribuciones de las sedes se suman igual que sus acumuladores
+    def acumular_distribuciones(self, deporte=None):
+        distribucion = DistribucionJugadores()
+        for sede in self.sedes:
+            distribucion.merge(sede.distribucion_actual(deporte))
+        return distribucion
 
-        return resultado
+    def distribucion(self, deporte=None):
+        return self.cache.obtener(("distribucion", deporte), lambda: self.acumular_distribuciones(deporte))
 
-    def __repr__(self):
-        self.ordenar_sedes()
-        ranking = self.ranking_jugadores()
-        estadisticas = self.calcular_estadisticas()
+    # Ranking y estadísticas en el orden de sedes del reporte
+    def ranking_reporte(self):
+        return self.cache.obtener("ranking_reporte", lambda: self.ranking_jugadores(self.sedes_ordenadas()))
 
-        resultados = []
-        
-        for sede in self.sedes:
-            resultados.append(str(sede))
-            for equipo in sede.equipos:
-                resultados.append(f"{equipo.deporte}, Rendimiento: {equipo.rendimiento_promedio()}")
-                resultados.append("{" + ', '.join(str(jugador.id) for jugador in equipo.jugadores) + "}")
-
-            resultados.append("")
-
-        resultados.append("Ranking Jugadores:")
-        resultados.append(", ".join(str(jugador.id) for jugador in ranking))
-        resultados.append("")
-        resultados.append(f"Equipo con mayor rendimiento: {estadisticas['equipo_mayor_rendimiento'].deporte} {sede.nombre}")
-        resultados.append(f"Equipo con menor rendimiento: {estadisticas['equipo_menor_rendimiento'].deporte} {sede.nombre}")
-        resultados.append(f"Jugador con mayor rendimiento: {{{estadisticas['jugador_mayor_rendimiento'].id} , {estadisticas['jugador_mayor_rendimiento'].nombre} , {estadisticas['jugador_mayor_rendimiento'].rendimiento}}} {estadisticas['jugador_mayor_rendimiento']}")
-        resultados.append(f"Jugador con menor rendimiento: {{{estadisticas['jugador_menor_rendimiento'].id} , {estadisticas['jugador_menor_rendimiento'].nombre} , {estadisticas['jugador_menor_rendimiento'].rendimiento}}}")
-        resultados.append(f"Jugador más joven: {{{estadisticas['jugador_mas_joven'].id} , {estadisticas['jugador_mas_joven'].nombre} , {estadisticas['jugador_mas_joven'].edad}}}")
-        resultados.append(f"Jugador más veterano: {{{estadisticas['jugador_mas_veterano'].id} , {estadisticas['jugador_mas_veterano'].nombre} , {estadisticas['jugador_mas_veterano'].edad}}}")
-        resultados.append(f"Promedio de edad de los jugadores: {estadisticas['promedio_edad']}")
-        resultados.append(f"Promedio de rendimiento de los jugadores: {estadisticas['promedio_rendimiento']}")
-
-        return "\n".join(resultados)
-
-
-def merge_sort(arr, key=lambda x: x):
-    if len(arr) <= 1:
-        return arr
-    mid = len(arr) // 2
-    left = merge_sort(arr[:mid], key=key)
-    right = merge_sort(arr[mid:], key=key)
-    return merge(left, right, key)
-
-
-def merge(left, right, key):
-    sorted_list = []
-    while left and right:
-        if key(left[0]) < key(right[0]):
-            sorted_list.append(left.pop(0))
+    def estadisticas_reporte(self):
+        return self.cache.obtener("estadisticas_reporte", lambda: self.calcular_estadisticas(self.sedes_ordenadas()))
+
+    # Aciertos y fallos de las cachés de la asociación, sus sedes y sus equipos
+    def contadores_cache(self):
+        return {
+            "asociacion": self.cache.contadores(),
+            "sedes": sumar_contadores(self.sedes),
+            "equipos": sumar_contadores(equipo for sede in self.sedes for equipo in sede.equipos),
+        }
+
+    def __repr__(self):
+        return self.generar_salida()
+
+    def generar_salida(self, workers=None):
+        salida = io.StringIO()
+        self.escribir_salida(salida, workers=workers)
+        return salida.getvalue()
+
+    # Escribe el reporte en file (cualquier objeto con write) a medida que se
+    # genera, sin armar el texto completo. Las sedes y los equipos de cada sede
+    # se ordenan una sola vez y la asociación no se modifica.
+    # formato "jsonl" o "csv" escribe los mismos datos como registros (ver
+    # reporte.py). Con workers > 1 las sedes del texto se evalúan en un pool de
+    # procesos; el resultado es idéntico al de la versión secuencial.
+    # Con la instrumentación activa cada parte se mide en su fase (ver instrumentacion.py)
+    def escribir_salida(self, file, formato="texto", workers=None):
+        with fase("sort"):
+            sedes = self.sedes_ordenadas()
+            for sede in sedes:
+                sede.equipos_ordenados()
+
+        if formato != "texto":
+            escritor = crear_escritor(formato, file)
+            with fase("sort"):
+                ranking = self.ranking_reporte()
+            with fase("stats"):
+                estadisticas = self.estadisticas_reporte()
+            with fase("render"):
+                secciones = ((sede, [(equipo, equipo.jugadores) for equipo in sede.equipos_ordenados()]) for sede in sedes)
+                escritor.escribir_reporte(secciones, ranking, estadisticas)
+            return
+
+        if workers is not None and workers > 1 and len(sedes) > 1:
+            with fase("paralelo"):
+                secciones, ranking, estadisticas = self.evaluar_en_paralelo(workers, sedes)
+        else:
+            with fase("sort"):
+                ranking = self.ranking_reporte()
+            with fase("stats"):
+                estadisticas = self.estadisticas_reporte()
+            secciones = (sede.lineas_salida() for sede in sedes)
+
+        with fase("render"):
+            self.escribir_texto(file, secciones, ranking, estadisticas, sedes[-1])
+
+    def escribir_texto(self, file, secciones, ranking, estadisticas, sede):
+        for seccion in secciones:
+            for linea in seccion:
+                file.write(linea)
+                file.write("\n")
+
+        file.write("Ranking Jugadores:\n")
+        escribir_unidos(file, (str(jugador.id) for jugador in ranking))
+        file.write("\n\n")
+
+        file.write(formatear_estadisticas_listas(estadisticas, sede.nombre))
+
+    def evaluar_en_paralelo(self, workers, sedes=None):
+        if sedes is None:
+            sedes = self.sedes
+        parciales = mapear_en_procesos(evaluar_sedes, sedes, workers, exportar_sede, importar_sede)
+
+        jugadores = {j.id: j for sede in sedes for e in sede.equipos for j in e.jugadores}
+        equipos = {e.id: e for sede in sedes for e in sede.equipos}
+
+        secciones = []
+        acumulador = AcumuladorEstadisticas()
+        for secciones_lote, _, parcial in parciales:
+            secciones.extend(secciones_lote)
+            acumulador.merge(parcial.transformar(jugadores.__getitem__, equipos.__getitem__))
+        ranking = [jugadores[id] for id in mezclar_rankings([ranking for _, ranking, _ in parciales])]
+
+        return secciones, ranking, acumulador.resultado()
+
+
+# Datos planos de una sede (tuplas de ids, nombres y números) para enviarla a
+# otro proceso sin arrastrar todo el grafo de objetos enlazados, cuando el
+# proceso hijo no puede heredarla con "fork"
+def exportar_sede(sede):
+    return (sede.id, sede.nombre, [
+        (equipo.id, equipo.deporte, [(j.id, j.nombre, j.edad, j.rendimiento) for j in equipo.jugadores])
+        for equipo in sede.equipos
+    ])
+
+
+def importar_sede(datos):
+    id, nombre, equipos = datos
+    return crear_sede(id, nombre, [
+        crear_equipo(equipo_id, deporte, [Jugador(*jugador) for jugador in jugadores])
+        for equipo_id, deporte, jugadores in equipos
+    ])
+
+
+# Trabajo de cada proceso sobre sedes ya ordenadas: sus secciones del reporte,
+# su ranking parcial como [(rendimiento, id)] y sus estadísticas parciales con ids
+def evaluar_sedes(sedes):
+    asociacion = Asociacion()
+    for sede in sedes:
+        asociacion.agregar_sede(sede)
+    ranking = [(jugador.rendimiento, jugador.id) for jugador in asociacion.ranking_jugadores()]
+    estadisticas = asociacion.acumular_estadisticas().transformar(lambda j: j.id, lambda e: e.id)
+    secciones = [sede.lineas_salida() for sede in asociacion.sedes]
+    return secciones, ranking, estadisticas
+
+
+# Tamaño de los tramos que se ordenan por inserción antes de empezar a mezclar
+TAMANO_TRAMO = 32
+
+
+# Merge Sort estable de abajo hacia arriba (sin recursión).
+# La clave de cada elemento se calcula una sola vez y las mezclas se hacen
+# por índices entre dos buffers, sin pop(0), así que el costo es O(n log n).
+# Con reverse=True el orden es descendente y los empates conservan el orden
+# original, igual que sorted(..., reverse=True).
+def merge_sort(arr, key=lambda x: x, reverse=False):
+    elementos = list(arr)
+    n = len(elementos)
+    if n <= 1:
+        return elementos
+
+    claves = [key(elemento) for elemento in elementos]
+    orden = list(range(n))
+    # Las comparaciones se suman por tramo y por mezcla, no una a una
+    comparaciones = 0
+
+    for inicio in range(0, n, TAMANO_TRAMO):
+        comparaciones += insertion_sort(orden, claves, inicio, min(inicio + TAMANO_TRAMO, n), reverse)
+
+    auxiliar = [0] * n
+    ancho = TAMANO_TRAMO
+    while ancho < n:
+        for inicio in range(0, n, 2 * ancho):
+            medio = min(inicio + ancho, n)
+            fin = min(inicio + 2 * ancho, n)
+            comparaciones += merge(orden, auxiliar, claves, inicio, medio, fin, reverse)
+        orden, auxiliar = auxiliar, orden
+        ancho *= 2
+
+    contar("merge_sort.llamadas_clave", n)
+    contar("merge_sort.comparaciones", comparaciones)
+    return [elementos[i] for i in orden]
+
+
+# Ordena por inserción los índices orden[inicio:fin] según sus claves y
+# devuelve la cantidad de comparaciones: una por desplazamiento más la que
+# detiene el ciclo, si no llegó al inicio del tramo
+def insertion_sort(orden, claves, inicio, fin, reverse=False):
+    comparaciones = 0
+    for i in range(inicio + 1, fin):
+        indice = orden[i]
+        clave = claves[indice]
+        j = i - 1
+        while j >= inicio and (claves[orden[j]] < clave if reverse else clave < claves[orden[j]]):
+            orden[j + 1] = orden[j]
+            j -= 1
+        orden[j + 1] = indice
+        comparaciones += i - j if j >= inicio else i - inicio
+    return comparaciones
+
+
+# Mezcla los tramos ordenados origen[inicio:medio] y origen[medio:fin] en destino.
+# Solo se toma primero el elemento de la derecha si es estrictamente menor
+# (o mayor con reverse), lo que mantiene la estabilidad. Devuelve la cantidad
+# de comparaciones, una por elemento tomado mientras ambos tramos tienen datos.
+def merge(origen, destino, claves, inicio, medio, fin, reverse=False):
+    i, j, k = inicio, medio, inicio
+    while i < medio and j < fin:
+        clave_izquierda = claves[origen[i]]
+        clave_derecha = claves[origen[j]]
+        if clave_izquierda < clave_derecha if reverse else clave_derecha < clave_izquierda:
+            destino[k] = origen[j]
+            j += 1
         else:
-            sorted_list.append(right.pop(0))
-    sorted_list.extend(left if left else right)
-    return sorted_list
+            destino[k] = origen[i]
+            i += 1
+        k += 1
+    if i < medio:
+        destino[k:fin] = origen[i:medio]
+    else:
+        destino[k:fin] = origen[j:fin]
+    return k - inicio
+
+
+# Fábricas usadas por el lector para construir equipos y sedes
+def crear_equipo(id, deporte, jugadores):
+    equipo = Equipo(id, deporte)
+    for jugador in jugadores:
+        equipo.agregar_jugador(jugador)
+    return equipo
+
+
+def crear_sede(id, nombre, equipos):
+    sede = Sede(id, nombre)
+    for equipo in equipos:
+        sede.agregar_equipo(equipo)
+    return sede
+
+
+# Generador de las entidades del archivo ("j" | "e" | "s", id, objeto), sin
+# cargar el archivo completo en memoria. Con usar_cache los registros salen
+# de la instantánea binaria del archivo (input.txt.snap) si está vigente.
+def iterar_datos(filepath, al_error=reportar_error, usar_cache=False):
+    leer_registros = iterar_registros_en_cache if usar_cache else iterar_registros
+    return iterar_entidades(filepath, Jugador, crear_equipo, crear_sede, al_error, leer_registros)
 
 
 # Función para leer los datos desde el archivo
-def leer_datos(filepath):
+def leer_datos(filepath, al_error=reportar_error, usar_cache=False):
     jugadores = {}
     equipos = {}
     sedes = {}
+    destinos = {'j': jugadores, 'e': equipos, 's': sedes}
 
-    with open(filepath, 'r') as file:
-        lines = file.readlines()
-
-    jugador_regex = r'j(\d+) = Jugador.Jugador\("([^"]+)", (\d+), (\d+)\)'
-    equipo_regex = r'e(\d+) = Equipo.Equipo\("([^"]+)", \[(.*?)\]\)'
-    sede_regex = r's(\d+) = Sede.Sede\("([^"]+)", \[(.*?)\]\)'
-
-    for line in lines:
-        line = line.strip()
-        if line.startswith('j'):
-            match = re.match(jugador_regex, line)
-            if match:
-                id = int(match.group(1))
-                nombre = match.group(2)
-                edad = int(match.group(3))
-                rendimiento = int(match.group(4))
-                jugadores[id] = Jugador(id, nombre, edad, rendimiento)
-
-        elif line.startswith('e'):
-            match = re.match(equipo_regex, line)
-            if match:
-                id = int(match.group(1))
-                deporte = match.group(2)
-                jugadores_ids = match.group(3).split(', ')
-                equipo = Equipo(id, deporte)
-                for j_id in jugadores_ids:
-                    j_id = int(j_id[1:])  # Eliminar la 'j' y convertir a entero
-                    equipo.agregar_jugador(jugadores[j_id])
-                equipos[id] = equipo
-
-        elif line.startswith('s'):
-            match = re.match(sede_regex, line)
-            if match:
-                id = int(match.group(1))
-                nombre = match.group(2)
-                equipos_ids = match.group(3).split(', ')
-                sede = Sede(id, nombre)
-                for e_id in equipos_ids:
-                    e_id = int(e_id[1:])  # Eliminar la 'e' y convertir a entero
-                    sede.agregar_equipo(equipos[e_id])
-                sedes[id] = sede
+    for tipo, id, entidad in iterar_datos(filepath, al_error, usar_cache):
+        destinos[tipo][id] = entidad
 
     return jugadores, equipos, sedes
 
 
 # Función para medir el tiempo de ejecución de la solución 1
-def medir_tiempo_solucion_1(filepath):
-    inicio = time.time()
+# Reporte completo de un archivo, sin imprimir nada; lo usan
+# medir_tiempo_solucion_1 y el procesamiento por lotes (lote.py)
+def generar_reporte(filepath, workers=None, al_error=reportar_error, usar_cache=False):
+    salida = io.StringIO()
+    escribir_reporte(filepath, salida, workers=workers, al_error=al_error, usar_cache=usar_cache)
+    return salida.getvalue()
 
-    jugadores, equipos, sedes = leer_datos(filepath)
-    asociacion = Asociacion()
-    for sede in sedes.values():
-        asociacion.agregar_sede(sede)
 
-    resultado = str(asociacion)
+# Igual que generar_reporte pero escribiendo en file a medida que se genera
+def escribir_reporte(filepath, file, formato="texto", workers=None, al_error=reportar_error, usar_cache=False):
+    with fase("parse"):
+        jugadores, equipos, sedes = leer_datos(filepath, al_error, usar_cache)
+        asociacion = Asociacion()
+        for sede in sedes.values():
+            asociacion.agregar_sede(sede)
+
+    asociacion.escribir_salida(file, formato, workers)
+
+
+def medir_tiempo_solucion_1(filepath, workers=None):
+    inicio = time.perf_counter_ns()
+
+    resultado = generar_reporte(filepath, workers)
 
-    fin = time.time()
-    tiempo_total = fin - inicio
+    fin = time.perf_counter_ns()
+    tiempo_total = (fin - inicio) / 1e9
     print("La función de la solución 1 se ejecutó en", tiempo_total, "segundos")
     return resultado
 
 
 # Ejemplo de uso
-filepath = "input1.txt"
-resultado = medir_tiempo_solucion_1(filepath)
+if __name__ == "__main__":
+    filepath = "input1.txt"
+    resultado = medir_tiempo_solucion_1(filepath)
 
-print(resultado)
+    print(resultado)
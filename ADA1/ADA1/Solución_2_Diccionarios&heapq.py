@@ -1,7 +1,18 @@
 import heapq
-import re
+import io
 import time
 
+from cache_vistas import CacheVistas, sumar_contadores
+from distribuciones import DistribucionJugadores
+from estadisticas import AcumuladorEstadisticas
+from indice_ranking import IndiceRanking, NumeracionOrden, counting_sort
+from indices_secundarios import IndicesSecundarios
+from instrumentacion import clave_contada, contar, fase, registrar_metodo
+from instantanea import iterar_registros_en_cache
+from lector_datos import iterar_entidades, iterar_registros, reportar_error
+from paralelo import mapear_en_procesos, mezclar_rankings
+from reporte import crear_escritor, escribir_unidos, formatear_estadisticas
+
 #Solución 2: Utilizando Diccionarios y Módulo heapq para Priorización
 #La segunda solución utilizará diccionarios para almacenar la información 
 #de manera estructurada, y utilizaremos el módulo heapq para eficientar 
@@ -11,209 +22,631 @@ import time
 
 
 class Jugador:
+    __slots__ = ("id", "nombre", "edad", "rendimiento", "equipos")
+
     def __init__(self, id, nombre, edad, rendimiento):
         self.id = id
         self.nombre = nombre
         self.edad = edad
         self.rendimiento = rendimiento
+        self.equipos = []
 
     def __repr__(self):
         return f"Jugador(id={self.id}, nombre='{self.nombre}', edad={self.edad}, rendimiento={self.rendimiento})"
 
 
+# Equipo y Sede guardan sus totales y los actualizan en cada modificación,
+# de modo que los promedios se consultan en O(1). Los órdenes y estadísticas
+# se guardan en cache (ver cache_vistas.py) hasta la siguiente modificación.
 class Equipo:
+    __slots__ = ("id", "deporte", "jugadores", "sedes", "suma_rendimiento", "cache", "numeros", "histogramas")
+
     def __init__(self, id, deporte):
         self.id = id
         self.deporte = deporte
         self.jugadores = {}
-
+        self.sedes = []
+        self.suma_rendimiento = 0
+        self.cache = CacheVistas()
+        # Numeración de los jugadores (ver numeracion); None hasta que se pide
+        self.numeros = None
+        # Distribución mantenida de los jugadores (ver distribucion_actual)
+        self.histogramas = None
+
+    # Un id repetido reemplaza al jugador anterior en su misma posición, como
+    # la asignación al diccionario; el mismo jugador otra vez no cambia nada
     def agregar_jugador(self, jugador):
+        anterior = self.jugadores.get(jugador.id)
+        if anterior is jugador:
+            return
         self.jugadores[jugador.id] = jugador
+        if self.numeros is not None:
+            self.numeros.agregar(jugador.id)
+        jugador.equipos.append(self)
+        self.suma_rendimiento += jugador.rendimiento
+        if anterior is not None:
+            anterior.equipos.remove(self)
+            self.suma_rendimiento -= anterior.rendimiento
+            self.notificar_sedes(anterior, -1)
+        self.notificar_sedes(jugador, 1)
+
+    def remover_jugador(self, jugador):
+        del self.jugadores[jugador.id]
+        if self.numeros is not None:
+            self.numeros.quitar(jugador.id)
+        jugador.equipos.remove(self)
+        self.suma_rendimiento -= jugador.rendimiento
+        self.notificar_sedes(jugador, -1)
+
+    # Cambia el rendimiento del jugador y corrige los totales de todos los
+    # equipos a los que pertenece
+    def actualizar_rendimiento(self, jugador, rendimiento):
+        if self.jugadores.get(jugador.id) is not jugador:
+            raise ValueError(f"El jugador {jugador.id} no pertenece al equipo {self.id}")
+        anterior = (jugador.rendimiento, jugador.edad)
+        diferencia = rendimiento - jugador.rendimiento
+        jugador.rendimiento = rendimiento
+        for equipo in jugador.equipos:
+            equipo.suma_rendimiento += diferencia
+            equipo.notificar_sedes(jugador, 0, anterior)
+
+    # Con diferencia 0, anterior es el (rendimiento, edad) del jugador antes
+    # del cambio; sin él las distribuciones mantenidas se vuelven a armar
+    def notificar_sedes(self, jugador, diferencia_jugadores, anterior=None):
+        self.cache.invalidar()
+        if self.histogramas is not None and not self.histogramas.aplicar_cambio(jugador, diferencia_jugadores, anterior):
+            self.histogramas = None
+        for sede in self.sedes:
+            sede.equipo_modificado(self, jugador, diferencia_jugadores, anterior)
+
+    # Números de orden de los jugadores en self.jugadores; se arma con el
+    # primer índice que lo pide y desde entonces se mantiene con cada cambio
+    def numeracion(self):
+        if self.numeros is None:
+            self.numeros = NumeracionOrden(self.jugadores)
+        return self.numeros
 
     def rendimiento_promedio(self):
         if not self.jugadores:
             return 0
-        return sum(j.rendimiento for j in self.jugadores.values()) / len(self.jugadores)
+        return self.suma_rendimiento / len(self.jugadores)
+
+    # Jugadores de mayor a menor (rendimiento, -edad); con k solo los k primeros
+    def ordenar_jugadores(self, k=None, orden="desc"):
+        return self.cache.obtener(("jugadores", orden), lambda: seleccionar(
+            self.jugadores.values(), lambda j: (j.rendimiento, -j.edad), k, orden), k)
 
-    def ordenar_jugadores(self):
-        return heapq.nlargest(len(self.jugadores), self.jugadores.values(), key=lambda j: (j.rendimiento, -j.edad))
+    # Orden de los jugadores en el reporte: solo por rendimiento, de mayor a menor
+    def jugadores_por_rendimiento(self):
+        return self.cache.obtener("por_rendimiento", lambda: sorted(
+            self.jugadores.values(), key=clave_contada(lambda j: j.rendimiento, "sorted"), reverse=True))
+
+    # Histogramas de rendimiento y edad del equipo; se arman la primera vez
+    # que se piden y desde entonces se mantienen con cada aviso de notificar_sedes
+    def distribucion_actual(self):
+        if self.histogramas is None:
+            self.histogramas = DistribucionJugadores(self.jugadores.values())
+        return self.histogramas
+
+    # Copia de la distribución mantenida, que se puede modificar o combinar
+    def distribucion(self):
+        return self.distribucion_actual().copiar()
 
     def __repr__(self):
         return f"Equipo(deporte='{self.deporte}', jugadores={self.ordenar_jugadores()})"
 
 
 class Sede:
+    __slots__ = ("id", "nombre", "equipos", "asociaciones", "cantidad_jugadores", "suma_promedios", "cache", "numeros",
+                 "distribuciones")
+
     def __init__(self, id, nombre):
         self.id = id
         self.nombre = nombre
         self.equipos = {}
-
+        self.asociaciones = []
+        self.cantidad_jugadores = 0
+        self.suma_promedios = 0
+        self.cache = CacheVistas()
+        self.numeros = None
+        # (distribución por deporte, deporte de cada equipo); ver distribucion_actual
+        self.distribuciones = None
+
+    # Igual que Equipo.agregar_jugador: un id repetido se reemplaza en su lugar
     def agregar_equipo(self, equipo):
+        anterior = self.equipos.get(equipo.id)
+        if anterior is equipo:
+            return
         self.equipos[equipo.id] = equipo
+        if self.numeros is not None:
+            self.numeros.agregar(equipo.id)
+        equipo.sedes.append(self)
+        self.cantidad_jugadores += len(equipo.jugadores)
+        if anterior is None:
+            self.suma_promedios += equipo.rendimiento_promedio()
+        else:
+            anterior.sedes.remove(self)
+            self.cantidad_jugadores -= len(anterior.jugadores)
+            self.recalcular_suma()
+            self.notificar_asociaciones(anterior.jugadores.values(), -1, anterior, True)
+        self.notificar_asociaciones(equipo.jugadores.values(), 1, equipo, True)
+
+    def remover_equipo(self, equipo):
+        del self.equipos[equipo.id]
+        if self.numeros is not None:
+            self.numeros.quitar(equipo.id)
+        equipo.sedes.remove(self)
+        self.cantidad_jugadores -= len(equipo.jugadores)
+        self.recalcular_suma()
+        self.notificar_asociaciones(equipo.jugadores.values(), -1, equipo, True)
+
+    def equipo_modificado(self, equipo, jugador, diferencia_jugadores, anterior=None):
+        self.cantidad_jugadores += diferencia_jugadores
+        self.recalcular_suma()
+        self.actualizar_distribuciones(equipo, jugador, diferencia_jugadores, anterior)
+        self.notificar_asociaciones([jugador], diferencia_jugadores, equipo)
+
+    # diferencia es 1 (jugadores agregados), -1 (removidos) o 0 (rendimiento cambiado)
+    # Invalida también las cachés aunque la lista de jugadores esté vacía
+    # equipo es el equipo de esos jugadores; con equipo_completo el cambio es
+    # del equipo mismo (entró o salió de la sede, o cambió su deporte con 0)
+    def notificar_asociaciones(self, jugadores, diferencia, equipo=None, equipo_completo=False):
+        self.cache.invalidar()
+        if equipo_completo:
+            self.distribuciones = None
+        for asociacion in self.asociaciones:
+            asociacion.cache.invalidar()
+        for asociacion in self.asociaciones:
+            if equipo_completo:
+                asociacion.equipo_modificado(equipo, diferencia)
+            for jugador in jugadores:
+                asociacion.jugador_modificado(jugador, diferencia, equipo, self)
+
+    # Se vuelve a sumar en el orden de los equipos (y no con restas) para que
+    # el resultado sea idéntico al de calcularlo desde cero
+    def recalcular_suma(self):
+        self.suma_promedios = sum(e.rendimiento_promedio() for e in self.equipos.values())
+
+    # Igual que Equipo.numeracion, para los equipos de la sede
+    def numeracion(self):
+        if self.numeros is None:
+            self.numeros = NumeracionOrden(self.equipos)
+        return self.numeros
+
+    # Estadísticas parciales de la sede, combinables con AcumuladorEstadisticas.merge
+    # El acumulador guardado solo se combina dentro de otros, nunca se modifica
+    def acumular_estadisticas(self):
+        return self.cache.obtener("estadisticas", self.calcular_acumulador)
+
+    def calcular_acumulador(self):
+        acumulador = AcumuladorEstadisticas()
+        for equipo in self.equipos.values():
+            acumulador.agregar_equipo(equipo)
+            acumulador.agregar_jugadores(equipo.jugadores.values())
+        return acumulador
+
+    # Distribución de la sede (o solo de un deporte): se suman una vez las de
+    # sus equipos y desde entonces se mantienen con cada aviso de un jugador.
+    # Se vuelven a sumar si entra o sale un equipo o cambia su deporte; hasta
+    # ese aviso cada equipo cuenta con el deporte que tenía al sumarse.
+    def distribucion_actual(self, deporte=None):
+        if self.distribuciones is None:
+            self.distribuciones = self.acumular_distribuciones()
+        por_deporte, _ = self.distribuciones
+        if deporte not in por_deporte:
+            return DistribucionJugadores()
+        return por_deporte[deporte]
+
+    # Copia de la distribución mantenida, que se puede modificar o combinar
+    def distribucion(self, deporte=None):
+        return self.distribucion_actual(deporte).copiar()
+
+    # Distribución de toda la sede (clave None) y de cada deporte, y el
+    # deporte con el que se contó cada equipo
+    def acumular_distribuciones(self):
+        por_deporte = {None: DistribucionJugadores()}
+        deportes = {}
+        for equipo in self.equipos.values():
+            distribucion = equipo.distribucion_actual()
+            deportes[id(equipo)] = equipo.deporte
+            if equipo.deporte not in por_deporte:
+                por_deporte[equipo.deporte] = DistribucionJugadores()
+            por_deporte[None].merge(distribucion)
+            por_deporte[equipo.deporte].merge(distribucion)
+        return por_deporte, deportes
+
+    def actualizar_distribuciones(self, equipo, jugador, diferencia, anterior=None):
+        if self.distribuciones is None:
+            return
+        por_deporte, deportes = self.distribuciones
+        if id(equipo) not in deportes:
+            self.distribuciones = None
+            return
+        for deporte in (None, deportes[id(equipo)]):
+            if not por_deporte[deporte].aplicar_cambio(jugador, diferencia, anterior):
+                self.distribuciones = None
+                return
 
     def rendimiento_promedio(self):
         if not self.equipos:
             return 0
-        return sum(e.rendimiento_promedio() for e in self.equipos.values())
+        return self.suma_promedios
 
-    def ordenar_equipos(self):
-        return heapq.nlargest(len(self.equipos), self.equipos.values(), key=lambda e: (e.rendimiento_promedio(), -len(e.jugadores)))
+    def ordenar_equipos(self, k=None, orden="desc"):
+        return self.cache.obtener(("equipos", orden), lambda: seleccionar(
+            self.equipos.values(), lambda e: (e.rendimiento_promedio(), -len(e.jugadores)), k, orden), k)
 
     def __repr__(self):
         return f"Sede(nombre='{self.nombre}', equipos={self.ordenar_equipos()})"
 
 
+# Invocaciones contadas cuando la instrumentación está activa
+registrar_metodo(Equipo, "rendimiento_promedio", "equipo.rendimiento_promedio")
+registrar_metodo(Sede, "rendimiento_promedio", "sede.rendimiento_promedio")
+
+
 class Asociacion:
     def __init__(self):
         self.sedes = {}
+        self.indice = None
+        self.indices = None
+        self.numeros = None
+        self.cache = CacheVistas()
 
     def agregar_sede(self, sede):
         self.sedes[sede.id] = sede
+        if self.numeros is not None:
+            self.numeros.agregar(sede.id)
+        sede.asociaciones.append(self)
+        self.cache.invalidar()
+        if self.indice is not None:
+            for equipo in sede.equipos.values():
+                for jugador in equipo.jugadores.values():
+                    self.indice.agregar(jugador, self.clave_recorrido(sede, equipo, jugador), (id(sede), id(equipo)))
+        if self.indices is not None:
+            for equipo in sede.equipos.values():
+                self.indices.agregar_equipo(equipo, equipo.jugadores.values(), sede)
+
+    def remover_sede(self, sede):
+        del self.sedes[sede.id]
+        if self.numeros is not None:
+            self.numeros.quitar(sede.id)
+        sede.asociaciones.remove(self)
+        self.cache.invalidar()
+        if self.indice is not None:
+            for equipo in sede.equipos.values():
+                for jugador in equipo.jugadores.values():
+                    self.indice.remover(jugador, (id(sede), id(equipo)))
+        if self.indices is not None:
+            for equipo in sede.equipos.values():
+                self.indices.remover_equipo(equipo, equipo.jugadores.values(), sede)
+
+    # Igual que Equipo.numeracion, para las sedes de la asociación
+    def numeracion(self):
+        if self.numeros is None:
+            self.numeros = NumeracionOrden(self.sedes)
+        return self.numeros
+
+    # Lugar de una ocurrencia en el recorrido de ranking_jugadores (sede,
+    # equipo, jugador). Los índices desempatan con esta clave, así que dan los
+    # empates en el mismo orden que ranking_jugadores también después de
+    # agregar, mover o reemplazar jugadores.
+    def clave_recorrido(self, sede, equipo, jugador):
+        return self.numeracion()[sede.id], sede.numeracion()[equipo.id], equipo.numeracion()[jugador.id]
+
+    # Índice de ranking persistente (posiciones, rangos y percentiles); se
+    # construye la primera vez que se pide y luego se mantiene con cada cambio
+    def indice_ranking(self):
+        if self.indice is None:
+            self.indice = IndiceRanking()
+            for sede in self.sedes.values():
+                for equipo in sede.equipos.values():
+                    for jugador in equipo.jugadores.values():
+                        self.indice.agregar(jugador, self.clave_recorrido(sede, equipo, jugador), (id(sede), id(equipo)))
+        return self.indice
+
+    # Índices por deporte, edad, nombre e id (indices_secundarios.py); igual
+    # que el de ranking, se construyen al pedirlos y luego se mantienen
+    def indices_secundarios(self):
+        if self.indices is None:
+            self.indices = IndicesSecundarios(self, ((equipo, equipo.jugadores.values(), sede) for sede in self.sedes.values() for equipo in sede.equipos.values()),
+                                              self.clave_recorrido)
+        return self.indices
+
+    def equipo_modificado(self, equipo, diferencia):
+        if self.indices is not None:
+            self.indices.equipo_modificado(equipo, diferencia)
+
+    # sede es la que avisa; cada ocurrencia se identifica por (sede, equipo)
+    def jugador_modificado(self, jugador, diferencia, equipo=None, sede=None):
+        if self.indices is not None:
+            self.indices.jugador_modificado(jugador, diferencia, equipo, sede)
+        if self.indice is None:
+            return
+        aparicion = None if sede is None else (id(sede), id(equipo))
+        if diferencia > 0:
+            self.indice.agregar(jugador, None if sede is None else self.clave_recorrido(sede, equipo, jugador), aparicion)
+        elif diferencia < 0:
+            self.indice.remover(jugador, aparicion)
+        else:
+            self.indice.actualizar(jugador)
+
+    def ordenar_sedes(self, k=None, orden="desc"):
+        return self.cache.obtener(("sedes", orden), lambda: seleccionar(
+            self.sedes.values(), lambda s: (s.rendimiento_promedio(), -s.cantidad_jugadores), k, orden), k)
+
+    # Ranking por rendimiento (ascendente por defecto), opcionalmente limitado a
+    # los k primeros y filtrado por deporte o por id de sede; con por_edad se
+    # desempata por -edad, como en IndiceRanking
+    def ranking_jugadores(self, k=None, orden="asc", deporte=None, sede=None, por_edad=False):
+        return self.cache.obtener(("ranking", orden, deporte, sede, por_edad),
+                                  lambda: self.calcular_ranking(k, orden, deporte, sede, por_edad), k)
+
+    def calcular_ranking(self, k, orden, deporte, sede, por_edad=False):
+        sedes = self.sedes.values() if sede is None else [self.sedes[sede]]
+        # Lista (no generador) para que seleccionar pueda comparar k con n
+        jugadores = [jugador
+                     for s in sedes
+                     for equipo in s.equipos.values() if deporte is None or equipo.deporte == deporte
+                     for jugador in equipo.jugadores.values()]
+        # Sin límite k el rendimiento acotado permite un counting sort en
+        # O(n + rango); si hay valores fuera del dominio se usa el heap
+        if k is None and orden in ("asc", "desc"):
+            try:
+                return counting_sort(jugadores, por_edad, reverse=orden == "desc")
+            except ValueError:
+                pass
+        return seleccionar(jugadores, (lambda j: (j.rendimiento, -j.edad)) if por_edad else (lambda j: j.rendimiento), k, orden)
+
+    # Un solo recorrido: cada sede acumula sus estadísticas parciales y se
+    # combinan en orden, con el mismo resultado que los max/min por separado
+    def acumular_estadisticas(self):
+        acumulador = AcumuladorEstadisticas()
+        for sede in self.sedes.values():
+            acumulador.merge(sede.acumular_estadisticas())
+        return acumulador
 
-    def ordenar_sedes(self):
-        return heapq.nlargest(len(self.sedes), self.sedes.values(), key=lambda s: (s.rendimiento_promedio(), -sum(len(e.jugadores) for e in s.equipos.values())))
+    def calcular_estadisticas(self):
+        return self.cache.obtener("estadisticas", lambda: self.acumular_estadisticas().resultado())
 
-    def ranking_jugadores(self):
-        todos_jugadores = [jugador for sede in self.sedes.values() for equipo in sede.equipos.values() for jugador in equipo.jugadores.values()]
-        return heapq.nsmallest(len(todos_jugadores), todos_jugadores, key=lambda j: j.rendimiento)
+    # Las distribuciones de las sedes se suman igual que sus acumuladores
+    def acumular_distribuciones(self, deporte=None):
+        distribucion = DistribucionJugadores()
+        for sede in self.sedes.values():
+            distribucion.merge(sede.distribucion_actual(deporte))
+        return distribucion
 
-    def calcular_estadisticas(self):
-        todos_equipos = [equipo for sede in self.sedes.values() for equipo in sede.equipos.values()]
-        todos_jugadores = [jugador for equipo in todos_equipos for jugador in equipo.jugadores.values()]
-
-        equipo_mayor_rendimiento = max(todos_equipos, key=lambda e: e.rendimiento_promedio(), default=None)
-        equipo_menor_rendimiento = min(todos_equipos, key=lambda e: e.rendimiento_promedio(), default=None)
-        jugador_mayor_rendimiento = max(todos_jugadores, key=lambda j: j.rendimiento, default=None)
-        jugador_menor_rendimiento = min(todos_jugadores, key=lambda j: j.rendimiento, default=None)
-        jugador_mas_joven = min(todos_jugadores, key=lambda j: j.edad, default=None)
-        jugador_mas_veterano = max(todos_jugadores, key=lambda j: j.edad, default=None)
-        promedio_edad = sum(jugador.edad for jugador in todos_jugadores) / len(todos_jugadores)
-        promedio_rendimiento = sum(jugador.rendimiento for jugador in todos_jugadores) / len(todos_jugadores)
+    def distribucion(self, deporte=None):
+        return self.cache.obtener(("distribucion", deporte), lambda: self.acumular_distribuciones(deporte))
 
+    # Aciertos y fallos de las cachés de la asociación, sus sedes y sus equipos
+    def contadores_cache(self):
         return {
-            "equipo_mayor_rendimiento": equipo_mayor_rendimiento,
-            "equipo_menor_rendimiento": equipo_menor_rendimiento,
-            "jugador_mayor_rendimiento": jugador_mayor_rendimiento,
-            "jugador_menor_rendimiento": jugador_menor_rendimiento,
-            "jugador_mas_joven": jugador_mas_joven,
-            "jugador_mas_veterano": jugador_mas_veterano,
-            "promedio_edad": promedio_edad,
-            "promedio_rendimiento": promedio_rendimiento
+            "asociacion": self.cache.contadores(),
+            "sedes": sumar_contadores(self.sedes.values()),
+            "equipos": sumar_contadores(equipo for sede in self.sedes.values() for equipo in sede.equipos.values()),
         }
 
-    def generar_salida_sedes(self):
-        resultados = []
+    # (sede, [(equipo, jugadores), ...]) en el orden del reporte; cada sede y
+    # cada equipo se ordena una sola vez, a medida que se recorre
+    def secciones_ordenadas(self):
         for sede in self.sedes.values():
-            resultados.append(f"{sede.nombre}, Rendimiento: {sede.rendimiento_promedio()}")
-            equipos_ordenados = sede.ordenar_equipos()
-            for equipo in equipos_ordenados:
-                resultados.append(f"{equipo.deporte}, Rendimiento: {equipo.rendimiento_promedio()}")
-                jugadores_ordenados = sorted(equipo.jugadores.values(), key=lambda j: j.rendimiento, reverse=True)
-                jugadores_info = ", ".join([f"{{{j.id}, {j.nombre}, {j.rendimiento}}}" for j in jugadores_ordenados])
-                resultados.append(f"{{{jugadores_info}}}")
-        return resultados
-
-    def generar_salida_ranking_jugadores(self):
-        ranking = self.ranking_jugadores()
-        ranking_info = ", ".join([str(jugador.id) for jugador in ranking])
-        return f"Ranking Jugadores:\n{{{ranking_info}}}"
-
-    def generar_salida_estadisticas(self):
-        estadisticas = self.calcular_estadisticas()
-        jugador_mayor_rendimiento = estadisticas["jugador_mayor_rendimiento"]
-        jugador_menor_rendimiento = estadisticas["jugador_menor_rendimiento"]
-        jugador_mas_joven = estadisticas["jugador_mas_joven"]
-        jugador_mas_veterano = estadisticas["jugador_mas_veterano"]
-        promedio_edad = estadisticas["promedio_edad"]
-        promedio_rendimiento = estadisticas["promedio_rendimiento"]
-
-        return (
-            f"Equipo con mayor rendimiento: {{{estadisticas['equipo_mayor_rendimiento'].deporte} {estadisticas['equipo_mayor_rendimiento'].id} {estadisticas['equipo_mayor_rendimiento'].rendimiento_promedio()}}}\n"
-            f"Equipo con menor rendimiento: {{{estadisticas['equipo_menor_rendimiento'].deporte} {estadisticas['equipo_menor_rendimiento'].id} {estadisticas['equipo_menor_rendimiento'].rendimiento_promedio()}}}\n"
-            f"Jugador con mayor rendimiento: {{{jugador_mayor_rendimiento.id}, {jugador_mayor_rendimiento.nombre}, {jugador_mayor_rendimiento.rendimiento}}}\n"
-            f"Jugador con menor rendimiento: {{{jugador_menor_rendimiento.id}, {jugador_menor_rendimiento.nombre}, {jugador_menor_rendimiento.rendimiento}}}\n"
-            f"Jugador más joven: {{{jugador_mas_joven.id}, {jugador_mas_joven.nombre}, {jugador_mas_joven.edad}}}\n"
-            f"Jugador más veterano: {{{jugador_mas_veterano.id}, {jugador_mas_veterano.nombre}, {jugador_mas_veterano.edad}}}\n"
-            f"Promedio de edad de los jugadores: {promedio_edad}\n"
-            f"Promedio de rendimiento de los jugadores: {promedio_rendimiento}"
-        )
-
-    def generar_salida_completa(self):
-        sedes_info = '\n\n'.join(self.generar_salida_sedes())
-        ranking_info = self.generar_salida_ranking_jugadores()
-        estadisticas_info = self.generar_salida_estadisticas()
-
-        return f"{sedes_info}\n\n{ranking_info}\n\n{estadisticas_info}"
+            yield sede, [(equipo, equipo.jugadores_por_rendimiento()) for equipo in sede.ordenar_equipos()]
+
+    def lineas_sedes(self, secciones=None):
+        if secciones is None:
+            secciones = self.secciones_ordenadas()
+        for sede, equipos in secciones:
+            yield f"{sede.nombre}, Rendimiento: {sede.rendimiento_promedio()}"
+            for equipo, jugadores in equipos:
+                yield f"{equipo.deporte}, Rendimiento: {equipo.rendimiento_promedio()}"
+                yield "{" + ", ".join(f"{{{j.id}, {j.nombre}, {j.rendimiento}}}" for j in jugadores) + "}"
+
+    def generar_salida_sedes(self):
+        return list(self.lineas_sedes())
+
+    def generar_salida_ranking_jugadores(self, ranking=None):
+        salida = io.StringIO()
+        self.escribir_ranking_jugadores(salida, ranking)
+        return salida.getvalue()
+
+    # La línea del ranking crece con la cantidad de jugadores, así que se escribe por bloques
+    def escribir_ranking_jugadores(self, file, ranking=None):
+        if ranking is None:
+            ranking = self.ranking_jugadores()
+        file.write("Ranking Jugadores:\n{")
+        escribir_unidos(file, (str(jugador.id) for jugador in ranking))
+        file.write("}")
+
+    def generar_salida_estadisticas(self, estadisticas=None):
+        if estadisticas is None:
+            estadisticas = self.calcular_estadisticas()
+        return formatear_estadisticas(estadisticas)
+
+    def generar_salida_completa(self, workers=None):
+        salida = io.StringIO()
+        self.escribir_salida(salida, workers=workers)
+        return salida.getvalue()
+
+    # Escribe el reporte en file (cualquier objeto con write) a medida que se
+    # genera, sin armar el texto completo. formato "jsonl" o "csv" escribe los
+    # mismos datos como registros (ver reporte.py). Con workers > 1 las sedes
+    # del texto se evalúan en un pool de procesos; el resultado es idéntico al
+    # de la versión secuencial.
+    # Con la instrumentación activa cada parte se mide en su fase; los órdenes
+    # quedan en la caché, así que la escritura solo los recorre.
+    def escribir_salida(self, file, formato="texto", workers=None):
+        if formato == "texto" and workers is not None and workers > 1 and len(self.sedes) > 1:
+            with fase("paralelo"):
+                lineas, ranking, estadisticas = self.evaluar_en_paralelo(workers)
+        else:
+            with fase("sort"):
+                for sede in self.sedes.values():
+                    for equipo in sede.ordenar_equipos():
+                        equipo.jugadores_por_rendimiento()
+                ranking = self.ranking_jugadores()
+            with fase("stats"):
+                estadisticas = self.calcular_estadisticas()
+            lineas = self.lineas_sedes()
+
+        with fase("render"):
+            if formato != "texto":
+                escritor = crear_escritor(formato, file)
+                escritor.escribir_reporte(self.secciones_ordenadas(), ranking, estadisticas)
+                return
+
+            for posicion, linea in enumerate(lineas):
+                if posicion:
+                    file.write("\n\n")
+                file.write(linea)
+            file.write("\n\n")
+            self.escribir_ranking_jugadores(file, ranking)
+            file.write("\n\n")
+            file.write(self.generar_salida_estadisticas(estadisticas))
+
+    def evaluar_en_paralelo(self, workers):
+        parciales = mapear_en_procesos(evaluar_sedes, list(self.sedes.values()), workers, exportar_sede, importar_sede)
+
+        jugadores = {j.id: j for sede in self.sedes.values() for e in sede.equipos.values() for j in e.jugadores.values()}
+        equipos = {e.id: e for sede in self.sedes.values() for e in sede.equipos.values()}
+
+        lineas_sedes = []
+        acumulador = AcumuladorEstadisticas()
+        for lineas, _, parcial in parciales:
+            lineas_sedes.extend(lineas)
+            acumulador.merge(parcial.transformar(jugadores.__getitem__, equipos.__getitem__))
+        ranking = [jugadores[id] for id in mezclar_rankings([ranking for _, ranking, _ in parciales])]
+
+        return lineas_sedes, ranking, acumulador.resultado()
+
+
+# Fracción de n a partir de la cual ordenar todo es más rápido que un heap de k
+FRACCION_ORDEN_COMPLETO = 0.25
+
+
+# Devuelve los k primeros elementos según key en orden "asc" o "desc" (todos si
+# k es None). Con k pequeño usa un heap acotado: O(n log k) tiempo y O(k)
+# memoria. El resultado siempre es igual a sorted(...)[:k], así que los
+# empates conservan el orden de entrada.
+def seleccionar(elementos, key, k=None, orden="asc"):
+    if orden not in ("asc", "desc"):
+        raise ValueError(f"Orden desconocido: {orden!r}, se esperaba 'asc' o 'desc'")
+    descendente = orden == "desc"
+
+    if k is None:
+        return sorted(elementos, key=clave_contada(key, "sorted"), reverse=descendente)
+    if k <= 0:
+        return []
+    if hasattr(elementos, '__len__') and k >= len(elementos) * FRACCION_ORDEN_COMPLETO:
+        return sorted(elementos, key=clave_contada(key, "sorted"), reverse=descendente)[:k]
+    if descendente:
+        contar("heapq.nlargest")
+        return heapq.nlargest(k, elementos, key=clave_contada(key, "heapq"))
+    contar("heapq.nsmallest")
+    return heapq.nsmallest(k, elementos, key=clave_contada(key, "heapq"))
+
+
+# Datos planos de una sede (tuplas de ids, nombres y números) para enviarla a
+# otro proceso sin arrastrar todo el grafo de objetos enlazados, cuando el
+# proceso hijo no puede heredarla con "fork"
+def exportar_sede(sede):
+    return (sede.id, sede.nombre, [
+        (equipo.id, equipo.deporte, [(j.id, j.nombre, j.edad, j.rendimiento) for j in equipo.jugadores.values()])
+        for equipo in sede.equipos.values()
+    ])
+
+
+def importar_sede(datos):
+    id, nombre, equipos = datos
+    return crear_sede(id, nombre, [
+        crear_equipo(equipo_id, deporte, [Jugador(*jugador) for jugador in jugadores])
+        for equipo_id, deporte, jugadores in equipos
+    ])
+
+
+# Trabajo de cada proceso: líneas de salida de sus sedes, su ranking parcial
+# como [(rendimiento, id)] y sus estadísticas parciales con ids
+def evaluar_sedes(sedes):
+    asociacion = Asociacion()
+    for sede in sedes:
+        asociacion.agregar_sede(sede)
+    lineas = asociacion.generar_salida_sedes()
+    ranking = [(jugador.rendimiento, jugador.id) for jugador in asociacion.ranking_jugadores()]
+    estadisticas = asociacion.acumular_estadisticas().transformar(lambda j: j.id, lambda e: e.id)
+    return lineas, ranking, estadisticas
+
+
+# Fábricas usadas por el lector para construir equipos y sedes
+def crear_equipo(id, deporte, jugadores):
+    equipo = Equipo(id, deporte)
+    for jugador in jugadores:
+        equipo.agregar_jugador(jugador)
+    return equipo
+
+
+def crear_sede(id, nombre, equipos):
+    sede = Sede(id, nombre)
+    for equipo in equipos:
+        sede.agregar_equipo(equipo)
+    return sede
+
+
+# Generador de las entidades del archivo ("j" | "e" | "s", id, objeto), sin
+# cargar el archivo completo en memoria. Con usar_cache los registros salen
+# de la instantánea binaria del archivo (input.txt.snap) si está vigente.
+def iterar_datos(filepath, al_error=reportar_error, usar_cache=False):
+    leer_registros = iterar_registros_en_cache if usar_cache else iterar_registros
+    return iterar_entidades(filepath, Jugador, crear_equipo, crear_sede, al_error, leer_registros)
+
 
 # Función para leer los datos desde el archivo
-def leer_datos(filepath):
+def leer_datos(filepath, al_error=reportar_error, usar_cache=False):
     jugadores = {}
     equipos = {}
     sedes = {}
-    
-    with open(filepath, 'r') as file:
-        lines = file.readlines()
-
-    jugador_regex = r'j(\d+) = Jugador.Jugador\("([^"]+)", (\d+), (\d+)\)'
-    equipo_regex = r'e(\d+) = Equipo.Equipo\("([^"]+)", \[(.*?)\]\)'
-    sede_regex = r's(\d+) = Sede.Sede\("([^"]+)", \[(.*?)\]\)'
-
-    for line in lines:
-        line = line.strip()
-        if line.startswith('j'):
-            match = re.match(jugador_regex, line)
-            if match:
-                id = int(match.group(1))
-                nombre = match.group(2)
-                edad = int(match.group(3))
-                rendimiento = int(match.group(4))
-                jugadores[id] = Jugador(id, nombre, edad, rendimiento)
-
-        elif line.startswith('e'):
-            match = re.match(equipo_regex, line)
-            if match:
-                id = int(match.group(1))
-                deporte = match.group(2)
-                jugadores_ids = match.group(3).split(', ')
-                equipo = Equipo(id, deporte)
-                for j_id in jugadores_ids:
-                    j_id = int(j_id[1:])  # Eliminar la 'j' y convertir a entero
-                    equipo.agregar_jugador(jugadores[j_id])
-                equipos[id] = equipo
-
-        elif line.startswith('s'):
-            match = re.match(sede_regex, line)
-            if match:
-                id = int(match.group(1))
-                nombre = match.group(2)
-                equipos_ids = match.group(3).split(', ')
-                sede = Sede(id, nombre)
-                for e_id in equipos_ids:
-                    e_id = int(e_id[1:])  # Eliminar la 'e' y convertir a entero
-                    sede.agregar_equipo(equipos[e_id])
-                sedes[id] = sede
+    destinos = {'j': jugadores, 'e': equipos, 's': sedes}
+
+    for tipo, id, entidad in iterar_datos(filepath, al_error, usar_cache):
+        destinos[tipo][id] = entidad
 
     return jugadores, equipos, sedes
 
-def medir_tiempo_ejecucion(filepath):
-    inicio = time.time()
 
-    # Cargar datos del archivo
-    jugadores, equipos, sedes = leer_datos(filepath)
+# Reporte completo de un archivo, sin imprimir nada; lo usan
+# medir_tiempo_ejecucion y el procesamiento por lotes (lote.py)
+def generar_reporte(filepath, workers=None, al_error=reportar_error, usar_cache=False):
+    salida = io.StringIO()
+    escribir_reporte(filepath, salida, workers=workers, al_error=al_error, usar_cache=usar_cache)
+    return salida.getvalue()
 
-    # Crear la asociación
-    asociacion = Asociacion()
-    for sede in sedes.values():
-        asociacion.agregar_sede(sede)
+
+# Igual que generar_reporte pero escribiendo en file a medida que se genera
+def escribir_reporte(filepath, file, formato="texto", workers=None, al_error=reportar_error, usar_cache=False):
+    with fase("parse"):
+        # Cargar datos del archivo
+        jugadores, equipos, sedes = leer_datos(filepath, al_error, usar_cache)
+
+        # Crear la asociación
+        asociacion = Asociacion()
+        for sede in sedes.values():
+            asociacion.agregar_sede(sede)
+
+    asociacion.escribir_salida(file, formato, workers)
+
+
+def medir_tiempo_ejecucion(filepath, workers=None):
+    inicio = time.perf_counter_ns()
 
     # Imprimir los resultados
-    resultado = asociacion.generar_salida_completa()
+    resultado = generar_reporte(filepath, workers)
 
-    fin = time.time()
-    tiempo_total = fin - inicio
+    fin = time.perf_counter_ns()
+    tiempo_total = (fin - inicio) / 1e9
     print("La función se ejecutó en", tiempo_total, "segundos")
     print(resultado)
     return resultado
 
+
 # Ejemplo de uso
-medir_tiempo_ejecucion("input1.txt")
+if __name__ == "__main__":
+    medir_tiempo_ejecucion("input1.txt")
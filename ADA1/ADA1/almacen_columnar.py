@@ -0,0 +1,390 @@
+import io
+import sys
+from array import array
+
+from indice_ranking import en_dominio
+from instantanea import iterar_registros_en_cache
+from instrumentacion import fase
+from lector_datos import iterar_entidades, iterar_registros, reportar_error
+from reporte import escribir_unidos, formatear_estadisticas
+
+#Almacén columnar compacto para asociaciones muy grandes.
+#En lugar de un objeto (con su diccionario) por jugador, los datos viven en
+#columnas paralelas array('i') con una fila por cada aparición de un jugador
+#en un equipo: id, edad, rendimiento, índice del equipo y el índice de su
+#nombre en una tabla de textos internados. Las filas de cada equipo son
+#contiguas, así que un equipo es solo un rango [inicio, fin) de filas, y una
+#sede es un rango dentro de la columna de índices de equipos.
+#Las clases Vista* dan la misma interfaz de lectura que Jugador, Equipo y
+#Sede sin copiar datos. El ranking, los ordenamientos y las estadísticas se
+#calculan directamente sobre las columnas, con la semántica de la Solución 2
+#(equipos sin jugadores repetidos y rendimiento de sede igual a la suma de
+#los promedios de sus equipos). Es de solo lectura: las soluciones conservan
+#sus clases mutables (totales, notificaciones, cachés) y el almacén se usa
+#para generar el reporte de texto de la solución 2 con menos memoria.
+#
+#   python lote.py "exportes/*.txt" --columnar
+
+
+class VistaJugador:
+    __slots__ = ("almacen", "fila")
+
+    def __init__(self, almacen, fila):
+        self.almacen = almacen
+        self.fila = fila
+
+    @property
+    def id(self):
+        return self.almacen.ids[self.fila]
+
+    @property
+    def nombre(self):
+        return self.almacen.textos[self.almacen.nombres[self.fila]]
+
+    @property
+    def edad(self):
+        return self.almacen.edades[self.fila]
+
+    @property
+    def rendimiento(self):
+        return self.almacen.rendimientos[self.fila]
+
+    def __repr__(self):
+        return f"Jugador(id={self.id}, nombre='{self.nombre}', edad={self.edad}, rendimiento={self.rendimiento})"
+
+
+class VistaEquipo:
+    __slots__ = ("almacen", "indice")
+
+    def __init__(self, almacen, indice):
+        self.almacen = almacen
+        self.indice = indice
+
+    @property
+    def id(self):
+        return self.almacen.equipo_ids[self.indice]
+
+    @property
+    def deporte(self):
+        return self.almacen.textos[self.almacen.equipo_deportes[self.indice]]
+
+    @property
+    def filas(self):
+        return range(self.almacen.equipo_inicio[self.indice], self.almacen.equipo_inicio[self.indice + 1])
+
+    @property
+    def jugadores(self):
+        return [VistaJugador(self.almacen, fila) for fila in self.filas]
+
+    def rendimiento_promedio(self):
+        return self.almacen.promedio_equipo(self.indice)
+
+    def ordenar_jugadores(self):
+        return [VistaJugador(self.almacen, fila) for fila in self.almacen.ordenar_jugadores(self.indice)]
+
+    def __repr__(self):
+        return f"Equipo(deporte='{self.deporte}', jugadores={self.ordenar_jugadores()})"
+
+
+class VistaSede:
+    __slots__ = ("almacen", "indice")
+
+    def __init__(self, almacen, indice):
+        self.almacen = almacen
+        self.indice = indice
+
+    @property
+    def id(self):
+        return self.almacen.sede_ids[self.indice]
+
+    @property
+    def nombre(self):
+        return self.almacen.textos[self.almacen.sede_nombres[self.indice]]
+
+    @property
+    def equipos(self):
+        return [VistaEquipo(self.almacen, equipo) for equipo in self.almacen.equipos_de_sede(self.indice)]
+
+    @property
+    def cantidad_jugadores(self):
+        return self.almacen.cantidad_jugadores_sede(self.indice)
+
+    def rendimiento_promedio(self):
+        return self.almacen.rendimiento_sede(self.indice)
+
+    def ordenar_equipos(self):
+        return [VistaEquipo(self.almacen, equipo) for equipo in self.almacen.ordenar_equipos(self.indice)]
+
+    def __repr__(self):
+        return f"Sede(nombre='{self.nombre}', equipos={self.ordenar_equipos()})"
+
+
+class AlmacenAsociacion:
+    def __init__(self):
+        # Tabla de textos internados (nombres, deportes y nombres de sede)
+        self.textos = []
+        self.indice_textos = {}
+
+        # Columnas por fila (una aparición de un jugador en un equipo); los
+        # ids pueden no caber en 32 bits
+        self.ids = array('q')
+        self.edades = array('i')
+        self.rendimientos = array('i')
+        self.equipos = array('i')
+        self.nombres = array('i')
+
+        # Equipos: filas [equipo_inicio[e], equipo_inicio[e + 1])
+        self.equipo_ids = array('q')
+        self.equipo_deportes = array('i')
+        self.equipo_inicio = array('i', [0])
+        self.equipo_sumas = array('q')
+
+        # Sedes: equipos sede_equipos[sede_inicio[s]:sede_inicio[s + 1]]
+        self.sede_ids = array('q')
+        self.sede_nombres = array('i')
+        self.sede_inicio = array('i', [0])
+        self.sede_equipos = array('i')
+
+    def internar(self, texto):
+        indice = self.indice_textos.get(texto)
+        if indice is None:
+            indice = self.indice_textos[texto] = len(self.textos)
+            self.textos.append(sys.intern(texto))
+        return indice
+
+    # Lee el archivo en una pasada con lector_datos.iterar_entidades, el mismo
+    # recorrido que leer_datos de la solución 2: cada equipo y sede se arma
+    # apenas se definen sus referencias, con las definiciones vigentes en ese
+    # momento. Los jugadores quedan en columnas provisionales y cada equipo
+    # copia sus filas de forma contigua al armarse. Los ids repetidos siguen
+    # las reglas de la solución 2: dentro de un equipo o sede el repetido
+    # reemplaza al anterior en su misma posición, y entre sedes la última
+    # definición ocupa el lugar de la primera.
+    @classmethod
+    def desde_archivo(cls, filepath, al_error=reportar_error, usar_cache=False):
+        almacen = cls()
+        # Columnas provisionales de jugadores, una fila por definición
+        ids = array('q')
+        edades = array('i')
+        rendimientos = array('i')
+        nombres = array('i')
+
+        def crear_jugador(id, nombre, edad, rendimiento):
+            ids.append(id)
+            nombres.append(almacen.internar(nombre))
+            edades.append(edad)
+            rendimientos.append(rendimiento)
+            return len(ids) - 1
+
+        def crear_equipo(id, deporte, jugadores):
+            miembros = {}
+            for provisional in jugadores:
+                miembros[ids[provisional]] = provisional
+            return almacen.agregar_equipo(id, almacen.internar(deporte), miembros.items(), edades, rendimientos, nombres)
+
+        def crear_sede(id, nombre, equipos):
+            miembros = {}
+            for equipo in equipos:
+                miembros[almacen.equipo_ids[equipo]] = equipo
+            return almacen.internar(nombre), list(miembros.values())
+
+        sedes = {}
+        leer_registros = iterar_registros_en_cache if usar_cache else iterar_registros
+        for tipo, id, entidad in iterar_entidades(filepath, crear_jugador, crear_equipo, crear_sede, al_error,
+                                                  leer_registros):
+            if tipo == 's':
+                sedes[id] = entidad
+        for id, (nombre, equipos) in sedes.items():
+            almacen.agregar_sede(id, nombre, equipos)
+
+        return almacen
+
+    def agregar_equipo(self, id, deporte, miembros, edades, rendimientos, nombres):
+        indice = len(self.equipo_ids)
+        suma = 0
+        for jugador_id, provisional in miembros:
+            self.ids.append(jugador_id)
+            self.edades.append(edades[provisional])
+            self.rendimientos.append(rendimientos[provisional])
+            self.nombres.append(nombres[provisional])
+            self.equipos.append(indice)
+            suma += rendimientos[provisional]
+        self.equipo_ids.append(id)
+        self.equipo_deportes.append(deporte)
+        self.equipo_sumas.append(suma)
+        self.equipo_inicio.append(len(self.ids))
+        return indice
+
+    def agregar_sede(self, id, nombre, equipos):
+        self.sede_ids.append(id)
+        self.sede_nombres.append(nombre)
+        self.sede_equipos.extend(equipos)
+        self.sede_inicio.append(len(self.sede_equipos))
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Vistas con la interfaz de las clases de las soluciones
+    def jugador(self, fila):
+        return VistaJugador(self, fila)
+
+    def equipo(self, indice):
+        return VistaEquipo(self, indice)
+
+    def sede(self, indice):
+        return VistaSede(self, indice)
+
+    @property
+    def sedes(self):
+        return [VistaSede(self, indice) for indice in range(len(self.sede_ids))]
+
+    def equipos_de_sede(self, sede):
+        return self.sede_equipos[self.sede_inicio[sede]:self.sede_inicio[sede + 1]]
+
+    def cantidad_equipo(self, equipo):
+        return self.equipo_inicio[equipo + 1] - self.equipo_inicio[equipo]
+
+    def promedio_equipo(self, equipo):
+        cantidad = self.cantidad_equipo(equipo)
+        return self.equipo_sumas[equipo] / cantidad if cantidad else 0
+
+    def rendimiento_sede(self, sede):
+        equipos = self.equipos_de_sede(sede)
+        if not equipos:
+            return 0
+        return sum(self.promedio_equipo(equipo) for equipo in equipos)
+
+    def cantidad_jugadores_sede(self, sede):
+        return sum(self.cantidad_equipo(equipo) for equipo in self.equipos_de_sede(sede))
+
+    # Filas en el orden de recorrido sede -> equipo -> jugador
+    def filas_en_recorrido(self):
+        for sede in range(len(self.sede_ids)):
+            for equipo in self.equipos_de_sede(sede):
+                yield from range(self.equipo_inicio[equipo], self.equipo_inicio[equipo + 1])
+
+    # Counting sort estable de las filas por la columna de rendimiento; si hay
+    # valores fuera del dominio se ordena por comparación
+    def ranking_filas(self, orden="asc"):
+        descendente = orden == "desc"
+        rendimientos = self.rendimientos
+        filas = self.filas_en_recorrido()
+        if not all(en_dominio(valor) for valor in rendimientos):
+            return array('i', sorted(filas, key=rendimientos.__getitem__, reverse=descendente))
+
+        cubetas = [array('i') for _ in range(101)]
+        for fila in filas:
+            cubetas[rendimientos[fila]].append(fila)
+        if descendente:
+            cubetas.reverse()
+        resultado = array('i')
+        for cubeta in cubetas:
+            resultado.extend(cubeta)
+        return resultado
+
+    def ranking_jugadores(self, orden="asc"):
+        return [VistaJugador(self, fila) for fila in self.ranking_filas(orden)]
+
+    # Filas del equipo de mayor a menor (rendimiento, -edad)
+    def ordenar_jugadores(self, equipo):
+        rendimientos, edades = self.rendimientos, self.edades
+        filas = range(self.equipo_inicio[equipo], self.equipo_inicio[equipo + 1])
+        return sorted(filas, key=lambda fila: (rendimientos[fila], -edades[fila]), reverse=True)
+
+    def ordenar_equipos(self, sede):
+        return sorted(self.equipos_de_sede(sede),
+                      key=lambda e: (self.promedio_equipo(e), -self.cantidad_equipo(e)), reverse=True)
+
+    def ordenar_sedes(self):
+        return sorted(range(len(self.sede_ids)),
+                      key=lambda s: (self.rendimiento_sede(s), -self.cantidad_jugadores_sede(s)), reverse=True)
+
+    # Mismo diccionario que calcular_estadisticas, con vistas como entidades.
+    # Recorre las columnas una vez; en los empates gana la primera fila vista.
+    def calcular_estadisticas(self):
+        ids, edades, rendimientos = self.ids, self.edades, self.rendimientos
+        cantidad = suma_edad = suma_rendimiento = 0
+        mayor = menor = joven = veterano = None
+        equipo_mayor = equipo_menor = None
+
+        for sede in range(len(self.sede_ids)):
+            for equipo in self.equipos_de_sede(sede):
+                promedio = self.promedio_equipo(equipo)
+                if equipo_mayor is None or promedio > self.promedio_equipo(equipo_mayor):
+                    equipo_mayor = equipo
+                if equipo_menor is None or promedio < self.promedio_equipo(equipo_menor):
+                    equipo_menor = equipo
+
+                for fila in range(self.equipo_inicio[equipo], self.equipo_inicio[equipo + 1]):
+                    rendimiento = rendimientos[fila]
+                    edad = edades[fila]
+                    cantidad += 1
+                    suma_edad += edad
+                    suma_rendimiento += rendimiento
+                    if mayor is None:
+                        mayor = menor = joven = veterano = fila
+                        continue
+                    if rendimiento > rendimientos[mayor]:
+                        mayor = fila
+                    if rendimiento < rendimientos[menor]:
+                        menor = fila
+                    if edad < edades[joven]:
+                        joven = fila
+                    if edad > edades[veterano]:
+                        veterano = fila
+
+        vista_jugador = lambda fila: VistaJugador(self, fila) if fila is not None else None
+        vista_equipo = lambda equipo: VistaEquipo(self, equipo) if equipo is not None else None
+        return {
+            "equipo_mayor_rendimiento": vista_equipo(equipo_mayor),
+            "equipo_menor_rendimiento": vista_equipo(equipo_menor),
+            "jugador_mayor_rendimiento": vista_jugador(mayor),
+            "jugador_menor_rendimiento": vista_jugador(menor),
+            "jugador_mas_joven": vista_jugador(joven),
+            "jugador_mas_veterano": vista_jugador(veterano),
+            "promedio_edad": suma_edad / cantidad if cantidad else 0,
+            "promedio_rendimiento": suma_rendimiento / cantidad if cantidad else 0
+        }
+
+
+def generar_reporte_columnar(filepath, al_error=reportar_error, usar_cache=False):
+    salida = io.StringIO()
+    escribir_reporte_columnar(filepath, salida, al_error, usar_cache)
+    return salida.getvalue()
+
+
+# Escribe en file el mismo texto que escribir_reporte de la solución 2,
+# calculado sobre las columnas
+def escribir_reporte_columnar(filepath, file, al_error=reportar_error, usar_cache=False):
+    with fase("parse"):
+        almacen = AlmacenAsociacion.desde_archivo(filepath, al_error, usar_cache)
+
+    with fase("sort"):
+        ranking = almacen.ranking_filas()
+    with fase("stats"):
+        estadisticas = almacen.calcular_estadisticas()
+
+    with fase("render"):
+        for posicion, linea in enumerate(lineas_sedes(almacen)):
+            if posicion:
+                file.write("\n\n")
+            file.write(linea)
+        file.write("\n\n")
+        file.write("Ranking Jugadores:\n{")
+        escribir_unidos(file, (str(almacen.ids[fila]) for fila in ranking))
+        file.write("}")
+        file.write("\n\n")
+        file.write(formatear_estadisticas(estadisticas))
+
+
+# Líneas de sedes del reporte: equipos en el orden de ordenar_equipos y
+# jugadores solo por rendimiento, de mayor a menor
+def lineas_sedes(almacen):
+    ids, rendimientos, textos = almacen.ids, almacen.rendimientos, almacen.textos
+    for sede in range(len(almacen.sede_ids)):
+        yield f"{textos[almacen.sede_nombres[sede]]}, Rendimiento: {almacen.rendimiento_sede(sede)}"
+        for equipo in almacen.ordenar_equipos(sede):
+            yield f"{textos[almacen.equipo_deportes[equipo]]}, Rendimiento: {almacen.promedio_equipo(equipo)}"
+            filas = sorted(range(almacen.equipo_inicio[equipo], almacen.equipo_inicio[equipo + 1]),
+                           key=rendimientos.__getitem__, reverse=True)
+            yield "{" + ", ".join(f"{{{ids[fila]}, {textos[almacen.nombres[fila]]}, {rendimientos[fila]}}}" for fila in filas) + "}"
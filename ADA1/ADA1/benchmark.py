@@ -0,0 +1,236 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import instrumentacion
+from generador_datos import DISTRIBUCIONES, generar_archivo
+from soluciones import cargar_solucion
+
+#Benchmark de las dos soluciones sobre archivos sintéticos de varios tamaños.
+#Mide por separado cada fase (lectura, ordenamiento, estadísticas y reporte)
+#con perf_counter, repite cada medición, registra la memoria pico con
+#tracemalloc (en una corrida aparte, para no distorsionar los tiempos) y
+#verifica que las dos soluciones den el mismo ranking y las mismas
+#estadísticas, de modo que una mejora de velocidad no cambie resultados.
+#Por defecto la lectura siempre parte del texto; con --instantanea se mide
+#la carga desde la instantánea binaria ya creada. Con --instrumentar se hace
+#además una corrida sin cronometrar con instrumentacion.py activa y cada
+#resultado lleva sus contadores (comparaciones, llamadas a la clave, etc.).
+
+TAMANOS = (1_000, 10_000, 100_000)
+EQUIPOS_POR_SEDE = 4
+JUGADORES_POR_EQUIPO = 25
+FASES = ("parse", "sort", "stats", "render")
+
+
+def construir_asociacion(modulo, filepath, usar_cache=False):
+    _, _, sedes = modulo.leer_datos(filepath, usar_cache=usar_cache)
+    asociacion = modulo.Asociacion()
+    for sede in sedes.values():
+        asociacion.agregar_sede(sede)
+    return asociacion
+
+
+def ordenar_solucion_1(asociacion):
+    asociacion.ordenar_sedes()
+    for sede in asociacion.sedes:
+        sede.ordenar_equipos()
+        for equipo in sede.equipos:
+            equipo.ordenar_jugadores()
+    return asociacion.ranking_jugadores()
+
+
+def ordenar_solucion_2(asociacion):
+    for sede in asociacion.ordenar_sedes():
+        for equipo in sede.ordenar_equipos():
+            equipo.ordenar_jugadores()
+    return asociacion.ranking_jugadores()
+
+
+# Vacía las cachés de la asociación, sus sedes y sus equipos, para que cada
+# fase mida su propio trabajo y no los órdenes que dejó la fase anterior
+def vaciar_caches(asociacion):
+    sedes = asociacion.sedes.values() if isinstance(asociacion.sedes, dict) else asociacion.sedes
+    asociacion.cache.invalidar()
+    for sede in sedes:
+        sede.cache.invalidar()
+        for equipo in sede.equipos.values() if isinstance(sede.equipos, dict) else sede.equipos:
+            equipo.cache.invalidar()
+
+
+SOLUCIONES = {
+    1: {"nombre": "Listas/merge_sort", "ordenar": ordenar_solucion_1, "render": lambda a: a.generar_salida()},
+    2: {"nombre": "Diccionarios/heapq", "ordenar": ordenar_solucion_2, "render": lambda a: a.generar_salida_completa()},
+}
+
+
+# Tiempos en segundos de cada fase para una corrida completa
+def medir_fases(modulo, configuracion, filepath, usar_cache=False):
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    asociacion = construir_asociacion(modulo, filepath, usar_cache)
+    tiempos["parse"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    configuracion["ordenar"](asociacion)
+    tiempos["sort"] = time.perf_counter() - inicio
+
+    vaciar_caches(asociacion)
+    inicio = time.perf_counter()
+    asociacion.calcular_estadisticas()
+    tiempos["stats"] = time.perf_counter() - inicio
+
+    vaciar_caches(asociacion)
+    inicio = time.perf_counter()
+    configuracion["render"](asociacion)
+    tiempos["render"] = time.perf_counter() - inicio
+
+    return tiempos
+
+
+# Fases y contadores de un reporte completo con la instrumentación activa
+def instrumentar(modulo, filepath, usar_cache=False):
+    instrumentacion.reiniciar()
+    instrumentacion.activar()
+    try:
+        modulo.escribir_reporte(filepath, io.StringIO(), usar_cache=usar_cache)
+        return instrumentacion.resultado()
+    finally:
+        instrumentacion.desactivar()
+
+
+def memoria_pico(modulo, configuracion, filepath, usar_cache=False):
+    tracemalloc.start()
+    try:
+        asociacion = construir_asociacion(modulo, filepath, usar_cache)
+        configuracion["ordenar"](asociacion)
+        vaciar_caches(asociacion)
+        asociacion.calcular_estadisticas()
+        vaciar_caches(asociacion)
+        configuracion["render"](asociacion)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+
+# Resumen comparable entre soluciones: ids del ranking y de los extremos, y promedios
+def resumen_resultados(modulo, filepath):
+    asociacion = construir_asociacion(modulo, filepath)
+    ranking = [jugador.id for jugador in asociacion.ranking_jugadores()]
+    estadisticas = {
+        clave: (valor.id if hasattr(valor, "id") else valor)
+        for clave, valor in asociacion.calcular_estadisticas().items()
+    }
+    return ranking, estadisticas
+
+
+def verificar_soluciones(modulos, filepath):
+    resumenes = {numero: resumen_resultados(modulo, filepath) for numero, modulo in modulos.items()}
+    referencia = next(iter(resumenes.values()))
+    return all(resumen == referencia for resumen in resumenes.values())
+
+
+def ejecutar(tamanos, repeticiones, distribucion, semilla, medir_memoria, soluciones, usar_cache=False,
+             equipos_por_sede=EQUIPOS_POR_SEDE, jugadores_por_equipo=JUGADORES_POR_EQUIPO, medir_contadores=False):
+    modulos = {numero: cargar_solucion(numero) for numero in soluciones}
+    resultados = []
+    coinciden = {}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in tamanos:
+            sedes = max(1, tamano // (equipos_por_sede * jugadores_por_equipo))
+            filepath = os.path.join(directorio, f"benchmark_{tamano}.txt")
+            jugadores = generar_archivo(filepath, sedes, equipos_por_sede, jugadores_por_equipo, distribucion, semilla)
+
+            if len(modulos) > 1:
+                coinciden[jugadores] = verificar_soluciones(modulos, filepath)
+            if usar_cache:
+                # Crea la instantánea antes de medir
+                construir_asociacion(next(iter(modulos.values())), filepath, usar_cache)
+
+            for numero, modulo in modulos.items():
+                configuracion = SOLUCIONES[numero]
+                corridas = [medir_fases(modulo, configuracion, filepath, usar_cache) for _ in range(repeticiones)]
+                fases = {
+                    fase: {
+                        "min": min(corrida[fase] for corrida in corridas),
+                        "mediana": statistics.median(corrida[fase] for corrida in corridas),
+                    }
+                    for fase in FASES
+                }
+                resultados.append({
+                    "jugadores": jugadores,
+                    "solucion": numero,
+                    "nombre": configuracion["nombre"],
+                    "fases": fases,
+                    "total_mediana": sum(fases[fase]["mediana"] for fase in FASES),
+                    "pico_bytes": memoria_pico(modulo, configuracion, filepath, usar_cache) if medir_memoria else None,
+                    "instrumentacion": instrumentar(modulo, filepath, usar_cache) if medir_contadores else None,
+                })
+                imprimir_fila(resultados[-1])
+
+    return {
+        "repeticiones": repeticiones,
+        "distribucion": distribucion,
+        "semilla": semilla,
+        "instantanea": usar_cache,
+        "equipos_por_sede": equipos_por_sede,
+        "jugadores_por_equipo": jugadores_por_equipo,
+        "resultados": resultados,
+        "resultados_coinciden": coinciden,
+    }
+
+
+def imprimir_encabezado():
+    print(f"{'jugadores':>10}  {'solución':<20}" + "".join(f"{fase:>10}" for fase in FASES) + f"{'total':>10}{'pico MB':>10}")
+
+
+def imprimir_fila(resultado):
+    pico = resultado["pico_bytes"]
+    print(f"{resultado['jugadores']:>10}  {resultado['nombre']:<20}"
+          + "".join(f"{resultado['fases'][fase]['mediana']:>10.4f}" for fase in FASES)
+          + f"{resultado['total_mediana']:>10.4f}"
+          + (f"{pico / 2**20:>10.1f}" if pico is not None else f"{'-':>10}"), flush=True)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Compara por fases las dos soluciones sobre datos sintéticos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS), help="cantidades de jugadores")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--distribucion", choices=sorted(DISTRIBUCIONES), default="uniforme")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--soluciones", type=int, nargs="+", choices=sorted(SOLUCIONES), default=sorted(SOLUCIONES))
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir la memoria pico")
+    parser.add_argument("--instantanea", action="store_true", help="leer desde la instantánea binaria en lugar del texto")
+    parser.add_argument("--equipos-por-sede", type=int, default=EQUIPOS_POR_SEDE)
+    parser.add_argument("--jugadores-por-equipo", type=int, default=JUGADORES_POR_EQUIPO)
+    parser.add_argument("--instrumentar", action="store_true", help="agregar los contadores de una corrida instrumentada")
+    parser.add_argument("--json", help="ruta donde guardar los resultados en JSON")
+    opciones = parser.parse_args(argumentos)
+
+    imprimir_encabezado()
+    reporte = ejecutar(opciones.tamanos, opciones.repeticiones, opciones.distribucion, opciones.semilla,
+                       not opciones.sin_memoria, opciones.soluciones, opciones.instantanea,
+                       opciones.equipos_por_sede, opciones.jugadores_por_equipo, opciones.instrumentar)
+
+    for jugadores, coincide in reporte["resultados_coinciden"].items():
+        if not coincide:
+            print(f"ERROR: las soluciones no coinciden con {jugadores} jugadores", file=sys.stderr)
+
+    if opciones.json:
+        with open(opciones.json, 'w') as file:
+            json.dump(reporte, file, indent=2)
+
+    return 0 if all(reporte["resultados_coinciden"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#Caché de consultas derivadas (órdenes, rankings, estadísticas) de un Equipo,
+#una Sede o una Asociacion. Cada entidad tiene la suya y la vacía en cada
+#modificación; la invalidación sube por la jerarquía con las mismas
+#notificaciones que mantienen los totales (equipo -> sedes -> asociaciones),
+#así que mientras nada cambie, repetir una consulta no vuelve a ordenar.
+#Las listas y diccionarios guardados se devuelven como copias (O(n), sin
+#volver a ordenar), igual que los valores con copiar (distribuciones), así
+#que modificar un resultado no altera la caché; los demás valores
+#(acumuladores) son de solo lectura.
+
+
+class CacheVistas:
+    __slots__ = ("valores", "aciertos", "fallos", "invalidaciones")
+
+    def __init__(self):
+        self.valores = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    # Valor guardado para clave o, si no está, el que devuelve calcular().
+    # Con k, un orden completo ya guardado para la misma clave responde con
+    # su prefijo en O(k) (los órdenes son estables, así que es el mismo
+    # resultado que calcular solo los k primeros).
+    def obtener(self, clave, calcular, k=None):
+        valores = self.valores
+        if (clave, k) in valores:
+            self.aciertos += 1
+            return copia(valores[(clave, k)])
+        if k is not None and (clave, None) in valores:
+            self.aciertos += 1
+            return valores[(clave, None)][:max(k, 0)]
+
+        self.fallos += 1
+        valor = valores[(clave, k)] = calcular()
+        return copia(valor)
+
+    def invalidar(self):
+        if self.valores:
+            self.valores.clear()
+            self.invalidaciones += 1
+
+    def contadores(self):
+        return {"aciertos": self.aciertos, "fallos": self.fallos, "invalidaciones": self.invalidaciones,
+                "entradas": len(self.valores)}
+
+
+def copia(valor):
+    if isinstance(valor, (list, dict)):
+        return valor.copy()
+    if hasattr(valor, "copiar"):
+        return valor.copiar()
+    return valor
+
+
+# Suma los contadores de varias cachés (cada entidad una sola vez)
+def sumar_contadores(entidades):
+    total = {"aciertos": 0, "fallos": 0, "invalidaciones": 0, "entradas": 0}
+    vistos = set()
+    for entidad in entidades:
+        if id(entidad) in vistos:
+            continue
+        vistos.add(id(entidad))
+        for clave, valor in entidad.cache.contadores().items():
+            total[clave] += valor
+    return total
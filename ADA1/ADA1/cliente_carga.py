@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from servidor import PUERTO
+
+#Generador de carga para servidor.py: abre varias conexiones concurrentes,
+#cada una envía solicitudes una tras otra (espera la respuesta antes de la
+#siguiente) con una mezcla de consultas y mutaciones, y al final informa la
+#latencia p50/p90/p99 por operación y el rendimiento total en solicitudes
+#por segundo.
+#
+#   python servidor.py input1.txt &
+#   python cliente_carga.py --clientes 16 --solicitudes 2000 --mutaciones 0.1
+
+# Peso relativo de cada consulta en la mezcla
+CONSULTAS = {"top": 4, "sedes": 2, "equipo": 2, "estadisticas": 1, "posicion": 1}
+PERCENTILES = (50, 90, 99)
+
+
+class Conexion:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.siguiente = 0
+
+    @classmethod
+    async def abrir(cls, host="127.0.0.1", puerto=PUERTO, unix=None):
+        if unix is not None:
+            reader, writer = await asyncio.open_unix_connection(unix, limit=2**26)
+        else:
+            reader, writer = await asyncio.open_connection(host, puerto, limit=2**26)
+        return cls(reader, writer)
+
+    async def solicitar(self, op, **campos):
+        self.siguiente += 1
+        self.writer.write(json.dumps(dict(campos, id=self.siguiente, op=op)).encode() + b"\n")
+        await self.writer.drain()
+        respuesta = json.loads(await self.reader.readline())
+        if respuesta.get("id") != self.siguiente:
+            raise RuntimeError(f"Respuesta fuera de orden: {respuesta.get('id')} en lugar de {self.siguiente}")
+        return respuesta
+
+    async def cerrar(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+# Genera la siguiente solicitud (op, campos) de la mezcla
+def elegir_solicitud(azar, ids, mutaciones, k):
+    if azar.random() < mutaciones:
+        if azar.random() < 0.7 or len(ids["equipos"]) < 2:
+            return "rendimiento", {"jugador": azar.choice(ids["jugadores"]), "rendimiento": azar.randint(0, 100)}
+        # Puede fallar si el jugador está en varios equipos; cuenta como error
+        return "mover", {"jugador": azar.choice(ids["jugadores"]), "hacia": azar.choice(ids["equipos"])}
+
+    op = azar.choices(list(CONSULTAS), weights=list(CONSULTAS.values()))[0]
+    if op == "top":
+        return op, {"k": k}
+    if op == "sedes":
+        return op, {"k": k}
+    if op == "equipo":
+        return op, {"equipo": azar.choice(ids["equipos"])}
+    if op == "posicion":
+        return op, {"jugador": azar.choice(ids["jugadores"])}
+    return op, {}
+
+
+async def cliente(numero, destino, ids, solicitudes, mutaciones, k, semilla, latencias, errores):
+    azar = random.Random(semilla * 1_000_003 + numero)
+    conexion = await Conexion.abrir(*destino)
+    try:
+        for _ in range(solicitudes):
+            op, campos = elegir_solicitud(azar, ids, mutaciones, k)
+            inicio = time.perf_counter_ns()
+            respuesta = await conexion.solicitar(op, **campos)
+            latencias.setdefault(op, []).append(time.perf_counter_ns() - inicio)
+            if not respuesta["ok"]:
+                errores[op] = errores.get(op, 0) + 1
+    finally:
+        await conexion.cerrar()
+
+
+# Percentil por el método del rango más cercano
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    return ordenados[max(0, -(-p * len(ordenados) // 100) - 1)]
+
+
+def resumir(latencias):
+    ordenados = sorted(latencias)
+    resumen = {f"p{p}_ms": percentil(ordenados, p) / 1e6 for p in PERCENTILES}
+    resumen["max_ms"] = ordenados[-1] / 1e6
+    resumen["solicitudes"] = len(ordenados)
+    return resumen
+
+
+async def generar_carga(destino, clientes, solicitudes, mutaciones, k, semilla):
+    conexion = await Conexion.abrir(*destino)
+    try:
+        ids = (await conexion.solicitar("ids"))["resultado"]
+    finally:
+        await conexion.cerrar()
+    if not ids["jugadores"] or not ids["equipos"]:
+        raise RuntimeError("El servidor no tiene jugadores o equipos para generar carga")
+
+    latencias = {}
+    errores = {}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(numero, destino, ids, solicitudes, mutaciones, k, semilla, latencias, errores)
+        for numero in range(clientes)
+    ))
+    total = time.perf_counter() - inicio
+
+    todas = [latencia for valores in latencias.values() for latencia in valores]
+    return {
+        "clientes": clientes,
+        "segundos": total,
+        "solicitudes_por_segundo": len(todas) / total if total else None,
+        "total": resumir(todas),
+        "operaciones": {op: resumir(valores) for op, valores in sorted(latencias.items())},
+        "errores": errores,
+    }
+
+
+def imprimir_resultado(resultado):
+    print(f"{'operación':<14}{'solicitudes':>12}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'max ms':>10}")
+    filas = list(resultado["operaciones"].items()) + [("total", resultado["total"])]
+    for op, resumen in filas:
+        print(f"{op:<14}{resumen['solicitudes']:>12}"
+              + "".join(f"{resumen[f'p{p}_ms']:>10.3f}" for p in PERCENTILES)
+              + f"{resumen['max_ms']:>10.3f}")
+    print()
+    print(f"{resultado['clientes']} clientes, {resultado['total']['solicitudes']} solicitudes en "
+          f"{resultado['segundos']:.3f} s: {resultado['solicitudes_por_segundo']:.0f} solicitudes/s")
+    if resultado["errores"]:
+        print("Errores: " + ", ".join(f"{op} {cantidad}" for op, cantidad in sorted(resultado["errores"].items())))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mide latencia y rendimiento de servidor.py con varios clientes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--unix", help="ruta del socket Unix del servidor")
+    parser.add_argument("--clientes", type=int, default=8, help="conexiones concurrentes")
+    parser.add_argument("--solicitudes", type=int, default=1000, help="solicitudes por cliente")
+    parser.add_argument("--mutaciones", type=float, default=0.1, help="fracción de solicitudes que son mutaciones")
+    parser.add_argument("--k", type=int, default=10, help="k de las consultas top-k")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="ruta donde guardar los resultados en JSON")
+    opciones = parser.parse_args(argumentos)
+
+    destino = (opciones.host, opciones.puerto, opciones.unix)
+    resultado = asyncio.run(generar_carga(destino, opciones.clientes, opciones.solicitudes, opciones.mutaciones,
+                                          opciones.k, opciones.semilla))
+    imprimir_resultado(resultado)
+
+    if opciones.json:
+        with open(opciones.json, 'w') as file:
+            json.dump(resultado, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
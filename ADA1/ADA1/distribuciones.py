@@ -0,0 +1,374 @@
+import argparse
+import math
+import sys
+from array import array
+from operator import add
+
+from indice_ranking import RENDIMIENTO_MAXIMO, RENDIMIENTO_MINIMO
+from lector_datos import reportar_error
+from soluciones import cargar_solucion
+
+#Distribuciones de rendimiento y edad (percentiles e histogramas) por
+#equipo, sede, deporte o asociación, compartidas por las dos soluciones.
+#Ocupan memoria fija, sin importar la cantidad de jugadores:
+#
+#- HistogramaEnteros cuenta los valores de un dominio entero acotado
+#  (rendimiento 0 a 100, edad 0 a 127) en un árbol de Fenwick, así que
+#  agregar o quitar un valor y pedir un percentil cuestan O(log rango) y el
+#  resultado es exacto;
+#- los valores fuera del dominio van a un SketchCuantiles (cubetas
+#  logarítmicas, error relativo acotado) y solo esos percentiles son
+#  aproximados.
+#
+#Todas se combinan con merge (sumar conteos), de modo que la distribución de
+#una sede es la suma de las de sus equipos y la de varias sedes o partes del
+#archivo, la suma de las de cada una, con el mismo resultado que calcularla
+#de una vez. Las de cada equipo y cada sede se mantienen con los avisos de
+#cambio de sus jugadores (aplicar_cambio) en lugar de rehacerse, y
+#distribucion() devuelve siempre una copia (copiar), así que combinarla con
+#merge no altera la que se mantiene.
+#
+#   python distribuciones.py input1.txt --percentiles 50 90 --ancho 10
+
+EDAD_MINIMA = 0
+EDAD_MAXIMA = 127
+PERCENTILES = (50, 90)
+ERROR_RELATIVO = 0.01
+MAX_CUBETAS = 2048
+
+
+# Percentil p por el método del rango más cercano, igual que IndiceRanking.percentil
+def rango_percentil(p, cantidad):
+    if not 0 <= p <= 100:
+        raise ValueError(f"Percentil fuera de [0, 100]: {p!r}")
+    return max(1, math.ceil(p / 100 * cantidad))
+
+
+class HistogramaEnteros:
+    def __init__(self, minimo, maximo, valores=()):
+        self.minimo = minimo
+        self.maximo = maximo
+        # Árbol de Fenwick (posiciones desde 1) de los conteos por valor
+        self.arbol = array('q', bytes(8 * (maximo - minimo + 2)))
+        self.dentro = 0
+        # Valores menores que minimo y mayores que maximo; los sketches se
+        # crean con el primero de ellos
+        self.bajos = None
+        self.altos = None
+        for valor in valores:
+            self.agregar(valor)
+
+    def __len__(self):
+        return self.dentro + cantidad_en(self.bajos) + cantidad_en(self.altos)
+
+    @property
+    def exacto(self):
+        return not cantidad_en(self.bajos) and not cantidad_en(self.altos)
+
+    def agregar(self, valor, cantidad=1):
+        if valor < self.minimo:
+            if self.bajos is None:
+                self.bajos = SketchCuantiles()
+            self.bajos.agregar(valor, cantidad)
+        elif valor > self.maximo:
+            if self.altos is None:
+                self.altos = SketchCuantiles()
+            self.altos.agregar(valor, cantidad)
+        elif not isinstance(valor, int):
+            raise ValueError(f"Se esperaba un entero dentro de [{self.minimo}, {self.maximo}]: {valor!r}")
+        else:
+            if cantidad < 0 and self.contar(valor) < -cantidad:
+                raise ValueError(f"No hay {-cantidad} valores {valor!r} para quitar")
+            self.dentro += cantidad
+            posicion = valor - self.minimo + 1
+            arbol = self.arbol
+            while posicion < len(arbol):
+                arbol[posicion] += cantidad
+                posicion += posicion & -posicion
+
+    def quitar(self, valor):
+        self.agregar(valor, -1)
+
+    # Cantidad de valores del dominio menores o iguales que valor, en O(log rango)
+    def acumulado(self, valor):
+        posicion = min(valor, self.maximo) - self.minimo + 1
+        total = 0
+        arbol = self.arbol
+        while posicion > 0:
+            total += arbol[posicion]
+            posicion -= posicion & -posicion
+        return total
+
+    def contar(self, valor):
+        if not self.minimo <= valor <= self.maximo:
+            return 0
+        return self.acumulado(valor) - self.acumulado(valor - 1)
+
+    # Sumar árboles de Fenwick posición por posición da el árbol de la suma
+    def merge(self, otro):
+        if (self.minimo, self.maximo) != (otro.minimo, otro.maximo):
+            raise ValueError(f"Dominios distintos: [{self.minimo}, {self.maximo}] y [{otro.minimo}, {otro.maximo}]")
+        self.arbol = array('q', map(add, self.arbol, otro.arbol))
+        self.dentro += otro.dentro
+        if otro.bajos is not None:
+            self.bajos = (self.bajos or SketchCuantiles(otro.bajos.error_relativo)).merge(otro.bajos)
+        if otro.altos is not None:
+            self.altos = (self.altos or SketchCuantiles(otro.altos.error_relativo)).merge(otro.altos)
+        return self
+
+    # Valor en la posición rango (desde 1) del orden ascendente
+    def valor_en_rango(self, rango):
+        if rango <= cantidad_en(self.bajos):
+            return self.bajos.valor_en_rango(rango)
+        rango -= cantidad_en(self.bajos)
+        if rango > self.dentro:
+            return self.altos.valor_en_rango(rango - self.dentro)
+
+        # Búsqueda binaria sobre el árbol: la mayor posición con acumulado < rango
+        arbol = self.arbol
+        posicion = 0
+        paso = 1 << (len(arbol) - 1).bit_length()
+        while paso:
+            siguiente = posicion + paso
+            if siguiente < len(arbol) and arbol[siguiente] < rango:
+                posicion = siguiente
+                rango -= arbol[siguiente]
+            paso >>= 1
+        return posicion + self.minimo
+
+    def percentil(self, p):
+        if not len(self):
+            return None
+        return self.valor_en_rango(rango_percentil(p, len(self)))
+
+    def mediana(self):
+        return self.percentil(50)
+
+    # [(desde, hasta, cantidad)] en intervalos de ancho valores sobre el
+    # dominio; los valores fuera de él se cuentan en bajos y altos
+    def histograma(self, ancho=10):
+        if ancho < 1:
+            raise ValueError(f"Ancho de intervalo inválido: {ancho!r}")
+        intervalos = []
+        anterior = 0
+        for desde in range(self.minimo, self.maximo + 1, ancho):
+            hasta = min(desde + ancho - 1, self.maximo)
+            acumulado = self.acumulado(hasta)
+            intervalos.append((desde, hasta, acumulado - anterior))
+            anterior = acumulado
+        return intervalos
+
+
+def cantidad_en(sketch):
+    return sketch.cantidad if sketch is not None else 0
+
+
+# Sketch de cuantiles para valores sin cota: cada valor cae en la cubeta
+# ceil(log_gamma |valor|), con gamma = (1 + e) / (1 - e), y se estima con el
+# centro de su cubeta, así que el error relativo es a lo sumo e. Los conteos
+# se suman al combinar. Si hay más de max_cubetas se juntan las de menor
+# magnitud (esos valores pierden la garantía de error), de modo que la memoria
+# no pasa de max_cubetas.
+class SketchCuantiles:
+    def __init__(self, error_relativo=ERROR_RELATIVO, max_cubetas=MAX_CUBETAS):
+        self.error_relativo = error_relativo
+        self.gamma = (1 + error_relativo) / (1 - error_relativo)
+        self.log_gamma = math.log(self.gamma)
+        self.max_cubetas = max_cubetas
+        self.positivos = CubetasLogaritmicas()
+        self.negativos = CubetasLogaritmicas()
+        self.ceros = 0
+        self.cantidad = 0
+
+    def agregar(self, valor, cantidad=1):
+        if valor > 0:
+            self.positivos.agregar(self.cubeta(valor), cantidad, self.max_cubetas)
+        elif valor < 0:
+            self.negativos.agregar(self.cubeta(-valor), cantidad, self.max_cubetas)
+        else:
+            if cantidad < 0 and self.ceros < -cantidad:
+                raise ValueError(f"No hay {-cantidad} ceros para quitar")
+            self.ceros += cantidad
+        self.cantidad += cantidad
+
+    def cubeta(self, magnitud):
+        return math.ceil(math.log(magnitud) / self.log_gamma)
+
+    def estimar(self, cubeta):
+        return 2 * self.gamma ** cubeta / (self.gamma + 1)
+
+    def merge(self, otro):
+        if otro.error_relativo != self.error_relativo:
+            raise ValueError(f"Errores relativos distintos: {self.error_relativo} y {otro.error_relativo}")
+        self.positivos.merge(otro.positivos, self.max_cubetas)
+        self.negativos.merge(otro.negativos, self.max_cubetas)
+        self.ceros += otro.ceros
+        self.cantidad += otro.cantidad
+        return self
+
+    # Orden ascendente: negativos de mayor a menor magnitud, ceros, positivos
+    def valor_en_rango(self, rango):
+        for cubeta in sorted(self.negativos.conteos, reverse=True):
+            rango -= self.negativos.conteos[cubeta]
+            if rango <= 0:
+                return -self.estimar(cubeta)
+        rango -= self.ceros
+        if rango <= 0:
+            return 0
+        for cubeta in sorted(self.positivos.conteos):
+            rango -= self.positivos.conteos[cubeta]
+            if rango <= 0:
+                return self.estimar(cubeta)
+        return None
+
+    def percentil(self, p):
+        if not self.cantidad:
+            return None
+        return self.valor_en_rango(rango_percentil(p, self.cantidad))
+
+
+class CubetasLogaritmicas:
+    __slots__ = ("conteos", "piso")
+
+    def __init__(self):
+        self.conteos = {}
+        # Cubetas menores que piso se juntaron en piso
+        self.piso = None
+
+    def agregar(self, cubeta, cantidad, max_cubetas):
+        if self.piso is not None and cubeta < self.piso:
+            cubeta = self.piso
+        total = self.conteos.get(cubeta, 0) + cantidad
+        if total < 0:
+            raise ValueError("No hay valores en esa cubeta para quitar")
+        if total:
+            self.conteos[cubeta] = total
+        else:
+            self.conteos.pop(cubeta, None)
+        if len(self.conteos) > max_cubetas:
+            self.colapsar(max_cubetas)
+
+    def merge(self, otro, max_cubetas):
+        if otro.piso is not None and (self.piso is None or otro.piso > self.piso):
+            self.piso = otro.piso
+            self.colapsar(max_cubetas)
+        for cubeta, cantidad in otro.conteos.items():
+            if self.piso is not None and cubeta < self.piso:
+                cubeta = self.piso
+            self.conteos[cubeta] = self.conteos.get(cubeta, 0) + cantidad
+        self.colapsar(max_cubetas)
+
+    def colapsar(self, max_cubetas):
+        cubetas = sorted(self.conteos)
+        if self.piso is not None:
+            bajo_piso = [cubeta for cubeta in cubetas if cubeta < self.piso]
+            for cubeta in bajo_piso:
+                self.conteos[self.piso] = self.conteos.get(self.piso, 0) + self.conteos.pop(cubeta)
+            cubetas = sorted(self.conteos)
+        sobrantes = len(cubetas) - max_cubetas
+        if sobrantes <= 0:
+            return
+        self.piso = cubetas[sobrantes]
+        for cubeta in cubetas[:sobrantes]:
+            self.conteos[self.piso] += self.conteos.pop(cubeta)
+
+
+# Rendimiento y edad de un conjunto de jugadores (cada aparición cuenta, igual
+# que en ranking_jugadores y calcular_estadisticas)
+class DistribucionJugadores:
+    __slots__ = ("rendimiento", "edad")
+
+    def __init__(self, jugadores=()):
+        self.rendimiento = HistogramaEnteros(RENDIMIENTO_MINIMO, RENDIMIENTO_MAXIMO)
+        self.edad = HistogramaEnteros(EDAD_MINIMA, EDAD_MAXIMA)
+        for jugador in jugadores:
+            self.agregar_jugador(jugador)
+
+    def __len__(self):
+        return len(self.rendimiento)
+
+    def agregar_jugador(self, jugador):
+        self.rendimiento.agregar(jugador.rendimiento)
+        self.edad.agregar(jugador.edad)
+
+    def quitar_jugador(self, jugador):
+        self.rendimiento.quitar(jugador.rendimiento)
+        self.edad.quitar(jugador.edad)
+
+    # El jugador cambió de rendimiento o de edad; anterior es (rendimiento, edad) de antes
+    def actualizar_jugador(self, jugador, anterior):
+        self.rendimiento.quitar(anterior[0])
+        self.edad.quitar(anterior[1])
+        self.agregar_jugador(jugador)
+
+    # Aviso de un jugador con diferencia 1 (entró), -1 (salió) o 0 (cambió),
+    # como en las notificaciones de Equipo y Sede. Un cambio solo se puede
+    # aplicar sabiendo anterior; sin él devuelve False y hay que rearmarla.
+    def aplicar_cambio(self, jugador, diferencia, anterior=None):
+        if diferencia > 0:
+            self.agregar_jugador(jugador)
+        elif diferencia < 0:
+            self.quitar_jugador(jugador)
+        elif anterior is None:
+            return False
+        elif anterior != (jugador.rendimiento, jugador.edad):
+            self.actualizar_jugador(jugador, anterior)
+        return True
+
+    def merge(self, otra):
+        self.rendimiento.merge(otra.rendimiento)
+        self.edad.merge(otra.edad)
+        return self
+
+    def copiar(self):
+        return DistribucionJugadores().merge(self)
+
+    # {"cantidad", "rendimiento": {"p50": ..., ...}, "edad": {...}, "exacto"}
+    def resumen(self, percentiles=PERCENTILES):
+        return {
+            "cantidad": len(self),
+            "rendimiento": {f"p{p}": self.rendimiento.percentil(p) for p in percentiles},
+            "edad": {f"p{p}": self.edad.percentil(p) for p in percentiles},
+            "exacto": self.rendimiento.exacto and self.edad.exacto,
+        }
+
+
+def formatear_resumen(nombre, distribucion, percentiles, ancho):
+    resumen = distribucion.resumen(percentiles)
+    lineas = [f"{nombre}: {resumen['cantidad']} jugadores" + ("" if resumen["exacto"] else " (aproximado)")]
+    for campo in ("rendimiento", "edad"):
+        lineas.append(f"  {campo}: " + ", ".join(f"{clave} {valor}" for clave, valor in resumen[campo].items()))
+    intervalos = [f"{desde}-{hasta}: {cantidad}" for desde, hasta, cantidad in distribucion.rendimiento.histograma(ancho) if cantidad]
+    lineas.append("  histograma de rendimiento: " + (", ".join(intervalos) if intervalos else "vacío"))
+    return "\n".join(lineas)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Percentiles e histogramas de rendimiento y edad por sede y por deporte.")
+    parser.add_argument("archivo")
+    parser.add_argument("--solucion", type=int, choices=(1, 2), default=2)
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(PERCENTILES))
+    parser.add_argument("--ancho", type=int, default=10, help="ancho de los intervalos del histograma de rendimiento")
+    parser.add_argument("--instantanea", action="store_true", help="usar y crear instantáneas binarias (.snap junto a cada entrada)")
+    opciones = parser.parse_args(argumentos)
+
+    modulo = cargar_solucion(opciones.solucion)
+    _, equipos, sedes = modulo.leer_datos(opciones.archivo, reportar_error, opciones.instantanea)
+    asociacion = modulo.Asociacion()
+    for sede in sedes.values():
+        asociacion.agregar_sede(sede)
+
+    percentiles = [int(p) if p == int(p) else p for p in opciones.percentiles]
+    bloques = [formatear_resumen("Asociación", asociacion.distribucion(), percentiles, opciones.ancho)]
+    for sede in sedes.values():
+        bloques.append(formatear_resumen(f"{sede.nombre} ({sede.id})", sede.distribucion(), percentiles, opciones.ancho))
+    for deporte in sorted({equipo.deporte for equipo in equipos.values()}):
+        distribucion = asociacion.distribucion(deporte)
+        if len(distribucion):
+            bloques.append(formatear_resumen(f"Deporte {deporte}", distribucion, percentiles, opciones.ancho))
+    print("\n\n".join(bloques))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
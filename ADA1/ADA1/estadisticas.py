@@ -0,0 +1,152 @@
+#Acumulador de estadísticas compartido por las dos soluciones.
+#Calcula en un solo recorrido los extremos de jugadores y equipos y los
+#promedios de edad y rendimiento, y permite combinar resultados parciales
+#(por sede o por partes del archivo) con merge.
+#En los empates se conserva la primera entidad vista, igual que max/min;
+#merge(otro) considera que lo acumulado en otro viene después.
+
+
+class AcumuladorEstadisticas:
+    def __init__(self):
+        self.cantidad_jugadores = 0
+        self.suma_edad = 0
+        self.suma_rendimiento = 0
+        # Cada extremo se guarda como (valor, entidad) o None si no hay datos
+        self.jugador_mayor_rendimiento = None
+        self.jugador_menor_rendimiento = None
+        self.jugador_mas_joven = None
+        self.jugador_mas_veterano = None
+        self.equipo_mayor_rendimiento = None
+        self.equipo_menor_rendimiento = None
+
+    def agregar_jugador(self, jugador):
+        rendimiento = jugador.rendimiento
+        edad = jugador.edad
+        self.cantidad_jugadores += 1
+        self.suma_edad += edad
+        self.suma_rendimiento += rendimiento
+
+        if self.jugador_mayor_rendimiento is None:
+            self.jugador_mayor_rendimiento = self.jugador_menor_rendimiento = (rendimiento, jugador)
+            self.jugador_mas_joven = self.jugador_mas_veterano = (edad, jugador)
+            return
+
+        if rendimiento > self.jugador_mayor_rendimiento[0]:
+            self.jugador_mayor_rendimiento = (rendimiento, jugador)
+        if rendimiento < self.jugador_menor_rendimiento[0]:
+            self.jugador_menor_rendimiento = (rendimiento, jugador)
+        if edad < self.jugador_mas_joven[0]:
+            self.jugador_mas_joven = (edad, jugador)
+        if edad > self.jugador_mas_veterano[0]:
+            self.jugador_mas_veterano = (edad, jugador)
+
+    # Acepta cualquier iterable de jugadores, incluido un generador del lector
+    def agregar_jugadores(self, jugadores):
+        for jugador in jugadores:
+            self.agregar_jugador(jugador)
+
+    def agregar_equipo(self, equipo):
+        rendimiento = equipo.rendimiento_promedio()
+        if self.equipo_mayor_rendimiento is None:
+            self.equipo_mayor_rendimiento = self.equipo_menor_rendimiento = (rendimiento, equipo)
+            return
+
+        if rendimiento > self.equipo_mayor_rendimiento[0]:
+            self.equipo_mayor_rendimiento = (rendimiento, equipo)
+        if rendimiento < self.equipo_menor_rendimiento[0]:
+            self.equipo_menor_rendimiento = (rendimiento, equipo)
+
+    def merge(self, otro):
+        self.cantidad_jugadores += otro.cantidad_jugadores
+        self.suma_edad += otro.suma_edad
+        self.suma_rendimiento += otro.suma_rendimiento
+
+        self.jugador_mayor_rendimiento = mayor(self.jugador_mayor_rendimiento, otro.jugador_mayor_rendimiento)
+        self.jugador_menor_rendimiento = menor(self.jugador_menor_rendimiento, otro.jugador_menor_rendimiento)
+        self.jugador_mas_joven = menor(self.jugador_mas_joven, otro.jugador_mas_joven)
+        self.jugador_mas_veterano = mayor(self.jugador_mas_veterano, otro.jugador_mas_veterano)
+        self.equipo_mayor_rendimiento = mayor(self.equipo_mayor_rendimiento, otro.equipo_mayor_rendimiento)
+        self.equipo_menor_rendimiento = menor(self.equipo_menor_rendimiento, otro.equipo_menor_rendimiento)
+        return self
+
+    # Copia con las entidades reemplazadas, por ejemplo por sus ids para enviar
+    # el acumulador entre procesos y luego por los objetos del proceso principal
+    def transformar(self, funcion_jugador, funcion_equipo):
+        copia = AcumuladorEstadisticas()
+        copia.cantidad_jugadores = self.cantidad_jugadores
+        copia.suma_edad = self.suma_edad
+        copia.suma_rendimiento = self.suma_rendimiento
+        for nombre in ("jugador_mayor_rendimiento", "jugador_menor_rendimiento", "jugador_mas_joven", "jugador_mas_veterano"):
+            extremo = getattr(self, nombre)
+            if extremo is not None:
+                setattr(copia, nombre, (extremo[0], funcion_jugador(extremo[1])))
+        for nombre in ("equipo_mayor_rendimiento", "equipo_menor_rendimiento"):
+            extremo = getattr(self, nombre)
+            if extremo is not None:
+                setattr(copia, nombre, (extremo[0], funcion_equipo(extremo[1])))
+        return copia
+
+    # Mismo diccionario que devolvía calcular_estadisticas
+    def resultado(self):
+        cantidad = self.cantidad_jugadores
+        return {
+            "equipo_mayor_rendimiento": entidad(self.equipo_mayor_rendimiento),
+            "equipo_menor_rendimiento": entidad(self.equipo_menor_rendimiento),
+            "jugador_mayor_rendimiento": entidad(self.jugador_mayor_rendimiento),
+            "jugador_menor_rendimiento": entidad(self.jugador_menor_rendimiento),
+            "jugador_mas_joven": entidad(self.jugador_mas_joven),
+            "jugador_mas_veterano": entidad(self.jugador_mas_veterano),
+            "promedio_edad": self.suma_edad / cantidad if cantidad else 0,
+            "promedio_rendimiento": self.suma_rendimiento / cantidad if cantidad else 0
+        }
+
+
+# Extremo entre dos pares (valor, entidad); en empate gana el primero
+def mayor(actual, otro):
+    if actual is None or (otro is not None and otro[0] > actual[0]):
+        return otro
+    return actual
+
+
+def menor(actual, otro):
+    if actual is None or (otro is not None and otro[0] < actual[0]):
+        return otro
+    return actual
+
+
+def entidad(extremo):
+    return extremo[1] if extremo is not None else None
+
+
+# Árbol de segmentos de acumuladores sobre partes en un orden fijo (por
+# ejemplo, una por sede). Cambiar una parte recombina solo su camino hasta la
+# raíz, O(log n) merges en lugar de n; como merge es asociativo y respeta el
+# orden, el total es idéntico al de combinar todas las partes una tras otra.
+# Sirve para cualquier parte con merge, como DistribucionJugadores (crear da
+# la parte vacía).
+class ArbolEstadisticas:
+    def __init__(self, acumuladores, crear=AcumuladorEstadisticas):
+        acumuladores = list(acumuladores)
+        self.crear = crear
+        self.tamano = 1
+        while self.tamano < len(acumuladores):
+            self.tamano *= 2
+        self.nodos = [crear() for _ in range(2 * self.tamano)]
+        self.nodos[self.tamano:self.tamano + len(acumuladores)] = acumuladores
+        for nodo in range(self.tamano - 1, 0, -1):
+            self.combinar(nodo)
+
+    # Los acumuladores de las hojas no se modifican, cada nodo interno es nuevo
+    def combinar(self, nodo):
+        self.nodos[nodo] = self.crear().merge(self.nodos[2 * nodo]).merge(self.nodos[2 * nodo + 1])
+
+    def actualizar(self, posicion, acumulador):
+        nodo = self.tamano + posicion
+        self.nodos[nodo] = acumulador
+        nodo //= 2
+        while nodo:
+            self.combinar(nodo)
+            nodo //= 2
+
+    def total(self):
+        return self.nodos[1]
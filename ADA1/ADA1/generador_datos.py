@@ -0,0 +1,106 @@
+import argparse
+import random
+
+#Generador de archivos de entrada sintéticos con el mismo formato que
+#input1.txt ... input5.txt (jN = Jugador.Jugador(...), eN = Equipo.Equipo(...),
+#sN = Sede.Sede(...)). Escribe línea por línea, así que sirve desde 10^3
+#hasta 10^7 jugadores sin cargar nada grande en memoria.
+
+DEPORTES = ("Futbol", "Volleyball")
+NOMBRES = ("Juan", "Maria", "Pedro", "Ana", "Carlos", "Laura", "Jose", "Luis", "Sara", "Jorge",
+           "Lorena", "Raul", "Sofia", "Daniel", "Valentina", "Mateo", "Camila", "Diego")
+APELLIDOS = ("Garcia", "Torres", "Rodriguez", "Lopez", "Martinez", "Gomez", "Diaz", "Ruiz",
+             "Ramirez", "Herrera", "Perez", "Sanchez", "Rojas", "Morales")
+EDAD_MINIMA = 16
+EDAD_MAXIMA = 40
+
+
+def acotar(valor):
+    return max(0, min(100, int(round(valor))))
+
+
+# Distribuciones de rendimiento (0 a 100) disponibles
+DISTRIBUCIONES = {
+    "uniforme": lambda azar: azar.randint(0, 100),
+    "normal": lambda azar: acotar(azar.gauss(60, 15)),
+    "sesgada": lambda azar: acotar(100 * azar.betavariate(5, 2)),
+    # Pocos valores distintos: muchos empates de rendimiento
+    "empates": lambda azar: azar.choice((40, 50, 60, 70, 80)),
+}
+
+
+# Escribe un archivo con sedes * equipos_por_sede * jugadores_por_equipo
+# jugadores; cada jugador pertenece a un solo equipo y los deportes se alternan.
+# Con repetidos > 0 (una probabilidad) algunos equipos y sedes nombran dos
+# veces un mismo miembro y al final se redefinen algunos equipos, con una
+# sede nueva que los usa, para probar las reglas de ids repetidos.
+def generar_archivo(filepath, sedes, equipos_por_sede, jugadores_por_equipo, distribucion="uniforme", semilla=None,
+                    repetidos=0.0):
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución desconocida: {distribucion!r}, opciones: {', '.join(DISTRIBUCIONES)}")
+    azar = random.Random(semilla)
+    rendimiento = DISTRIBUCIONES[distribucion]
+    total_equipos = sedes * equipos_por_sede
+
+    with open(filepath, 'w') as file:
+        jugador_id = 0
+        for _ in range(total_equipos * jugadores_por_equipo):
+            jugador_id += 1
+            nombre = f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}"
+            edad = azar.randint(EDAD_MINIMA, EDAD_MAXIMA)
+            file.write(f'j{jugador_id} = Jugador.Jugador("{nombre}", {edad}, {rendimiento(azar)})\n')
+
+        file.write("\n")
+        for equipo_id in range(1, total_equipos + 1):
+            primero = (equipo_id - 1) * jugadores_por_equipo + 1
+            jugadores = ", ".join(f"j{j}" for j in repetir(azar, list(range(primero, primero + jugadores_por_equipo)), repetidos))
+            deporte = DEPORTES[(equipo_id - 1) % len(DEPORTES)]
+            file.write(f'e{equipo_id} = Equipo.Equipo("{deporte}", [{jugadores}])\n')
+
+        file.write("\n")
+        for sede_id in range(1, sedes + 1):
+            primero = (sede_id - 1) * equipos_por_sede + 1
+            equipos = ", ".join(f"e{e}" for e in repetir(azar, list(range(primero, primero + equipos_por_sede)), repetidos))
+            file.write(f's{sede_id} = Sede.Sede("Sede {sede_id}", [{equipos}])\n')
+
+        # Redefiniciones: las sedes anteriores conservan los equipos que ya tenían
+        redefinidos = [e for e in range(1, total_equipos + 1) if repetidos and azar.random() < repetidos]
+        if redefinidos:
+            file.write("\n")
+            for equipo_id in redefinidos:
+                jugadores = azar.sample(range(1, jugador_id + 1), min(jugador_id, jugadores_por_equipo))
+                deporte = azar.choice(DEPORTES)
+                file.write(f'e{equipo_id} = Equipo.Equipo("{deporte}", [{", ".join(f"j{j}" for j in jugadores)}])\n')
+            equipos = ", ".join(f"e{e}" for e in redefinidos)
+            file.write(f's{sedes + 1} = Sede.Sede("Sede {sedes + 1}", [{equipos}])\n')
+
+    return jugador_id
+
+
+# Con probabilidad repetidos agrega una referencia repetida en una posición al azar
+def repetir(azar, ids, repetidos):
+    if repetidos and ids and azar.random() < repetidos:
+        ids.insert(azar.randint(0, len(ids)), azar.choice(ids))
+    return ids
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera un archivo de entrada sintético.")
+    parser.add_argument("salida", help="ruta del archivo a escribir")
+    parser.add_argument("--sedes", type=int, default=10)
+    parser.add_argument("--equipos-por-sede", type=int, default=4)
+    parser.add_argument("--jugadores-por-equipo", type=int, default=25)
+    parser.add_argument("--distribucion", choices=sorted(DISTRIBUCIONES), default="uniforme")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--repetidos", type=float, default=0.0,
+                        help="probabilidad de referencias repetidas y de equipos redefinidos")
+    opciones = parser.parse_args(argumentos)
+
+    total = generar_archivo(opciones.salida, opciones.sedes, opciones.equipos_por_sede,
+                            opciones.jugadores_por_equipo, opciones.distribucion, opciones.semilla,
+                            opciones.repetidos)
+    print(f"{opciones.salida}: {total} jugadores")
+
+
+if __name__ == "__main__":
+    main()
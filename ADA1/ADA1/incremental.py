@@ -0,0 +1,458 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from indice_ranking import RENDIMIENTO_MAXIMO, RENDIMIENTO_MINIMO, en_dominio
+from lector_datos import PATRON_ENTIDAD, leer_referencias, reportar_error
+from reporte import escribir_unidos
+from soluciones import cargar_solucion
+
+#Reprocesamiento incremental (solución 2).
+#Entre dos exportaciones cambia una fracción pequeña de las líneas, así que
+#en lugar de leer y ordenar todo de nuevo se mantiene viva la Asociacion de
+#la última versión y se le aplican solo las entidades cambiadas, de dos
+#maneras:
+#
+#- comparando la nueva versión del archivo con la última procesada: cada
+#  línea se compara como texto con la anterior del mismo jN/eN/sN y solo las
+#  distintas pasan por la expresión regular;
+#- leyendo un diario de cambios de solo agregado, con las mismas líneas del
+#  archivo (alta o reemplazo de la entidad) y "-j5", "-e2", "-s1" para bajas.
+#  Equivale a reemplazar cada línea en su lugar en el archivo, agregar las
+#  nuevas al final de las de su tipo y quitar las bajas.
+#
+#Los cambios se aplican con los métodos de siempre (agregar_jugador,
+#actualizar_rendimiento, remover_equipo...), que invalidan las cachés de los
+#equipos y sedes afectados; el reporte se arma con un bloque de texto y los
+#tramos del ranking de cada sede guardados en su caché, de modo que solo se
+#recalculan las sedes afectadas y el ranking y las estadísticas globales se
+#combinan a partir de las partes.
+#
+#El resultado es idéntico al de procesar el archivo completo. Para
+#garantizarlo el modo incremental solo se usa con archivos "canónicos" (como
+#los que genera la exportación): primero los jugadores, luego los equipos y
+#luego las sedes, sin ids repetidos, sin líneas inválidas y sin referencias
+#sin definir. Con cualquier otro archivo, o si un cambio no cumple esas
+#condiciones, se vuelve a procesar todo.
+#
+#   python incremental.py exportes/lunes.txt exportes/martes.txt exportes/miercoles.txt --verificar
+#   python incremental.py base.txt --diario cambios.log --salida reportes
+
+TIPOS = ("j", "e", "s")
+RANGO_RENDIMIENTO = RENDIMIENTO_MAXIMO - RENDIMIENTO_MINIMO + 1
+
+
+class ProcesadorIncremental:
+    def __init__(self, filepath, al_error=reportar_error, usar_cache=False):
+        self.modulo = cargar_solucion(2)
+        self.al_error = al_error
+        self.diarios = {}
+        self.ultimo = None
+        self.cargar_completo(filepath, usar_cache)
+
+    # --- Procesamiento completo ---
+
+    def cargar_completo(self, filepath, usar_cache=False):
+        errores = []
+
+        def al_error(ubicacion, linea, motivo):
+            errores.append(ubicacion)
+            self.al_error(ubicacion, linea, motivo)
+
+        self.jugadores, self.equipos, self.sedes = self.modulo.leer_datos(filepath, al_error, usar_cache)
+        self.asociacion = self.modulo.Asociacion()
+        for sede in self.sedes.values():
+            self.asociacion.agregar_sede(sede)
+
+        # Texto de cada línea por tipo e id, en el orden del archivo; None si
+        # el archivo no es canónico y por lo tanto no admite cambios incrementales
+        lineas, canonico = leer_lineas(filepath)
+        self.lineas = lineas if canonico and not errores else None
+
+    # Procesa la versión materializada de self.lineas desde un archivo temporal
+    def recargar_lineas(self):
+        descriptor, ruta = tempfile.mkstemp(suffix=".txt")
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                escribir_lineas(file, self.lineas)
+            self.cargar_completo(ruta, usar_cache=False)
+        finally:
+            os.unlink(ruta)
+
+    # --- Entradas incrementales ---
+
+    # Procesa una nueva versión del archivo comparándola con la última
+    def procesar_version(self, filepath, usar_cache=False):
+        inicio = time.perf_counter()
+        lineas, canonico = leer_lineas(filepath)
+        tocados = None
+        if canonico and self.lineas is not None:
+            tocados = [(tipo, id) for tipo in TIPOS for id in lineas[tipo] if lineas[tipo][id] != self.lineas[tipo].get(id)]
+            tocados.extend((tipo, id) for tipo in TIPOS for id in self.lineas[tipo] if id not in lineas[tipo])
+
+        if tocados is not None and self.aplicar_cambios(lineas, tocados):
+            modo = "incremental"
+        else:
+            self.cargar_completo(filepath, usar_cache)
+            modo = "completo"
+        return self.registrar(modo, tocados, inicio)
+
+    # Aplica las líneas agregadas al diario desde la última lectura. El diario
+    # solo puede aplicarse sobre una versión canónica (ver arriba).
+    def aplicar_diario(self, ruta):
+        inicio = time.perf_counter()
+        if self.lineas is None:
+            raise ValueError("El diario de cambios requiere una versión base canónica (jugadores, equipos y sedes, sin repetidos ni errores)")
+
+        entradas, self.diarios[ruta] = leer_diario(ruta, self.diarios.get(ruta, 0))
+        # aplicar_cambios solo compara con los objetos, así que las líneas se
+        # pueden modificar en su lugar
+        lineas = self.lineas
+        tocados = {}
+        for numero, linea in entradas:
+            clave = linea[1:] if linea[0] == '-' else linea.partition(" = ")[0]
+            tipo, id = clave[:1], clave[1:]
+            if tipo not in TIPOS or not id.isdigit():
+                self.al_error(f"{ruta}:{numero}", linea, "entrada del diario no reconocida")
+                continue
+            id = int(id)
+            if linea[0] == '-':
+                lineas[tipo].pop(id, None)
+            else:
+                lineas[tipo][id] = linea
+            tocados[(tipo, id)] = True
+
+        if not tocados:
+            return self.registrar("sin cambios", [], inicio)
+        if self.aplicar_cambios(lineas, list(tocados)):
+            modo = "incremental"
+        else:
+            self.recargar_lineas()
+            modo = "completo"
+        return self.registrar(modo, tocados, inicio)
+
+    def registrar(self, modo, tocados, inicio):
+        self.ultimo = {"modo": modo, "cambios": None if tocados is None else len(tocados),
+                       "segundos": time.perf_counter() - inicio}
+        return self.ultimo
+
+    # --- Aplicación de los cambios ---
+
+    # Lleva la asociación al estado de lineas, que difiere de self.lineas solo
+    # en las entidades tocadas. Devuelve False, sin modificar nada, si el
+    # cambio no se puede aplicar de forma incremental.
+    def aplicar_cambios(self, lineas, tocados):
+        registros = {}
+        bajas = []
+        for tipo, id in tocados:
+            texto = lineas[tipo].get(id)
+            if texto is None:
+                bajas.append((tipo, id))
+                continue
+            registro = leer_registro(texto)
+            if registro is None or (registro[0], registro[1]) != (tipo, id):
+                return False
+            registros[(tipo, id)] = registro
+        if not self.cambios_validos(lineas, registros, bajas):
+            return False
+
+        for tipo in TIPOS:
+            for (tipo_registro, id), registro in registros.items():
+                if tipo_registro == tipo:
+                    self.actualizar_entidad(registro)
+        for tipo, id in sorted(bajas, key=lambda baja: -TIPOS.index(baja[0])):
+            self.remover_entidad(tipo, id)
+
+        # Las sedes siguen el orden del archivo (agregar_sede las pone al final)
+        if list(self.asociacion.sedes) != list(lineas["s"]):
+            self.sedes = {id: self.sedes[id] for id in lineas["s"]}
+            self.asociacion.sedes = {id: self.sedes[id] for id in lineas["s"]}
+            self.asociacion.cache.invalidar()
+        self.lineas = lineas
+        return True
+
+    # Las referencias de las líneas nuevas deben existir en la nueva versión y
+    # ninguna entidad sin cambios puede seguir nombrando a una dada de baja
+    def cambios_validos(self, lineas, registros, bajas):
+        for (tipo, id), registro in registros.items():
+            if tipo == "e" and any(r not in lineas["j"] for r in registro[3]):
+                return False
+            if tipo == "s" and any(r not in lineas["e"] for r in registro[3]):
+                return False
+        for tipo, id in bajas:
+            if tipo == "j" and id in self.jugadores:
+                referentes = [("e", equipo.id) for equipo in self.jugadores[id].equipos]
+            elif tipo == "e" and id in self.equipos:
+                referentes = [("s", sede.id) for sede in self.equipos[id].sedes]
+            else:
+                continue
+            if any(referente not in registros and referente[1] in lineas[referente[0]] for referente in referentes):
+                return False
+        return True
+
+    def actualizar_entidad(self, registro):
+        if registro[0] == "j":
+            _, id, nombre, edad, rendimiento = registro
+            jugador = self.jugadores.get(id)
+            if jugador is None:
+                self.jugadores[id] = self.modulo.Jugador(id, nombre, edad, rendimiento)
+            elif (jugador.nombre, jugador.edad, jugador.rendimiento) != (nombre, edad, rendimiento):
+                actualizar_jugador(jugador, nombre, edad, rendimiento)
+            return
+
+        tipo, id, nombre, referencias = registro
+        if tipo == "e":
+            miembros = [self.jugadores[r] for r in referencias]
+            equipo = self.equipos.get(id)
+            if equipo is None:
+                self.equipos[id] = self.modulo.crear_equipo(id, nombre, miembros)
+            else:
+                reconstruir(equipo, "deporte", nombre, equipo.jugadores, miembros,
+                            equipo.agregar_jugador, equipo.remover_jugador)
+                equipo.cache.invalidar()
+                # Con el equipo completo, los índices secundarios lo reubican si cambió el deporte
+                for sede in equipo.sedes:
+                    sede.notificar_asociaciones([], 0, equipo, True)
+            return
+
+        miembros = [self.equipos[r] for r in referencias]
+        sede = self.sedes.get(id)
+        if sede is None:
+            sede = self.sedes[id] = self.modulo.crear_sede(id, nombre, miembros)
+            self.asociacion.agregar_sede(sede)
+        else:
+            reconstruir(sede, "nombre", nombre, sede.equipos, miembros, sede.agregar_equipo, sede.remover_equipo)
+            sede.notificar_asociaciones([], 0)
+
+    def remover_entidad(self, tipo, id):
+        if tipo == "s" and id in self.sedes:
+            sede = self.sedes.pop(id)
+            self.asociacion.remover_sede(sede)
+            for equipo in list(sede.equipos.values()):
+                sede.remover_equipo(equipo)
+        elif tipo == "e" and id in self.equipos:
+            equipo = self.equipos.pop(id)
+            for jugador in list(equipo.jugadores.values()):
+                equipo.remover_jugador(jugador)
+        elif tipo == "j":
+            self.jugadores.pop(id, None)
+
+    # --- Reporte ---
+
+    # Mismo texto que Asociacion.escribir_salida; con otro formato se usa ese
+    def escribir_salida(self, file, formato="texto"):
+        if formato != "texto":
+            self.asociacion.escribir_salida(file, formato)
+            return
+
+        sedes = list(self.asociacion.sedes.values())
+        partes = [sede.cache.obtener("reporte_incremental", lambda sede=sede: self.partes_sede(sede)) for sede in sedes]
+        for posicion, (bloque, _) in enumerate(partes):
+            if posicion:
+                file.write("\n\n")
+            file.write(bloque)
+        file.write("\n\n")
+
+        # Counting sort global a partir de los tramos de cada sede: para cada
+        # rendimiento, los de cada sede en el orden de las sedes
+        if all(tramos is not None for _, tramos in partes):
+            por_rendimiento = [[] for _ in range(RANGO_RENDIMIENTO)]
+            for _, tramos in partes:
+                for indice, texto in tramos:
+                    por_rendimiento[indice].append(texto)
+            file.write("Ranking Jugadores:\n{")
+            escribir_unidos(file, (texto for textos in por_rendimiento for texto in textos))
+            file.write("}")
+        else:
+            self.asociacion.escribir_ranking_jugadores(file)
+        file.write("\n\n")
+        file.write(self.asociacion.generar_salida_estadisticas())
+
+    def generar_salida(self):
+        salida = io.StringIO()
+        self.escribir_salida(salida)
+        return salida.getvalue()
+
+    # Reporte del procesamiento completo del archivo (o, sin archivo, de la
+    # versión actual materializada), para comprobar el incremental
+    def reporte_completo(self, filepath=None):
+        if filepath is not None:
+            return self.modulo.generar_reporte(filepath, usar_cache=False)
+        descriptor, ruta = tempfile.mkstemp(suffix=".txt")
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                escribir_lineas(file, self.lineas)
+            return self.modulo.generar_reporte(ruta, usar_cache=False)
+        finally:
+            os.unlink(ruta)
+
+    # Bloque de texto de la sede en el reporte y sus tramos del ranking como
+    # [(rendimiento - mínimo, "id, id, ...")] en orden de rendimiento; los
+    # tramos son None si algún rendimiento está fuera del dominio del
+    # counting sort
+    def partes_sede(self, sede):
+        bloque = "\n\n".join(self.asociacion.lineas_sedes([
+            (sede, [(equipo, equipo.jugadores_por_rendimiento()) for equipo in sede.ordenar_equipos()])
+        ]))
+        ids = [[] for _ in range(RANGO_RENDIMIENTO)]
+        for equipo in sede.equipos.values():
+            for jugador in equipo.jugadores.values():
+                if not en_dominio(jugador.rendimiento):
+                    return bloque, None
+                ids[jugador.rendimiento - RENDIMIENTO_MINIMO].append(str(jugador.id))
+        return bloque, [(indice, ", ".join(textos)) for indice, textos in enumerate(ids) if textos]
+
+
+# Cambia los datos del jugador avisando a sus equipos (y por ellos a sus
+# sedes y asociaciones) para que actualicen totales, cachés, índices y
+# distribuciones. Cada aviso lleva el (rendimiento, edad) de antes de su
+# cambio, así que el rendimiento se cambia antes que la edad.
+def actualizar_jugador(jugador, nombre, edad, rendimiento):
+    jugador.nombre = nombre
+    if not jugador.equipos:
+        jugador.edad = edad
+        jugador.rendimiento = rendimiento
+        return
+    if jugador.rendimiento != rendimiento:
+        jugador.equipos[0].actualizar_rendimiento(jugador, rendimiento)
+        if jugador.edad == edad:
+            return
+    anterior = (jugador.rendimiento, jugador.edad)
+    jugador.edad = edad
+    for equipo in jugador.equipos:
+        equipo.notificar_sedes(jugador, 0, anterior)
+
+
+# Deja a la entidad con el atributo y los miembros de su nueva definición. Si
+# los miembros cambian se quitan y se vuelven a agregar en el nuevo orden, con
+# lo que el diccionario queda igual que al construirla desde cero (una
+# referencia repetida queda en la posición de su primera aparición).
+def reconstruir(entidad, atributo, valor, actuales, miembros, agregar, remover):
+    setattr(entidad, atributo, valor)
+    esperados = {}
+    for miembro in miembros:
+        esperados[miembro.id] = miembro
+    if list(actuales) == list(esperados) and all(actuales[id] is miembro for id, miembro in esperados.items()):
+        return
+    for miembro in list(actuales.values()):
+        remover(miembro)
+    for miembro in miembros:
+        agregar(miembro)
+
+
+# Registro crudo de una línea, como los de lector_datos.iterar_registros, o None
+def leer_registro(linea):
+    match = PATRON_ENTIDAD.match(linea)
+    if match is None:
+        return None
+    tipo = linea[0]
+    if tipo == "j":
+        return ("j", int(match.group("jugador")), match.group("nombre"),
+                int(match.group("edad")), int(match.group("rendimiento")))
+    if tipo == "e":
+        referencias = leer_referencias(match.group("jugadores"), "j")
+        return None if referencias is None else ("e", int(match.group("equipo")), match.group("deporte"), referencias)
+    referencias = leer_referencias(match.group("equipos"), "e")
+    return None if referencias is None else ("s", int(match.group("sede")), match.group("nombre_sede"), referencias)
+
+
+# Texto de cada línea por tipo e id, sin interpretar su contenido, y si el
+# archivo tiene la forma canónica (tipos agrupados en orden, ids sin repetir).
+# La validez de cada línea la comprueban leer_datos o leer_registro.
+def leer_lineas(filepath):
+    lineas = {tipo: {} for tipo in TIPOS}
+    canonico = True
+    tipo_actual = 0
+    with open(filepath, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+            clave = line.partition(" = ")[0]
+            tipo, id = clave[:1], clave[1:]
+            if tipo not in lineas or not id.isdigit():
+                canonico = False
+                continue
+            orden = TIPOS.index(tipo)
+            id = int(id)
+            if orden < tipo_actual or id in lineas[tipo]:
+                canonico = False
+            tipo_actual = max(tipo_actual, orden)
+            lineas[tipo][id] = line
+    return lineas, canonico
+
+
+def escribir_lineas(file, lineas):
+    for tipo in TIPOS:
+        for texto in lineas[tipo].values():
+            file.write(texto)
+            file.write("\n")
+
+
+# Líneas completas del diario a partir del byte posicion, con su número de
+# línea relativo a esa lectura, y la posición hasta donde se leyó
+def leer_diario(ruta, posicion=0):
+    with open(ruta, 'rb') as file:
+        file.seek(posicion)
+        datos = file.read()
+    fin = datos.rfind(b"\n") + 1
+    entradas = []
+    for numero, linea in enumerate(datos[:fin].decode("utf-8").splitlines(), start=1):
+        linea = linea.strip()
+        if linea and linea[0] != '#':
+            entradas.append((numero, linea))
+    return entradas, posicion + fin
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Reprocesa versiones sucesivas de un archivo aplicando solo los cambios.")
+    parser.add_argument("base", help="primera versión del archivo")
+    parser.add_argument("versiones", nargs="*", help="versiones siguientes, en orden")
+    parser.add_argument("--diario", help="diario de cambios a aplicar después de las versiones")
+    parser.add_argument("--salida", help="carpeta donde escribir el reporte de cada paso")
+    parser.add_argument("--verificar", action="store_true", help="comparar cada reporte con el procesamiento completo")
+    parser.add_argument("--instantanea", action="store_true", help="usar y crear instantáneas binarias (.snap junto a cada entrada)")
+    opciones = parser.parse_args(argumentos)
+
+    usar_cache = opciones.instantanea
+    if opciones.salida:
+        os.makedirs(opciones.salida, exist_ok=True)
+
+    pasos = [opciones.base] + opciones.versiones + ([opciones.diario] if opciones.diario else [])
+    print(f"{'paso':<4}  {'entrada':<30}  {'modo':<12}  {'cambios':>8}  {'aplicar s':>10}  {'reporte s':>10}  verificación")
+    procesador = None
+    diferentes = 0
+    for numero, entrada in enumerate(pasos):
+        if procesador is None:
+            inicio = time.perf_counter()
+            procesador = ProcesadorIncremental(entrada, usar_cache=usar_cache)
+            paso = procesador.registrar("completo", None, inicio)
+        elif entrada == opciones.diario and numero == len(pasos) - 1:
+            paso = procesador.aplicar_diario(entrada)
+        else:
+            paso = procesador.procesar_version(entrada, usar_cache)
+
+        inicio = time.perf_counter()
+        reporte = procesador.generar_salida()
+        segundos = time.perf_counter() - inicio
+
+        verificacion = ""
+        if opciones.verificar:
+            coincide = reporte == procesador.reporte_completo(None if entrada == opciones.diario else entrada)
+            diferentes += not coincide
+            verificacion = "igual" if coincide else "DIFERENTE"
+        if opciones.salida:
+            with open(os.path.join(opciones.salida, f"paso_{numero}.reporte.txt"), 'w', encoding='utf-8') as file:
+                file.write(reporte)
+                file.write("\n")
+
+        cambios = paso["cambios"] if paso["cambios"] is not None else "-"
+        print(f"{numero:<4}  {entrada:<30}  {paso['modo']:<12}  {cambios:>8}  {paso['segundos']:>10.4f}  {segundos:>10.4f}  {verificacion}")
+    return 1 if diferentes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
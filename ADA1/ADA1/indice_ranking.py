@@ -0,0 +1,287 @@
+import heapq
+import math
+from itertools import islice
+
+from instrumentacion import contar
+
+#Índice de ranking por conteo compartido por las dos soluciones.
+#El rendimiento es un entero acotado (0 a 100), así que en lugar de
+#comparar jugadores se reparten en una cubeta por valor y, dentro de cada
+#cubeta, en sub-cubetas por edad para el desempate (rendimiento, -edad).
+#Un ranking completo cuesta O(n + rango) y las altas, bajas y cambios de
+#rendimiento cuestan O(1). Si aparece un valor fuera del dominio se
+#recurre a un ordenamiento por comparación.
+
+RENDIMIENTO_MINIMO = 0
+RENDIMIENTO_MAXIMO = 100
+
+
+def en_dominio(rendimiento, minimo=RENDIMIENTO_MINIMO, maximo=RENDIMIENTO_MAXIMO):
+    return isinstance(rendimiento, int) and minimo <= rendimiento <= maximo
+
+
+# Counting sort estable de jugadores por rendimiento y, con por_edad, por
+# (rendimiento, -edad). Da el mismo orden que sorted con esa clave (y con
+# reverse). Lanza ValueError si algún rendimiento está fuera del dominio,
+# para que quien llama use su ordenamiento por comparación.
+def counting_sort(jugadores, por_edad=False, reverse=False, minimo=RENDIMIENTO_MINIMO, maximo=RENDIMIENTO_MAXIMO):
+    cubetas = [[] for _ in range(maximo - minimo + 1)]
+    for jugador in jugadores:
+        rendimiento = jugador.rendimiento
+        if not en_dominio(rendimiento, minimo, maximo):
+            raise ValueError(f"Rendimiento fuera del dominio [{minimo}, {maximo}]: {rendimiento!r}")
+        cubetas[rendimiento - minimo].append(jugador)
+
+    if reverse:
+        cubetas.reverse()
+
+    resultado = []
+    for cubeta in cubetas:
+        if por_edad and len(cubeta) > 1:
+            grupos = {}
+            for jugador in cubeta:
+                grupos.setdefault(jugador.edad, []).append(jugador)
+            # En orden ascendente de -edad van primero los mayores
+            for edad in sorted(grupos, reverse=not reverse):
+                resultado.extend(grupos[edad])
+        else:
+            resultado.extend(cubeta)
+    contar("counting_sort.llamadas")
+    contar("counting_sort.elementos", len(resultado))
+    return resultado
+
+
+# Números de orden de las claves de un diccionario: cada clave nueva recibe
+# uno mayor que todos los anteriores, una clave reemplazada conserva el suyo
+# (igual que su lugar en el diccionario) y quitar una no cambia los demás.
+# Comparan igual que las posiciones en el diccionario.
+class NumeracionOrden:
+    __slots__ = ("numeros", "siguiente")
+
+    def __init__(self, claves=()):
+        self.numeros = {clave: numero for numero, clave in enumerate(claves)}
+        self.siguiente = len(self.numeros)
+
+    def __getitem__(self, clave):
+        return self.numeros[clave]
+
+    def agregar(self, clave):
+        if clave not in self.numeros:
+            self.numeros[clave] = self.siguiente
+            self.siguiente += 1
+
+    def quitar(self, clave):
+        del self.numeros[clave]
+
+
+# Índice persistente para consultas repetidas sobre el mismo conjunto de
+# jugadores. Cada aparición de un jugador es una entrada con una clave que
+# desempata cuando rendimiento y edad coinciden: por defecto un número de
+# secuencia (el orden de llegada). Quien conoce el recorrido de
+# ranking_jugadores pasa en su lugar la posición de la aparición (sede,
+# equipo, jugador) y cómo identificarla al quitarla, y así los empates
+# quedan en el mismo orden que allí aunque luego se muevan jugadores. Un
+# jugador puede aparecer varias veces (por ejemplo, si está en varios
+# equipos), igual que en ranking_jugadores.
+class IndiceRanking:
+    def __init__(self, jugadores=(), minimo=RENDIMIENTO_MINIMO, maximo=RENDIMIENTO_MAXIMO):
+        self.minimo = minimo
+        self.maximo = maximo
+        # cubetas[rendimiento - minimo]: edad -> {clave: jugador}
+        self.cubetas = [{} for _ in range(maximo - minimo + 1)]
+        self.totales = [0] * (maximo - minimo + 1)
+        self.fuera_de_dominio = {}
+        # id(jugador) -> [rendimiento indexado, edad indexada, {aparición: clave}]
+        self.ubicaciones = {}
+        # Sub-cubetas (cubeta, edad) cuyas entradas ya no están en orden de clave
+        self.desordenadas = set()
+        self.secuencia = 0
+        self.cantidad = 0
+        for jugador in jugadores:
+            self.agregar(jugador)
+
+    def __len__(self):
+        return self.cantidad
+
+    # Sin clave la aparición recibe el siguiente número de secuencia; con
+    # clave, aparicion la identifica (debe ser única para el jugador)
+    def agregar(self, jugador, clave=None, aparicion=None):
+        ubicacion = self.ubicaciones.get(id(jugador))
+        if ubicacion is None:
+            ubicacion = self.ubicaciones[id(jugador)] = [jugador.rendimiento, jugador.edad, {}]
+        else:
+            self.actualizar(jugador)
+        if clave is None:
+            clave = self.secuencia
+            self.secuencia += 1
+        ubicacion[2][clave if aparicion is None else aparicion] = clave
+        self.insertar(ubicacion[0], ubicacion[1], clave, jugador)
+        self.cantidad += 1
+
+    # Quita la aparición indicada del jugador (sin aparicion, la más reciente)
+    # y devuelve su clave
+    def remover(self, jugador, aparicion=None):
+        ubicacion = self.ubicaciones[id(jugador)]
+        if aparicion is None:
+            _, clave = ubicacion[2].popitem()
+        else:
+            clave = ubicacion[2].pop(aparicion)
+        self.quitar(ubicacion[0], ubicacion[1], clave)
+        if not ubicacion[2]:
+            del self.ubicaciones[id(jugador)]
+        self.cantidad -= 1
+        return clave
+
+    # Mueve todas las apariciones del jugador a su rendimiento y edad actuales;
+    # conservan su clave, así que los empates no cambian de lugar
+    def actualizar(self, jugador):
+        ubicacion = self.ubicaciones.get(id(jugador))
+        if ubicacion is None or (ubicacion[0] == jugador.rendimiento and ubicacion[1] == jugador.edad):
+            return
+        for clave in ubicacion[2].values():
+            self.quitar(ubicacion[0], ubicacion[1], clave)
+            self.insertar(jugador.rendimiento, jugador.edad, clave, jugador)
+        ubicacion[0] = jugador.rendimiento
+        ubicacion[1] = jugador.edad
+
+    def insertar(self, rendimiento, edad, clave, jugador):
+        if not en_dominio(rendimiento, self.minimo, self.maximo):
+            self.fuera_de_dominio[clave] = jugador
+            return
+        indice = rendimiento - self.minimo
+        grupo = self.cubetas[indice].setdefault(edad, {})
+        if grupo and next(reversed(grupo)) > clave:
+            self.desordenadas.add((indice, edad))
+        grupo[clave] = jugador
+        self.totales[indice] += 1
+
+    def quitar(self, rendimiento, edad, clave):
+        if not en_dominio(rendimiento, self.minimo, self.maximo):
+            del self.fuera_de_dominio[clave]
+            return
+        indice = rendimiento - self.minimo
+        cubeta = self.cubetas[indice]
+        del cubeta[edad][clave]
+        if not cubeta[edad]:
+            del cubeta[edad]
+            self.desordenadas.discard((indice, edad))
+        self.totales[indice] -= 1
+
+    # Sub-cubeta en orden de clave; solo se reordena si una entrada movida
+    # quedó fuera de lugar
+    def grupo(self, indice, edad):
+        grupo = self.cubetas[indice][edad]
+        if (indice, edad) in self.desordenadas:
+            grupo = self.cubetas[indice][edad] = dict(sorted(grupo.items()))
+            self.desordenadas.discard((indice, edad))
+        return grupo
+
+    # Respaldo por comparación cuando hay valores fuera del dominio
+    def ranking_por_comparacion(self, descendente, por_edad):
+        entradas = sorted(
+            [(clave, jugador) for cubeta in self.cubetas for edad in cubeta for clave, jugador in cubeta[edad].items()]
+            + list(self.fuera_de_dominio.items()),
+            key=lambda entrada: entrada[0])
+        clave = (lambda e: (e[1].rendimiento, -e[1].edad)) if por_edad else (lambda e: e[1].rendimiento)
+        return [jugador for _, jugador in sorted(entradas, key=clave, reverse=descendente)]
+
+    # Ranking completo en O(n + rango). Con por_edad el orden es
+    # (rendimiento, -edad); sin él, solo por rendimiento.
+    def ranking(self, orden="asc", por_edad=True):
+        descendente = validar_orden(orden)
+        if self.fuera_de_dominio:
+            return self.ranking_por_comparacion(descendente, por_edad)
+
+        resultado = []
+        for tramo in self.tramos(range(len(self.cubetas)), descendente, por_edad):
+            resultado.extend(tramo)
+        return resultado
+
+    # Los k primeros del ranking en O(rango + k), sin armar el ranking completo
+    def primeros(self, k, orden="asc", por_edad=True):
+        descendente = validar_orden(orden)
+        if k <= 0:
+            return []
+        if self.fuera_de_dominio:
+            return self.ranking_por_comparacion(descendente, por_edad)[:k]
+
+        resultado = []
+        for tramo in self.tramos(range(len(self.cubetas)), descendente, por_edad):
+            resultado.extend(islice(tramo, k - len(resultado)))
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    # Iterables de jugadores de las cubetas indicadas, en orden de ranking
+    def tramos(self, indices, descendente, por_edad):
+        for indice in (reversed(indices) if descendente else indices):
+            cubeta = self.cubetas[indice]
+            if not cubeta:
+                continue
+            if por_edad:
+                for edad in sorted(cubeta, reverse=not descendente):
+                    yield self.grupo(indice, edad).values()
+            elif len(cubeta) == 1:
+                yield self.grupo(indice, next(iter(cubeta))).values()
+            else:
+                grupos = [self.grupo(indice, edad).items() for edad in list(cubeta)]
+                yield (jugador for _, jugador in heapq.merge(*grupos))
+
+    # Posición (desde 1) de la primera aparición del jugador en el ranking
+    def posicion(self, jugador, orden="asc", por_edad=True):
+        descendente = validar_orden(orden)
+        ubicacion = self.ubicaciones.get(id(jugador))
+        if ubicacion is None:
+            raise ValueError(f"El jugador {jugador.id} no está en el índice")
+        if self.fuera_de_dominio:
+            return self.ranking(orden, por_edad).index(jugador) + 1
+
+        rendimiento, edad, claves = ubicacion
+        clave = min(claves.values())
+        indice = rendimiento - self.minimo
+        cubeta = self.cubetas[indice]
+
+        anteriores = sum(self.totales[indice + 1:]) if descendente else sum(self.totales[:indice])
+        for otra_edad in list(cubeta):
+            grupo = self.grupo(indice, otra_edad)
+            if not por_edad or otra_edad == edad:
+                anteriores += sum(1 for otra in grupo if otra < clave)
+            elif (otra_edad < edad) == descendente:
+                anteriores += len(grupo)
+        return anteriores + 1
+
+    # Jugadores con rendimiento en [minimo, maximo], en tiempo proporcional a
+    # la salida
+    def en_rango(self, minimo, maximo, orden="asc", por_edad=True):
+        descendente = validar_orden(orden)
+        if self.fuera_de_dominio:
+            return [j for j in self.ranking(orden, por_edad) if minimo <= j.rendimiento <= maximo]
+
+        resultado = []
+        desde = max(minimo, self.minimo) - self.minimo
+        hasta = min(maximo, self.maximo) - self.minimo
+        for tramo in self.tramos(range(desde, hasta + 1), descendente, por_edad):
+            resultado.extend(tramo)
+        return resultado
+
+    # Rendimiento en el percentil p (método del rango más cercano) en O(rango)
+    def percentil(self, p):
+        if not 0 <= p <= 100:
+            raise ValueError(f"Percentil fuera de [0, 100]: {p!r}")
+        if not self.cantidad:
+            return None
+        rango = max(1, math.ceil(p / 100 * self.cantidad))
+        if self.fuera_de_dominio:
+            return self.ranking(por_edad=False)[rango - 1].rendimiento
+
+        acumulado = 0
+        for indice, total in enumerate(self.totales):
+            acumulado += total
+            if acumulado >= rango:
+                return indice + self.minimo
+
+
+def validar_orden(orden):
+    if orden not in ("asc", "desc"):
+        raise ValueError(f"Orden desconocido: {orden!r}, se esperaba 'asc' o 'desc'")
+    return orden == "desc"
@@ -0,0 +1,367 @@
+import bisect
+
+from indice_ranking import IndiceRanking
+
+#Índices secundarios de una asociación, compartidos por las dos soluciones,
+#para consultas que de otro modo recorren sedes -> equipos -> jugadores:
+#
+#- por deporte: sus equipos y un IndiceRanking de sus jugadores;
+#- por edad: listas ordenadas (una general y una por deporte) para rangos
+#  como "el jugador de Futbol más joven con menos de 20 años";
+#- por nombre: un trie para buscar por prefijo;
+#- por id: los objetos Jugador con ese id, y desde ellos (sede, equipo).
+#
+#Se construyen la primera vez que se piden (Asociacion.indices_secundarios)
+#y luego se mantienen con las mismas notificaciones que el índice de ranking,
+#que ahora indican también el equipo: cada aparición de un jugador en un
+#equipo de una sede de la asociación es una "ocurrencia", igual que en
+#ranking_jugadores. Si las notificaciones traen la sede y la asociación da
+#una función clave, las ocurrencias se identifican por (sede, equipo) y los
+#rankings por deporte desempatan con esa clave, como el índice de ranking.
+#Los índices por edad, nombre e id tienen a cada jugador una sola vez
+#mientras tenga alguna ocurrencia.
+#Las consultas cuestan O(log n + salida) (edad), O(largo del prefijo +
+#salida) (nombre) y O(rango + k) (ranking por deporte).
+
+
+# Jugadores ordenados por (edad, orden de llegada) en una lista ordenada de
+# claves; altas, bajas y cambios con bisect
+class IndiceEdades:
+    def __init__(self, ordenada=True):
+        self.claves = []
+        self.jugadores = {}
+        # id(jugador) -> clave (edad, secuencia)
+        self.ubicaciones = {}
+        self.secuencia = 0
+        # Al construir el índice las claves se agregan al final y se ordenan
+        # una sola vez (ordenar), en lugar de un insort por jugador
+        self.ordenada = ordenada
+
+    def __len__(self):
+        return len(self.claves)
+
+    def agregar(self, jugador):
+        clave = self.ubicaciones[id(jugador)] = (jugador.edad, self.secuencia)
+        self.secuencia += 1
+        self.jugadores[clave[1]] = jugador
+        if self.ordenada:
+            bisect.insort(self.claves, clave)
+        else:
+            self.claves.append(clave)
+
+    def ordenar(self):
+        if not self.ordenada:
+            self.claves.sort()
+            self.ordenada = True
+
+    def remover(self, jugador):
+        clave = self.ubicaciones.pop(id(jugador))
+        del self.claves[bisect.bisect_left(self.claves, clave)]
+        del self.jugadores[clave[1]]
+
+    # Conserva la secuencia, así que entre iguales edades no cambia de lugar
+    def actualizar(self, jugador):
+        clave = self.ubicaciones[id(jugador)]
+        if clave[0] == jugador.edad:
+            return
+        del self.claves[bisect.bisect_left(self.claves, clave)]
+        clave = self.ubicaciones[id(jugador)] = (jugador.edad, clave[1])
+        bisect.insort(self.claves, clave)
+
+    # Jugadores con edad en [minimo, maximo] (None = sin límite), de menor a
+    # mayor edad o al revés, a lo sumo k
+    def en_rango(self, minimo=None, maximo=None, k=None, orden="asc"):
+        inicio = 0 if minimo is None else bisect.bisect_left(self.claves, (minimo,))
+        fin = len(self.claves) if maximo is None else bisect.bisect_left(self.claves, (maximo + 1,))
+        if k is not None:
+            k = max(k, 0)
+            if orden == "asc":
+                fin = min(fin, inicio + k)
+            else:
+                inicio = max(inicio, fin - k)
+        claves = self.claves[inicio:fin]
+        if orden == "desc":
+            claves.reverse()
+        return [self.jugadores[secuencia] for _, secuencia in claves]
+
+
+class NodoTrie:
+    __slots__ = ("hijos", "jugadores", "cantidad")
+
+    def __init__(self):
+        self.hijos = {}
+        # Jugadores cuyo nombre termina en este nodo, por id(jugador)
+        self.jugadores = {}
+        # Jugadores en todo el subárbol; un nodo sin jugadores se elimina
+        self.cantidad = 0
+
+
+class TrieNombres:
+    def __init__(self):
+        self.raiz = NodoTrie()
+
+    def agregar(self, nombre, jugador):
+        nodo = self.raiz
+        nodo.cantidad += 1
+        for letra in nombre:
+            hijo = nodo.hijos.get(letra)
+            if hijo is None:
+                hijo = nodo.hijos[letra] = NodoTrie()
+            nodo = hijo
+            nodo.cantidad += 1
+        nodo.jugadores[id(jugador)] = jugador
+
+    def remover(self, nombre, jugador):
+        camino = [self.raiz]
+        for letra in nombre:
+            camino.append(camino[-1].hijos[letra])
+        del camino[-1].jugadores[id(jugador)]
+        for nodo in camino:
+            nodo.cantidad -= 1
+        for posicion in range(len(nombre), 0, -1):
+            if camino[posicion].cantidad:
+                break
+            del camino[posicion - 1].hijos[nombre[posicion - 1]]
+
+    def nodo(self, prefijo):
+        nodo = self.raiz
+        for letra in prefijo:
+            nodo = nodo.hijos.get(letra)
+            if nodo is None:
+                return None
+        return nodo
+
+    def contar(self, prefijo):
+        nodo = self.nodo(prefijo)
+        return nodo.cantidad if nodo is not None else 0
+
+    # Jugadores cuyo nombre empieza con prefijo, en orden alfabético del
+    # nombre (y de llegada entre nombres iguales), a lo sumo k. Cada nodo
+    # visitado tiene jugadores debajo, así que el costo es proporcional a la salida.
+    def buscar(self, prefijo, k=None):
+        nodo = self.nodo(prefijo)
+        if nodo is None or (k is not None and k <= 0):
+            return []
+        resultado = []
+        pendientes = [nodo]
+        while pendientes:
+            nodo = pendientes.pop()
+            resultado.extend(nodo.jugadores.values())
+            if k is not None and len(resultado) >= k:
+                return resultado[:k]
+            pendientes.extend(nodo.hijos[letra] for letra in sorted(nodo.hijos, reverse=True))
+        return resultado
+
+
+class IndicesSecundarios:
+    # equipos: (equipo, jugadores) o (equipo, jugadores, sede) de cada equipo
+    # de cada sede; clave(sede, equipo, jugador) da el desempate de una ocurrencia
+    def __init__(self, asociacion, equipos=(), clave=None):
+        self.asociacion = asociacion
+        self.clave = clave
+        # deporte -> {id(equipo): [equipo, ocurrencias]}
+        self.equipos_por_deporte = {}
+        # id(equipo) -> [deporte indexado, ocurrencias del equipo, ocurrencias de sus jugadores]
+        self.equipos = {}
+        # deporte -> IndiceRanking de las ocurrencias de sus jugadores
+        self.rankings = {}
+        # deporte (None = todos) -> IndiceEdades
+        self.construyendo = True
+        self.edades = {None: IndiceEdades(ordenada=False)}
+        self.nombres = TrieNombres()
+        # id -> {id(jugador): jugador}
+        self.por_id = {}
+        # id(jugador) -> [jugador, nombre indexado, ocurrencias, {deporte: ocurrencias}]
+        self.jugadores = {}
+        for entrada in equipos:
+            self.agregar_equipo(*entrada)
+        for edades in self.edades.values():
+            edades.ordenar()
+        self.construyendo = False
+
+    # --- Mantenimiento ---
+
+    def agregar_equipo(self, equipo, jugadores, sede=None):
+        self.equipo_modificado(equipo, 1)
+        for jugador in jugadores:
+            self.jugador_modificado(jugador, 1, equipo, sede)
+
+    def remover_equipo(self, equipo, jugadores, sede=None):
+        for jugador in jugadores:
+            self.jugador_modificado(jugador, -1, equipo, sede)
+        self.equipo_modificado(equipo, -1)
+
+    # diferencia 1 o -1: el equipo entró o salió de una sede; 0: cambiaron sus
+    # datos (por ejemplo el deporte) y se reubica con todos sus jugadores
+    def equipo_modificado(self, equipo, diferencia):
+        if diferencia > 0:
+            registro = self.registrar_equipo(equipo)
+            registro[1] += 1
+            entrada = self.equipos_por_deporte.setdefault(registro[0], {}).setdefault(id(equipo), [equipo, 0])
+            entrada[1] += 1
+        elif diferencia < 0:
+            registro = self.equipos[id(equipo)]
+            registro[1] -= 1
+            equipos = self.equipos_por_deporte[registro[0]]
+            equipos[id(equipo)][1] -= 1
+            if not equipos[id(equipo)][1]:
+                del equipos[id(equipo)]
+                if not equipos:
+                    del self.equipos_por_deporte[registro[0]]
+            self.liberar_equipo(equipo)
+        elif id(equipo) in self.equipos and self.equipos[id(equipo)][0] != equipo.deporte:
+            self.cambiar_deporte(equipo)
+
+    def jugador_modificado(self, jugador, diferencia, equipo=None, sede=None):
+        aparicion = None if sede is None else (id(sede), id(equipo))
+        if diferencia > 0:
+            registro = self.registrar_equipo(equipo)
+            registro[2] += 1
+            clave = None if aparicion is None or self.clave is None else self.clave(sede, equipo, jugador)
+            self.agregar_ocurrencia(jugador, registro[0], clave, aparicion)
+        elif diferencia < 0:
+            registro = self.equipos[id(equipo)]
+            registro[2] -= 1
+            self.quitar_ocurrencia(jugador, registro[0], aparicion)
+            self.liberar_equipo(equipo)
+        elif id(jugador) in self.jugadores:
+            self.actualizar_jugador(jugador)
+
+    # Las ocurrencias de un equipo se indexan con el deporte que tenía al
+    # entrar, aunque luego cambie, hasta que se reubica con cambiar_deporte
+    def registrar_equipo(self, equipo):
+        registro = self.equipos.get(id(equipo))
+        if registro is None:
+            registro = self.equipos[id(equipo)] = [equipo.deporte, 0, 0]
+        return registro
+
+    def liberar_equipo(self, equipo):
+        registro = self.equipos[id(equipo)]
+        if not registro[1] and not registro[2]:
+            del self.equipos[id(equipo)]
+
+    def cambiar_deporte(self, equipo):
+        registro = self.equipos[id(equipo)]
+        anterior, ocurrencias = registro[0], registro[1]
+        jugadores = list(equipo.jugadores.values() if isinstance(equipo.jugadores, dict) else equipo.jugadores)
+        # Cada aparición del equipo en una sede aporta una ocurrencia de cada
+        # jugador; con claves cada una pasa al otro deporte con la suya
+        if self.clave is None:
+            apariciones = [None] * ocurrencias
+        else:
+            apariciones = [(id(sede), id(equipo)) for sede in equipo.sedes if self.asociacion in sede.asociaciones]
+        movidas = [(jugador, aparicion, self.quitar_ocurrencia(jugador, anterior, aparicion))
+                   for aparicion in apariciones for jugador in jugadores]
+        if ocurrencias:
+            entrada = self.equipos_por_deporte[anterior].pop(id(equipo))
+            if not self.equipos_por_deporte[anterior]:
+                del self.equipos_por_deporte[anterior]
+            self.equipos_por_deporte.setdefault(equipo.deporte, {})[id(equipo)] = entrada
+        registro[0] = equipo.deporte
+        for jugador, aparicion, clave in movidas:
+            self.agregar_ocurrencia(jugador, equipo.deporte, None if aparicion is None else clave, aparicion)
+
+    def agregar_ocurrencia(self, jugador, deporte, clave=None, aparicion=None):
+        registro = self.jugadores.get(id(jugador))
+        if registro is None:
+            registro = self.jugadores[id(jugador)] = [jugador, jugador.nombre, 0, {}]
+            self.por_id.setdefault(jugador.id, {})[id(jugador)] = jugador
+            self.nombres.agregar(jugador.nombre, jugador)
+            self.edades[None].agregar(jugador)
+        registro[2] += 1
+
+        por_deporte = registro[3]
+        if deporte not in por_deporte:
+            por_deporte[deporte] = 0
+            edades = self.edades.get(deporte)
+            if edades is None:
+                edades = self.edades[deporte] = IndiceEdades(ordenada=not self.construyendo)
+            edades.agregar(jugador)
+        por_deporte[deporte] += 1
+        ranking = self.rankings.get(deporte)
+        if ranking is None:
+            ranking = self.rankings[deporte] = IndiceRanking()
+        ranking.agregar(jugador, clave, aparicion)
+
+    # Devuelve la clave que tenía la ocurrencia en el ranking del deporte
+    def quitar_ocurrencia(self, jugador, deporte, aparicion=None):
+        registro = self.jugadores[id(jugador)]
+        clave = self.rankings[deporte].remover(jugador, aparicion)
+        por_deporte = registro[3]
+        por_deporte[deporte] -= 1
+        if not por_deporte[deporte]:
+            del por_deporte[deporte]
+            self.edades[deporte].remover(jugador)
+
+        registro[2] -= 1
+        if not registro[2]:
+            del self.jugadores[id(jugador)]
+            mismos = self.por_id[jugador.id]
+            del mismos[id(jugador)]
+            if not mismos:
+                del self.por_id[jugador.id]
+            self.nombres.remover(registro[1], jugador)
+            self.edades[None].remover(jugador)
+        return clave
+
+    # Rendimiento, edad o nombre cambiados
+    def actualizar_jugador(self, jugador):
+        registro = self.jugadores[id(jugador)]
+        for deporte in registro[3]:
+            self.rankings[deporte].actualizar(jugador)
+            self.edades[deporte].actualizar(jugador)
+        self.edades[None].actualizar(jugador)
+        if registro[1] != jugador.nombre:
+            self.nombres.remover(registro[1], jugador)
+            self.nombres.agregar(jugador.nombre, jugador)
+            registro[1] = jugador.nombre
+
+    # --- Consultas ---
+
+    def deportes(self):
+        return sorted(set(self.equipos_por_deporte).union(deporte for deporte, ranking in self.rankings.items() if len(ranking)))
+
+    def equipos_de_deporte(self, deporte):
+        return [equipo for equipo, _ in self.equipos_por_deporte.get(deporte, {}).values()]
+
+    # Jugadores del deporte por rendimiento (mayor primero por defecto), a lo
+    # sumo k, en O(rango + k)
+    def jugadores_de_deporte(self, deporte, k=None, orden="desc", por_edad=False):
+        ranking = self.rankings.get(deporte)
+        if ranking is None:
+            return []
+        if k is None:
+            return ranking.ranking(orden, por_edad)
+        return ranking.primeros(k, orden, por_edad)
+
+    # Jugadores con edad en [minimo, maximo], opcionalmente de un deporte; por
+    # ejemplo el más joven de Futbol con menos de 20 años:
+    # jugadores_por_edad(maximo=19, deporte="Futbol", k=1)
+    def jugadores_por_edad(self, minimo=None, maximo=None, deporte=None, k=None, orden="asc"):
+        if orden not in ("asc", "desc"):
+            raise ValueError(f"Orden desconocido: {orden!r}, se esperaba 'asc' o 'desc'")
+        edades = self.edades.get(deporte)
+        if edades is None:
+            return []
+        return edades.en_rango(minimo, maximo, k, orden)
+
+    def buscar_nombre(self, prefijo, k=None):
+        return self.nombres.buscar(prefijo, k)
+
+    def contar_nombre(self, prefijo):
+        return self.nombres.contar(prefijo)
+
+    def jugadores_con_id(self, jugador_id):
+        return list(self.por_id.get(jugador_id, {}).values())
+
+    # (sede, equipo) de cada aparición del jugador con ese id en la asociación
+    def ubicar(self, jugador_id):
+        ubicaciones = []
+        vistos = set()
+        for jugador in self.jugadores_con_id(jugador_id):
+            for equipo in jugador.equipos:
+                for sede in equipo.sedes:
+                    if self.asociacion in sede.asociaciones and (id(sede), id(equipo)) not in vistos:
+                        vistos.add((id(sede), id(equipo)))
+                        ubicaciones.append((sede, equipo))
+        return ubicaciones
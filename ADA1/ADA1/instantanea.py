@@ -0,0 +1,284 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+
+from instrumentacion import contar
+from lector_datos import iterar_registros, reportar_error
+
+#Instantánea binaria de los registros leídos de un archivo de entrada.
+#Se guarda junto al archivo (input1.txt -> input1.txt.snap) y se abre con
+#mmap, así que cargar un archivo sin cambios no vuelve a pasar por las
+#expresiones regulares. Contiene los mismos registros que entrega
+#iterar_registros, en el mismo orden, y también las líneas ignoradas, que se
+#vuelven a reportar al cargarla para que la salida de error no cambie.
+#Es opcional: las funciones de lectura la usan solo con usar_cache=True y
+#los scripts con --instantanea, para no dejar archivos junto a las entradas.
+#
+#Formato (little endian):
+#   encabezado   ENCABEZADO
+#   registros    REGISTRO * cantidad_registros
+#   referencias  int64 * cantidad_referencias (ids de jugadores o equipos)
+#   textos       uint64 * (cantidad_textos + 1) desplazamientos y luego los
+#                bytes UTF-8 de todos los textos
+#
+#La instantánea se identifica por el tamaño, el mtime y el SHA-256 del
+#archivo de entrada. Si el tamaño coincide pero el mtime no, se compara el
+#hash (un archivo copiado o tocado sin cambios sigue siendo válido). Un
+#CRC32 de todo lo que sigue al encabezado detecta instantáneas corruptas;
+#en cualquier caso inválido se vuelve a leer el texto y se reescribe.
+
+MAGIA = b"ADASNAP\0"
+VERSION = 1
+EXTENSION = ".snap"
+
+# magia, versión, tamaño, mtime_ns, sha256, crc32, cantidad de registros,
+# de referencias y de textos, bytes de textos
+ENCABEZADO = struct.Struct("<8sIQq32sIQQQQ")
+# Registro de ancho fijo: tipo, id, texto, valor_1, valor_2, primera
+# referencia y cantidad de referencias. Para jugadores valor_1 y valor_2 son
+# la edad y el rendimiento; para las líneas ignoradas el id es el número de
+# línea y valor_1 el texto del motivo.
+REGISTRO = struct.Struct("<BqIqqQI")
+REFERENCIA = struct.Struct("<q")
+DESPLAZAMIENTO = struct.Struct("<Q")
+
+TIPOS = {'j': 0, 'e': 1, 's': 2, 'x': 3}
+NOMBRES_TIPOS = {codigo: tipo for tipo, codigo in TIPOS.items()}
+TAMANO_BLOQUE = 1 << 20
+
+
+def ruta_instantanea(filepath):
+    return os.fspath(filepath) + EXTENSION
+
+
+def huella(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for bloque in iter(lambda: file.read(TAMANO_BLOQUE), b''):
+            digest.update(bloque)
+    return digest.digest()
+
+
+# Mismos registros que iterar_registros, usando la instantánea si es válida
+# o creándola mientras se lee el texto
+def iterar_registros_en_cache(filepath, al_error=reportar_error, verificar_hash=False):
+    # Las referencias se leen con el orden de bytes nativo
+    if sys.byteorder != "little":
+        yield from iterar_registros(filepath, al_error)
+        return
+    mapa = abrir_instantanea(filepath, verificar_hash)
+    if mapa is not None:
+        yield from leer_instantanea(mapa, al_error)
+    else:
+        yield from EscritorInstantanea(filepath).registrar(al_error)
+
+
+# mmap de la instantánea o None si no existe, está desactualizada o corrupta
+def abrir_instantanea(filepath, verificar_hash=False):
+    ruta = ruta_instantanea(filepath)
+    try:
+        estado = os.stat(filepath)
+        file = open(ruta, 'rb')
+    except OSError:
+        return None
+
+    with file:
+        try:
+            mapa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError: archivo vacío
+            return None
+
+    if not instantanea_valida(mapa, filepath, estado, verificar_hash):
+        mapa.close()
+        return None
+    return mapa
+
+
+def instantanea_valida(mapa, filepath, estado, verificar_hash):
+    if len(mapa) < ENCABEZADO.size:
+        return False
+    (magia, version, tamano, mtime, firma, crc,
+     registros, referencias, textos, bytes_textos) = ENCABEZADO.unpack_from(mapa)
+    if magia != MAGIA or version != VERSION or tamano != estado.st_size:
+        return False
+
+    esperado = (ENCABEZADO.size + registros * REGISTRO.size + referencias * REFERENCIA.size
+                + (textos + 1) * DESPLAZAMIENTO.size + bytes_textos)
+    if len(mapa) != esperado:
+        return False
+    with memoryview(mapa) as vista, vista[ENCABEZADO.size:] as contenido:
+        if zlib.crc32(contenido) != crc:
+            return False
+
+    if mtime != estado.st_mtime_ns or verificar_hash:
+        if huella(filepath) != firma:
+            return False
+        if mtime != estado.st_mtime_ns:
+            actualizar_mtime(ruta_instantanea(filepath), estado.st_mtime_ns)
+    return True
+
+
+# El contenido no cambió; se guarda el mtime nuevo para no volver a calcular el hash
+def actualizar_mtime(ruta, mtime):
+    desplazamiento = struct.calcsize("<8sIQ")
+    try:
+        with open(ruta, 'r+b') as file:
+            file.seek(desplazamiento)
+            file.write(struct.pack("<q", mtime))
+    except OSError:
+        pass
+
+
+def leer_instantanea(mapa, al_error=reportar_error):
+    try:
+        _, _, _, _, _, _, cantidad_registros, cantidad_referencias, cantidad_textos, _ = ENCABEZADO.unpack_from(mapa)
+        inicio_registros = ENCABEZADO.size
+        inicio_referencias = inicio_registros + cantidad_registros * REGISTRO.size
+        inicio_textos = inicio_referencias + cantidad_referencias * REFERENCIA.size
+        inicio_bytes = inicio_textos + (cantidad_textos + 1) * DESPLAZAMIENTO.size
+
+        # Los textos se decodifican una sola vez; los registros y referencias
+        # se leen directamente del mmap
+        desplazamientos = array('Q', mapa[inicio_textos:inicio_bytes])
+        textos = [
+            mapa[inicio_bytes + desplazamientos[i]:inicio_bytes + desplazamientos[i + 1]].decode('utf-8')
+            for i in range(cantidad_textos)
+        ]
+        contar("instantanea.registros", cantidad_registros)
+
+        vista = memoryview(mapa)
+        seccion_registros = vista[inicio_registros:inicio_referencias]
+        seccion_referencias = vista[inicio_referencias:inicio_textos]
+        referencias = seccion_referencias.cast('q')
+        registros = REGISTRO.iter_unpack(seccion_registros)
+        try:
+            for codigo, id, texto, valor_1, valor_2, primera, cantidad in registros:
+                tipo = NOMBRES_TIPOS[codigo]
+                if tipo == 'j':
+                    yield ('j', id, textos[texto], valor_1, valor_2)
+                elif tipo == 'x':
+                    al_error(id, textos[texto], textos[valor_1])
+                else:
+                    yield (tipo, id, textos[texto], referencias[primera:primera + cantidad].tolist())
+        finally:
+            # Las vistas deben liberarse antes de cerrar el mmap
+            del registros
+            referencias.release()
+            seccion_referencias.release()
+            seccion_registros.release()
+            vista.release()
+    finally:
+        mapa.close()
+
+
+# Lee el archivo de texto con iterar_registros y escribe la instantánea en
+# paralelo: los registros van directo a un archivo temporal y al terminar se
+# agregan las referencias y los textos, se completa el encabezado y se
+# reemplaza la instantánea anterior de forma atómica. Si algo impide
+# escribirla (permisos, disco lleno, ids que no caben en 64 bits) la lectura
+# sigue igual y simplemente no queda instantánea.
+class EscritorInstantanea:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.ruta = ruta_instantanea(filepath)
+        self.temporal = None
+        self.crc = 0
+        self.cantidad_registros = 0
+        self.referencias = array('q')
+        self.textos = {}
+
+    def registrar(self, al_error=reportar_error):
+        try:
+            estado = os.stat(self.filepath)
+            firma = huella(self.filepath)
+            directorio, nombre = os.path.split(os.path.abspath(self.ruta))
+            self.temporal = tempfile.NamedTemporaryFile(dir=directorio, prefix=nombre, suffix=".tmp", delete=False)
+            self.temporal.write(bytes(ENCABEZADO.size))
+        except OSError:
+            self.descartar()
+
+        def anotar_error(ubicacion, linea, motivo):
+            self.escribir_registro('x', ubicacion, linea, self.indice_texto(motivo), 0, ())
+            al_error(ubicacion, linea, motivo)
+
+        completo = False
+        try:
+            for registro in iterar_registros(self.filepath, anotar_error):
+                if registro[0] == 'j':
+                    _, id, nombre, edad, rendimiento = registro
+                    self.escribir_registro('j', id, nombre, edad, rendimiento, ())
+                else:
+                    tipo, id, nombre, referencias = registro
+                    self.escribir_registro(tipo, id, nombre, 0, 0, referencias)
+                yield registro
+            completo = True
+        finally:
+            if completo and self.temporal is not None:
+                self.terminar(estado, firma)
+            self.descartar()
+
+    def indice_texto(self, texto):
+        indice = self.textos.get(texto)
+        if indice is None:
+            indice = self.textos[texto] = len(self.textos)
+        return indice
+
+    def escribir(self, datos):
+        self.temporal.write(datos)
+        self.crc = zlib.crc32(datos, self.crc)
+
+    def escribir_registro(self, tipo, id, texto, valor_1, valor_2, referencias):
+        if self.temporal is None:
+            return
+        try:
+            primera = len(self.referencias)
+            self.referencias.extend(referencias)
+            self.escribir(REGISTRO.pack(TIPOS[tipo], id, self.indice_texto(texto), valor_1, valor_2,
+                                        primera, len(referencias)))
+            self.cantidad_registros += 1
+        except (OSError, OverflowError, struct.error):
+            self.descartar()
+
+    def terminar(self, estado, firma):
+        try:
+            # Si el archivo cambió mientras se leía, la instantánea no es confiable
+            actual = os.stat(self.filepath)
+            if (actual.st_size, actual.st_mtime_ns) != (estado.st_size, estado.st_mtime_ns):
+                return
+
+            self.escribir(self.referencias.tobytes())
+            codificados = [texto.encode('utf-8') for texto in self.textos]
+            desplazamientos = array('Q', [0])
+            for codificado in codificados:
+                desplazamientos.append(desplazamientos[-1] + len(codificado))
+            self.escribir(desplazamientos.tobytes())
+            for codificado in codificados:
+                self.escribir(codificado)
+
+            self.temporal.seek(0)
+            self.temporal.write(ENCABEZADO.pack(
+                MAGIA, VERSION, estado.st_size, estado.st_mtime_ns, firma, self.crc,
+                self.cantidad_registros, len(self.referencias), len(self.textos), desplazamientos[-1]))
+            self.temporal.close()
+            os.replace(self.temporal.name, self.ruta)
+            self.temporal = None
+        except OSError:
+            pass
+
+    def descartar(self):
+        if self.temporal is None:
+            return
+        try:
+            self.temporal.close()
+            os.remove(self.temporal.name)
+        except OSError:
+            pass
+        self.temporal = None
+        self.referencias = array('q')
+        self.textos = {}
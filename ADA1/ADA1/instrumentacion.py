@@ -0,0 +1,217 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+#Instrumentación opcional de las soluciones: tiempo por fase con
+#perf_counter_ns, contadores de las partes calientes (llamadas a la clave y
+#comparaciones de los ordenamientos, llamadas a heapq, líneas leídas,
+#invocaciones de rendimiento_promedio) y, si se pide, el pico de memoria de
+#cada fase con tracemalloc.
+#Apagada no cuesta casi nada: fase() devuelve un contexto vacío, contar() se
+#llama una vez por ordenamiento o lectura (no por comparación) y los
+#métodos contados solo se envuelven mientras está activa.
+#
+#Se activa con activar() o con la variable de entorno ADA_INSTRUMENTACION
+#("1" o "memoria"); en ese caso, al terminar el proceso el resultado se
+#escribe en JSON en la ruta de ADA_INSTRUMENTACION_JSON o en stderr.
+
+VARIABLE_ENTORNO = "ADA_INSTRUMENTACION"
+VARIABLE_SALIDA = "ADA_INSTRUMENTACION_JSON"
+
+ACTIVA = False
+MEMORIA = False
+# nombre -> [nanosegundos, llamadas, pico de memoria adicional en bytes o None]
+FASES = {}
+CONTADORES = {}
+# Fases abiertas, para repartir el pico de memoria entre fases anidadas
+ABIERTAS = []
+# (clase, atributo, contador) registrados y los originales reemplazados
+METODOS = []
+ORIGINALES = {}
+
+SIN_MEDICION = nullcontext()
+
+
+def activar(memoria=False):
+    global ACTIVA, MEMORIA
+    if ACTIVA:
+        return
+    ACTIVA = True
+    MEMORIA = memoria
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    for clase, atributo, contador in METODOS:
+        envolver_metodo(clase, atributo, contador)
+
+
+def desactivar():
+    global ACTIVA, MEMORIA
+    if not ACTIVA:
+        return
+    ACTIVA = False
+    if MEMORIA and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    MEMORIA = False
+    for (clase, atributo), original in ORIGINALES.items():
+        setattr(clase, atributo, original)
+    ORIGINALES.clear()
+
+
+def reiniciar():
+    FASES.clear()
+    CONTADORES.clear()
+
+
+def contar(nombre, cantidad=1):
+    if ACTIVA:
+        CONTADORES[nombre] = CONTADORES.get(nombre, 0) + cantidad
+
+
+# Cuenta las llamadas al método mientras la instrumentación esté activa
+def registrar_metodo(clase, atributo, contador):
+    METODOS.append((clase, atributo, contador))
+    if ACTIVA:
+        envolver_metodo(clase, atributo, contador)
+
+
+def envolver_metodo(clase, atributo, contador):
+    if (clase, atributo) in ORIGINALES:
+        return
+    original = ORIGINALES[(clase, atributo)] = clase.__dict__[atributo]
+
+    @functools.wraps(original)
+    def contado(*args, **kwargs):
+        CONTADORES[contador] = CONTADORES.get(contador, 0) + 1
+        return original(*args, **kwargs)
+
+    setattr(clase, atributo, contado)
+
+
+# Función clave que, con la instrumentación activa, cuenta sus llamadas y
+# las comparaciones entre sus resultados; apagada devuelve key sin cambios
+def clave_contada(key, nombre):
+    if not ACTIVA:
+        return key
+    llamadas = f"{nombre}.llamadas_clave"
+
+    def contada(elemento):
+        CONTADORES[llamadas] = CONTADORES.get(llamadas, 0) + 1
+        return ClaveContada(key(elemento), nombre)
+
+    return contada
+
+
+class ClaveContada:
+    __slots__ = ("valor", "contador")
+
+    def __init__(self, valor, nombre):
+        self.valor = valor
+        self.contador = f"{nombre}.comparaciones"
+
+    def comparar(self):
+        CONTADORES[self.contador] = CONTADORES.get(self.contador, 0) + 1
+
+    def __lt__(self, otra):
+        self.comparar()
+        return self.valor < otra.valor
+
+    def __gt__(self, otra):
+        self.comparar()
+        return self.valor > otra.valor
+
+    def __le__(self, otra):
+        self.comparar()
+        return self.valor <= otra.valor
+
+    def __ge__(self, otra):
+        self.comparar()
+        return self.valor >= otra.valor
+
+    def __eq__(self, otra):
+        return self.valor == otra.valor
+
+    __hash__ = None
+
+
+def fase(nombre):
+    if not ACTIVA:
+        return SIN_MEDICION
+    return MedicionFase(nombre)
+
+
+class MedicionFase:
+    __slots__ = ("nombre", "inicio", "pico", "base")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.pico = 0
+        self.base = 0
+
+    def __enter__(self):
+        if MEMORIA:
+            repartir_pico()
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        ABIERTAS.append(self)
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *excepcion):
+        duracion = time.perf_counter_ns() - self.inicio
+        if MEMORIA:
+            repartir_pico()
+        ABIERTAS.remove(self)
+
+        medicion = FASES.setdefault(self.nombre, [0, 0, None])
+        medicion[0] += duracion
+        medicion[1] += 1
+        if MEMORIA:
+            # Memoria adicional que llegó a usar la fase sobre la que tenía al empezar
+            medicion[2] = max(medicion[2] or 0, self.pico - self.base)
+        return False
+
+
+# El pico desde el último reset vale para todas las fases abiertas
+def repartir_pico():
+    if not tracemalloc.is_tracing():
+        return
+    _, pico = tracemalloc.get_traced_memory()
+    for abierta in ABIERTAS:
+        abierta.pico = max(abierta.pico, pico)
+
+
+def resultado():
+    fases = {
+        nombre: {"segundos": nanosegundos / 1e9, "llamadas": llamadas, "pico_bytes": pico}
+        for nombre, (nanosegundos, llamadas, pico) in FASES.items()
+    }
+    derivados = {}
+    if "parse" in FASES and FASES["parse"][0] and "lector.lineas" in CONTADORES:
+        derivados["lineas_por_segundo"] = CONTADORES["lector.lineas"] / (FASES["parse"][0] / 1e9)
+    return {"fases": fases, "contadores": dict(sorted(CONTADORES.items())), "derivados": derivados}
+
+
+def exportar_json(file):
+    json.dump(resultado(), file, indent=2)
+    file.write("\n")
+
+
+def exportar_al_salir():
+    if not ACTIVA:
+        return
+    ruta = os.environ.get(VARIABLE_SALIDA)
+    if ruta:
+        with open(ruta, 'w') as file:
+            exportar_json(file)
+    else:
+        exportar_json(sys.stderr)
+
+
+if os.environ.get(VARIABLE_ENTORNO, "").strip().lower() not in ("", "0", "no", "false"):
+    activar(memoria=os.environ[VARIABLE_ENTORNO].strip().lower() == "memoria")
+    atexit.register(exportar_al_salir)
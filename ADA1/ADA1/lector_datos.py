@@ -0,0 +1,145 @@
+import re
+import sys
+from itertools import count
+
+from instrumentacion import contar
+
+#Lector de archivos de entrada compartido por las dos soluciones.
+#El archivo se recorre línea por línea (sin readlines), con un único
+#patrón compilado para jugadores, equipos y sedes, y las entidades se
+#entregan con generadores para que la memoria no crezca con el tamaño
+#del archivo.
+
+PATRON_ENTIDAD = re.compile(
+    r'j(?P<jugador>\d+) = Jugador.Jugador\("(?P<nombre>[^"]+)", (?P<edad>\d+), (?P<rendimiento>\d+)\)'
+    r'|e(?P<equipo>\d+) = Equipo.Equipo\("(?P<deporte>[^"]+)", \[(?P<jugadores>.*?)\]\)'
+    r'|s(?P<sede>\d+) = Sede.Sede\("(?P<nombre_sede>[^"]+)", \[(?P<equipos>.*?)\]\)'
+)
+
+
+# Reporte por defecto de las entradas que no se pudieron interpretar; la
+# ubicación es el número de línea o, para referencias sin resolver, "e5"/"s2"
+def reportar_error(ubicacion, linea, motivo):
+    print(f"Entrada {ubicacion} ignorada ({motivo}): {linea}", file=sys.stderr)
+
+
+# Convierte "j1, j2, j3" en [1, 2, 3]; devuelve None si alguna referencia no es válida
+def leer_referencias(texto, prefijo):
+    referencias = []
+    for referencia in texto.split(','):
+        referencia = referencia.strip()
+        if not referencia:
+            continue
+        if referencia[0] != prefijo or not referencia[1:].isdigit():
+            return None
+        referencias.append(int(referencia[1:]))
+    return referencias
+
+
+# Generador de registros crudos, uno por línea válida:
+#   ("j", id, nombre, edad, rendimiento)
+#   ("e", id, deporte, [ids de jugadores])
+#   ("s", id, nombre, [ids de equipos])
+# Las líneas vacías y los comentarios (#) se saltan; cualquier otra línea
+# que no tenga el formato esperado se reporta con al_error.
+def iterar_registros(filepath, al_error=reportar_error):
+    # Las líneas leídas se cuentan al terminar (o al abandonar el generador)
+    numero_linea = 0
+    try:
+        with open(filepath, 'r') as file:
+            for numero_linea, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+
+                # Cada alternativa del patrón empieza con su propia letra,
+                # así que el primer carácter indica cuál coincidió
+                match = PATRON_ENTIDAD.match(line)
+                if match is None:
+                    al_error(numero_linea, line, "formato no reconocido")
+                    continue
+
+                tipo = line[0]
+                if tipo == 'j':
+                    yield ('j', int(match.group('jugador')), match.group('nombre'),
+                           int(match.group('edad')), int(match.group('rendimiento')))
+
+                elif tipo == 'e':
+                    jugadores_ids = leer_referencias(match.group('jugadores'), 'j')
+                    if jugadores_ids is None:
+                        al_error(numero_linea, line, "lista de jugadores inválida")
+                        continue
+                    yield ('e', int(match.group('equipo')), match.group('deporte'), jugadores_ids)
+
+                else:
+                    equipos_ids = leer_referencias(match.group('equipos'), 'e')
+                    if equipos_ids is None:
+                        al_error(numero_linea, line, "lista de equipos inválida")
+                        continue
+                    yield ('s', int(match.group('sede')), match.group('nombre_sede'), equipos_ids)
+
+    finally:
+        contar("lector.lineas", numero_linea)
+
+
+# Generador de entidades ya construidas: ("j" | "e" | "s", id, objeto).
+# Las fábricas reciben (id, nombre, edad, rendimiento), (id, deporte, jugadores)
+# y (id, nombre, equipos). Un equipo o sede que nombra entidades definidas más
+# adelante queda en espera y se entrega apenas se completan sus referencias,
+# sin volver a leer el archivo. Lo que siga incompleto al final se reporta.
+# leer_registros permite cambiar el origen de los registros, por ejemplo por
+# iterar_registros_en_cache de instantanea.py.
+def iterar_entidades(filepath, crear_jugador, crear_equipo, crear_sede, al_error=reportar_error,
+                     leer_registros=iterar_registros):
+    definidos = {'j': {}, 'e': {}}
+    # (tipo, id) todavía sin definir -> registros que lo necesitan
+    esperando = {}
+    # Registros en espera, en orden de llegada: número -> [referencias
+    # faltantes, registro, número]; se quitan al completarse
+    en_espera = {}
+    numeros = count()
+
+    def construir(registro):
+        tipo, id, nombre, referencias = registro
+        miembros = definidos['j' if tipo == 'e' else 'e']
+        if tipo == 'e':
+            return crear_equipo(id, nombre, [miembros[r] for r in referencias])
+        return crear_sede(id, nombre, [miembros[r] for r in referencias])
+
+    def publicar(tipo, id, entidad):
+        # Registra la entidad y libera, en cascada, los registros que la esperaban
+        listos = [(tipo, id, entidad)]
+        while listos:
+            tipo, id, entidad = listos.pop()
+            if tipo in definidos:
+                definidos[tipo][id] = entidad
+            yield tipo, id, entidad
+            for pendiente in esperando.pop((tipo, id), ()):
+                pendiente[0] -= 1
+                if pendiente[0] == 0:
+                    registro = pendiente[1]
+                    del en_espera[pendiente[2]]
+                    listos.append((registro[0], registro[1], construir(registro)))
+
+    for registro in leer_registros(filepath, al_error):
+        if registro[0] == 'j':
+            _, id, nombre, edad, rendimiento = registro
+            yield from publicar('j', id, crear_jugador(id, nombre, edad, rendimiento))
+            continue
+
+        tipo, id, nombre, referencias = registro
+        tipo_referencia = 'j' if tipo == 'e' else 'e'
+        faltantes = {r for r in referencias if r not in definidos[tipo_referencia]}
+        if not faltantes:
+            yield from publicar(tipo, id, construir(registro))
+            continue
+
+        pendiente = [len(faltantes), registro, next(numeros)]
+        en_espera[pendiente[2]] = pendiente
+        for r in faltantes:
+            esperando.setdefault((tipo_referencia, r), []).append(pendiente)
+
+    for _, (tipo, id, nombre, referencias), _ in en_espera.values():
+        tipo_referencia = 'j' if tipo == 'e' else 'e'
+        sin_definir = ', '.join(f"{tipo_referencia}{r}" for r in referencias if r not in definidos[tipo_referencia])
+        al_error(f"{tipo}{id}", nombre, f"referencias sin definir: {sin_definir}")
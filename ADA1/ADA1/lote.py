@@ -0,0 +1,194 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import instrumentacion
+from almacen_columnar import escribir_reporte_columnar
+from lector_datos import reportar_error
+from ranking_externo import escribir_reporte_externo
+from reporte import FORMATOS
+from soluciones import ARCHIVOS, cargar_solucion
+
+#Procesamiento por lotes: genera el reporte de muchos archivos de entrada en
+#una sola ejecución. Los archivos se reparten en un pool de hilos o de
+#procesos; cada proceso importa la solución una vez y la reutiliza para todos
+#sus archivos. Cada reporte se escribe directamente en su propio archivo de
+#salida (texto, JSON lines o CSV) y al final se imprime el tiempo de cada
+#archivo y el total. Con --instrumentar cada resultado lleva además las
+#fases y contadores de instrumentacion.py. Con --memoria-mb el reporte de la
+#solución 2 se genera con ranking_externo.py, ordenando el ranking fuera de
+#memoria con ese presupuesto, y con --columnar sobre el almacén columnar de
+#almacen_columnar.py.
+#
+#   python lote.py "exportes/*.txt" --solucion 2 --pool procesos --salida reportes
+
+POOLS = {"hilos": ThreadPoolExecutor, "procesos": ProcessPoolExecutor}
+EXTENSIONES = {"texto": ".txt", "jsonl": ".jsonl", "csv": ".csv"}
+
+
+# Expande los patrones en orden, sin repetir archivos; un patrón sin
+# coincidencias que no es un archivo existente se devuelve como faltante
+def expandir_entradas(patrones):
+    archivos = []
+    faltantes = []
+    vistos = set()
+    for patron in patrones:
+        coincidencias = sorted(glob.glob(patron)) or ([patron] if os.path.isfile(patron) else [])
+        if not coincidencias:
+            faltantes.append(patron)
+        for archivo in coincidencias:
+            clave = os.path.abspath(archivo)
+            if clave not in vistos and os.path.isfile(archivo):
+                vistos.add(clave)
+                archivos.append(archivo)
+    return archivos, faltantes
+
+
+# Un archivo de salida por entrada; si dos entradas de carpetas distintas
+# tienen el mismo nombre se numeran (_2, _3, ...) saltando los nombres ya
+# asignados, así que nunca dos entradas comparten salida
+def rutas_salida(archivos, directorio, formato="texto"):
+    usados = set()
+    siguiente = {}
+    rutas = []
+    for archivo in archivos:
+        base = os.path.splitext(os.path.basename(archivo))[0]
+        nombre = base
+        numero = siguiente.get(base, 1)
+        while nombre in usados:
+            numero += 1
+            nombre = f"{base}_{numero}"
+        siguiente[base] = numero
+        usados.add(nombre)
+        rutas.append(os.path.join(directorio, f"{nombre}.reporte{EXTENSIONES[formato]}"))
+    return rutas
+
+
+# Tarea de cada archivo; se ejecuta en el hilo o proceso del pool. Devuelve
+# solo datos pequeños (el reporte queda escrito en disco).
+def procesar_archivo(numero, filepath, salida, usar_cache=False, formato="texto", instrumentar=False, memoria_mb=None,
+                     columnar=False):
+    inicio = time.perf_counter()
+    if instrumentar:
+        instrumentacion.activar()
+        instrumentacion.reiniciar()
+    try:
+        modulo = cargar_solucion(numero)
+        # Los avisos de líneas ignoradas llevan el archivo para no mezclarse
+        al_error = lambda ubicacion, linea, motivo: reportar_error(f"{filepath}:{ubicacion}", linea, motivo)
+        with open(salida, 'w', encoding='utf-8', newline='' if formato == "csv" else None) as file:
+            if memoria_mb is not None:
+                escribir_reporte_externo(filepath, file, memoria_mb, al_error=al_error, usar_cache=usar_cache)
+            elif columnar:
+                escribir_reporte_columnar(filepath, file, al_error=al_error, usar_cache=usar_cache)
+            else:
+                modulo.escribir_reporte(filepath, file, formato, al_error=al_error, usar_cache=usar_cache)
+            if formato == "texto":
+                file.write("\n")
+        error = None
+    except Exception as excepcion:
+        error = f"{type(excepcion).__name__}: {excepcion}"
+    return {
+        "entrada": filepath,
+        "salida": salida if error is None else None,
+        "segundos": time.perf_counter() - inicio,
+        "error": error,
+        "instrumentacion": instrumentacion.resultado() if instrumentar else None,
+    }
+
+
+def procesar_lote(archivos, numero, directorio, pool="procesos", workers=None, usar_cache=False, formato="texto",
+                  instrumentar=False, memoria_mb=None, columnar=False):
+    if pool not in POOLS:
+        raise ValueError(f"Pool desconocido: {pool!r}, opciones: {', '.join(POOLS)}")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r}, opciones: {', '.join(FORMATOS)}")
+    if memoria_mb is not None and (numero != 2 or formato != "texto"):
+        raise ValueError("El ranking fuera de memoria solo genera el reporte de texto de la solución 2")
+    if columnar and (numero != 2 or formato != "texto" or memoria_mb is not None):
+        raise ValueError("El almacén columnar solo genera el reporte de texto de la solución 2, sin --memoria-mb")
+    # Se importa una vez antes de crear el pool: los hilos la comparten y los
+    # procesos creados con fork la heredan ya cargada
+    cargar_solucion(numero)
+    os.makedirs(directorio, exist_ok=True)
+    salidas = rutas_salida(archivos, directorio, formato)
+    resultados = [None] * len(archivos)
+
+    inicio = time.perf_counter()
+    with POOLS[pool](max_workers=workers) as ejecutor:
+        futuros = {
+            ejecutor.submit(procesar_archivo, numero, archivo, salida, usar_cache, formato, instrumentar, memoria_mb,
+                            columnar): posicion
+            for posicion, (archivo, salida) in enumerate(zip(archivos, salidas))
+        }
+        for futuro in as_completed(futuros):
+            resultados[futuros[futuro]] = futuro.result()
+    total = time.perf_counter() - inicio
+
+    return resultados, total
+
+
+def imprimir_resumen(resultados, total):
+    ancho = max((len(resultado["entrada"]) for resultado in resultados), default=7)
+    print(f"{'archivo':<{ancho}}  {'segundos':>10}  estado")
+    for resultado in resultados:
+        estado = "ok" if resultado["error"] is None else f"ERROR {resultado['error']}"
+        print(f"{resultado['entrada']:<{ancho}}  {resultado['segundos']:>10.4f}  {estado}")
+
+    tiempos = [resultado["segundos"] for resultado in resultados]
+    correctos = sum(resultado["error"] is None for resultado in resultados)
+    print()
+    print(f"Archivos: {len(resultados)} ({correctos} ok, {len(resultados) - correctos} con error)")
+    if tiempos:
+        print(f"Tiempo por archivo: suma {sum(tiempos):.4f} s, promedio {sum(tiempos) / len(tiempos):.4f} s, máximo {max(tiempos):.4f} s")
+    print(f"Tiempo total del lote: {total:.4f} s")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera los reportes de muchos archivos de entrada en una sola ejecución.")
+    parser.add_argument("entradas", nargs="+", help="archivos o patrones glob (entre comillas)")
+    parser.add_argument("--solucion", type=int, choices=sorted(ARCHIVOS), default=2)
+    parser.add_argument("--pool", choices=sorted(POOLS), default="procesos")
+    parser.add_argument("--workers", type=int, default=None, help="tamaño del pool (por defecto el de concurrent.futures)")
+    parser.add_argument("--salida", default="reportes", help="carpeta de los reportes")
+    parser.add_argument("--formato", choices=FORMATOS, default="texto")
+    parser.add_argument("--instantanea", action="store_true", help="usar y crear instantáneas binarias (.snap junto a cada entrada)")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="agregar fases y contadores por archivo al JSON (con --pool hilos se mezclan entre archivos)")
+    parser.add_argument("--memoria-mb", type=float, default=None,
+                        help="ordenar el ranking fuera de memoria con este presupuesto, que no incluye la tabla "
+                             "compacta de jugadores (solución 2, formato texto)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="leer en el almacén columnar compacto (solución 2, formato texto)")
+    parser.add_argument("--json", help="ruta donde guardar el resumen de tiempos en JSON")
+    opciones = parser.parse_args(argumentos)
+    if opciones.memoria_mb is not None and (opciones.solucion != 2 or opciones.formato != "texto"):
+        parser.error("--memoria-mb solo se puede usar con --solucion 2 y --formato texto")
+    if opciones.columnar and (opciones.solucion != 2 or opciones.formato != "texto" or opciones.memoria_mb is not None):
+        parser.error("--columnar solo se puede usar con --solucion 2 y --formato texto, sin --memoria-mb")
+
+    archivos, faltantes = expandir_entradas(opciones.entradas)
+    for patron in faltantes:
+        print(f"Sin archivos para {patron}", file=sys.stderr)
+    if not archivos:
+        return 1
+
+    resultados, total = procesar_lote(archivos, opciones.solucion, opciones.salida, opciones.pool,
+                                      opciones.workers, opciones.instantanea, opciones.formato, opciones.instrumentar,
+                                      opciones.memoria_mb, opciones.columnar)
+    imprimir_resumen(resultados, total)
+
+    if opciones.json:
+        with open(opciones.json, 'w') as file:
+            json.dump({"solucion": opciones.solucion, "pool": opciones.pool, "total_segundos": total,
+                       "archivos": resultados}, file, indent=2)
+
+    return 0 if not faltantes and all(resultado["error"] is None for resultado in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
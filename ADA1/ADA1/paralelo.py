@@ -0,0 +1,68 @@
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentacion import contar
+
+#Utilidades para evaluar la asociación por sedes en varios procesos.
+#Cada sede es independiente hasta el ranking y las estadísticas globales,
+#así que se reparte en lotes contiguos (para conservar el orden), cada
+#proceso devuelve resultados parciales con datos planos (ids y números) y
+#el proceso principal los combina.
+
+# Lotes por proceso: algo más de uno para repartir mejor sedes de distinto tamaño
+LOTES_POR_WORKER = 4
+
+# Elementos que heredan los procesos creados con "fork"
+COMPARTIDOS = None
+
+
+# Divide la secuencia en lotes contiguos, sin cambiar el orden de los elementos
+def dividir_en_lotes(elementos, workers):
+    cantidad = max(1, min(len(elementos), workers * LOTES_POR_WORKER))
+    tamano, sobrante = divmod(len(elementos), cantidad)
+    lotes = []
+    inicio = 0
+    for i in range(cantidad):
+        fin = inicio + tamano + (1 if i < sobrante else 0)
+        lotes.append(elementos[inicio:fin])
+        inicio = fin
+    return lotes
+
+
+def evaluar_lote(argumentos):
+    funcion, importar, lote = argumentos
+    if isinstance(lote, range):
+        return funcion([COMPARTIDOS[i] for i in lote])
+    return funcion([importar(datos) for datos in lote])
+
+
+# Aplica funcion a lotes de elementos en un pool de procesos; los resultados
+# vuelven en el orden de los lotes. Con "fork" los procesos heredan los
+# elementos ya construidos y solo reciben su rango de índices; si no está
+# disponible, cada elemento se envía como exportar(elemento) y se reconstruye
+# con importar en el proceso hijo.
+def mapear_en_procesos(funcion, elementos, workers, exportar, importar):
+    global COMPARTIDOS
+    if "fork" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("fork")
+        COMPARTIDOS = elementos
+        lotes = dividir_en_lotes(range(len(elementos)), workers)
+    else:
+        contexto = None
+        lotes = dividir_en_lotes([exportar(elemento) for elemento in elementos], workers)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+            return list(pool.map(evaluar_lote, [(funcion, importar, lote) for lote in lotes]))
+    finally:
+        COMPARTIDOS = None
+
+
+# Mezcla k-way de rankings parciales [(rendimiento, id), ...] ya ordenados.
+# heapq.merge es estable entre entradas (en un empate sale primero el de la
+# entrada anterior), así que el resultado es igual al ranking global.
+def mezclar_rankings(rankings, reverse=False):
+    contar("heapq.merge.llamadas")
+    contar("heapq.merge.elementos", sum(len(ranking) for ranking in rankings))
+    return [id for _, id in heapq.merge(*rankings, key=lambda entrada: entrada[0], reverse=reverse)]
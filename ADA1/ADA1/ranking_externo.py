@@ -0,0 +1,348 @@
+import argparse
+import heapq
+import io
+import os
+import sys
+import tempfile
+from array import array
+from itertools import chain, islice
+from operator import itemgetter
+
+from estadisticas import AcumuladorEstadisticas
+from instantanea import iterar_registros_en_cache
+from instrumentacion import contar, fase
+from lector_datos import iterar_entidades, iterar_registros, reportar_error
+from reporte import escribir_unidos, formatear_estadisticas
+from soluciones import cargar_solucion
+
+#Reporte de la solución 2 para asociaciones cuyos objetos y ranking en
+#memoria no caben. En lugar de objetos Jugador/Equipo/Sede enlazados y de un
+#ranking armado en una sola lista, el archivo se lee a una tabla compacta (arrays de ids,
+#edades y rendimientos, y los nombres en un solo bloque de bytes) y el
+#ranking se ordena fuera de memoria: las apariciones de los jugadores, en el
+#mismo orden en que las recorre ranking_jugadores, se juntan en bloques del
+#tamaño que permite el presupuesto de memoria; cada bloque se ordena y se
+#escribe en un archivo temporal de registros binarios de ancho fijo (una
+#"corrida") y las corridas se mezclan con heapq.merge, por grupos de FAN_IN
+#si son muchas. Las estadísticas se acumulan en la misma pasada que arma las
+#corridas.
+#
+#El orden es estable igual que en memoria: cada bloque se ordena con sort
+#(estable) y heapq.merge desempata por el número de corrida, que sigue el
+#orden de llegada. Por eso el reporte es idéntico al de escribir_reporte de
+#la solución 2 y, con por_edad, el desempate (rendimiento, -edad) coincide
+#con el de counting_sort. Los números deben caber en 64 bits.
+#
+#El presupuesto de memoria cubre solo el ordenamiento del ranking (los
+#bloques y las lecturas de las corridas), no la carga: la tabla compacta y
+#las sedes y equipos quedan en memoria completos, porque las secciones de
+#cada sede del reporte los necesitan, y ocupan unos 40 bytes por jugador
+#más el diccionario de ids a índices que mantiene el lector. La memoria
+#total crece entonces con la cantidad de jugadores; lo que evita este modo
+#es el objeto por jugador y la lista del ranking completo.
+#
+#   python ranking_externo.py federacion.txt --memoria-mb 256 --salida reporte.txt
+
+MEMORIA_MB = 64
+# Memoria estimada de cada aparición mientras se ordena su bloque: la tupla,
+# sus enteros y la clave de ordenamiento
+BYTES_POR_ENTRADA = 160
+# Corridas que se mezclan a la vez; con más se hacen pasadas intermedias
+FAN_IN = 64
+# Cada registro de una corrida son 3 int64 en el orden de bytes de la
+# máquina: rendimiento, edad e id del jugador
+CAMPOS = 3
+
+
+class TablaJugadores:
+    def __init__(self):
+        self.ids = array('q')
+        self.edades = array('q')
+        self.rendimientos = array('q')
+        # Nombres en UTF-8 uno tras otro; el i-ésimo va de desplazamientos[i] a desplazamientos[i + 1]
+        self.desplazamientos = array('Q', [0])
+        self.nombres = bytearray()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Fábrica de jugadores para el lector: devuelve la posición en la tabla
+    def agregar(self, id, nombre, edad, rendimiento):
+        indice = len(self.ids)
+        try:
+            self.ids.append(id)
+            self.edades.append(edad)
+            self.rendimientos.append(rendimiento)
+        except OverflowError:
+            raise ValueError(f"El jugador {id} tiene valores que no caben en 64 bits") from None
+        self.nombres += nombre.encode('utf-8')
+        self.desplazamientos.append(len(self.nombres))
+        return indice
+
+    def nombre(self, indice):
+        return self.nombres[self.desplazamientos[indice]:self.desplazamientos[indice + 1]].decode('utf-8')
+
+
+# Jugador de la tabla con la interfaz que usan AcumuladorEstadisticas y el
+# texto de las estadísticas
+class VistaJugador:
+    __slots__ = ("tabla", "indice", "edad", "rendimiento")
+
+    def __init__(self, tabla, indice):
+        self.tabla = tabla
+        self.indice = indice
+        self.edad = tabla.edades[indice]
+        self.rendimiento = tabla.rendimientos[indice]
+
+    @property
+    def id(self):
+        return self.tabla.ids[self.indice]
+
+    @property
+    def nombre(self):
+        return self.tabla.nombre(self.indice)
+
+
+# Equipo y sede con las mismas reglas que crear_equipo y crear_sede de la
+# solución 2: un id repetido reemplaza al anterior en su misma posición
+class EquipoCompacto:
+    __slots__ = ("id", "deporte", "miembros", "suma_rendimiento")
+
+    def __init__(self, tabla, id, deporte, jugadores):
+        miembros = {}
+        for indice in jugadores:
+            miembros[tabla.ids[indice]] = indice
+        self.id = id
+        self.deporte = deporte
+        self.miembros = array('q', miembros.values())
+        self.suma_rendimiento = sum(tabla.rendimientos[indice] for indice in self.miembros)
+
+    def rendimiento_promedio(self):
+        if not self.miembros:
+            return 0
+        return self.suma_rendimiento / len(self.miembros)
+
+
+class SedeCompacta:
+    __slots__ = ("id", "nombre", "equipos", "suma_promedios")
+
+    def __init__(self, id, nombre, equipos):
+        por_id = {}
+        for equipo in equipos:
+            por_id[equipo.id] = equipo
+        self.id = id
+        self.nombre = nombre
+        self.equipos = list(por_id.values())
+        # Misma suma, en el mismo orden, que Sede.recalcular_suma
+        self.suma_promedios = sum(equipo.rendimiento_promedio() for equipo in self.equipos)
+
+    def rendimiento_promedio(self):
+        if not self.equipos:
+            return 0
+        return self.suma_promedios
+
+
+# Tabla de jugadores y sedes del archivo ({id: SedeCompacta}, en el orden de leer_datos)
+def leer_compacto(filepath, al_error=reportar_error, usar_cache=False):
+    tabla = TablaJugadores()
+    sedes = {}
+    leer_registros = iterar_registros_en_cache if usar_cache else iterar_registros
+    crear_equipo = lambda id, deporte, jugadores: EquipoCompacto(tabla, id, deporte, jugadores)
+    for tipo, id, entidad in iterar_entidades(filepath, tabla.agregar, crear_equipo, SedeCompacta, al_error, leer_registros):
+        if tipo == 's':
+            sedes[id] = entidad
+    return tabla, sedes
+
+
+# Registros (rendimiento, edad, id) de cada aparición, en el orden de
+# calcular_ranking; de paso acumula las estadísticas en el orden de
+# acumular_estadisticas, que es el mismo
+def recorrer_apariciones(tabla, sedes, acumulador):
+    ids, edades, rendimientos = tabla.ids, tabla.edades, tabla.rendimientos
+    for sede in sedes.values():
+        for equipo in sede.equipos:
+            acumulador.agregar_equipo(equipo)
+            for indice in equipo.miembros:
+                acumulador.agregar_jugador(VistaJugador(tabla, indice))
+                yield rendimientos[indice], edades[indice], ids[indice]
+
+
+def clave_ranking(por_edad):
+    if por_edad:
+        return lambda registro: (registro[0], -registro[1])
+    return itemgetter(0)
+
+
+def entradas_por_bloque(memoria_mb):
+    if memoria_mb <= 0:
+        raise ValueError(f"El presupuesto de memoria debe ser positivo: {memoria_mb!r}")
+    return max(1, int(memoria_mb * 2**20) // BYTES_POR_ENTRADA)
+
+
+# Registros ordenados por key, igual que sorted(registros, key=key,
+# reverse=reverse), usando a lo sumo memoria_mb para ordenar. Si todo cabe en
+# un bloque no se escribe ningún archivo.
+def ordenar_externo(registros, key, reverse=False, memoria_mb=MEMORIA_MB, directorio=None):
+    tamano = entradas_por_bloque(memoria_mb)
+    registros = iter(registros)
+    with fase("sort"):
+        bloque = list(islice(registros, tamano))
+        siguiente = next(registros, None)
+        bloque.sort(key=key, reverse=reverse)
+    if siguiente is None:
+        contar("externo.corridas", 1)
+        yield from bloque
+        return
+
+    with tempfile.TemporaryDirectory(prefix="ada_ranking_", dir=directorio) as carpeta:
+        with fase("sort"):
+            corridas = [os.path.join(carpeta, "0.run")]
+            escribir_corrida(bloque, corridas[0], tamano)
+            del bloque
+            registros = chain([siguiente], registros)
+            while True:
+                bloque = list(islice(registros, tamano))
+                if not bloque:
+                    break
+                bloque.sort(key=key, reverse=reverse)
+                corridas.append(os.path.join(carpeta, f"{len(corridas)}.run"))
+                escribir_corrida(bloque, corridas[-1], tamano)
+                del bloque
+        contar("externo.corridas", len(corridas))
+
+        # Pasadas intermedias: cada grupo de corridas consecutivas se mezcla en
+        # una nueva, lo que conserva el orden de llegada entre empates
+        pasada = 0
+        while len(corridas) > FAN_IN:
+            pasada += 1
+            nuevas = []
+            for inicio in range(0, len(corridas), FAN_IN):
+                grupo = corridas[inicio:inicio + FAN_IN]
+                nuevas.append(os.path.join(carpeta, f"{pasada}.{len(nuevas)}.run"))
+                escribir_corrida(mezclar(grupo, key, reverse, tamano), nuevas[-1], tamano)
+                for ruta in grupo:
+                    os.remove(ruta)
+            corridas = nuevas
+        contar("externo.pasadas_intermedias", pasada)
+
+        yield from mezclar(corridas, key, reverse, tamano)
+
+
+# Mezcla de las corridas; el presupuesto se reparte entre sus lecturas
+def mezclar(corridas, key, reverse, tamano):
+    por_lectura = max(1, tamano // (len(corridas) + 1))
+    return heapq.merge(*(leer_corrida(ruta, por_lectura) for ruta in corridas), key=key, reverse=reverse)
+
+
+def escribir_corrida(registros, ruta, tamano):
+    registros = iter(registros)
+    with open(ruta, 'wb') as file:
+        while True:
+            valores = array('q', chain.from_iterable(islice(registros, tamano)))
+            if not valores:
+                return
+            valores.tofile(file)
+
+
+def leer_corrida(ruta, por_lectura):
+    with open(ruta, 'rb') as file:
+        while True:
+            valores = array('q')
+            try:
+                valores.fromfile(file, CAMPOS * por_lectura)
+            except EOFError:
+                # Quedaban menos registros; fromfile igual agregó los que había
+                pass
+            if not valores:
+                return
+            campos = iter(valores)
+            yield from zip(campos, campos, campos)
+
+
+# Ranking (rendimiento, edad, id) de todas las apariciones, en el orden de
+# ranking_jugadores(orden=orden) o, con por_edad, de counting_sort(por_edad=True)
+def ranking_externo(tabla, sedes, acumulador, orden="asc", por_edad=False, memoria_mb=MEMORIA_MB, directorio=None):
+    if orden not in ("asc", "desc"):
+        raise ValueError(f"Orden desconocido: {orden!r}, se esperaba 'asc' o 'desc'")
+    return ordenar_externo(recorrer_apariciones(tabla, sedes, acumulador), clave_ranking(por_edad),
+                           orden == "desc", memoria_mb, directorio)
+
+
+# Mismas líneas que Asociacion.lineas_sedes de la solución 2
+def lineas_sedes(tabla, sedes):
+    ids, rendimientos = tabla.ids, tabla.rendimientos
+    for sede in sedes.values():
+        yield f"{sede.nombre}, Rendimiento: {sede.rendimiento_promedio()}"
+        for equipo in sorted(sede.equipos, key=lambda e: (e.rendimiento_promedio(), -len(e.miembros)), reverse=True):
+            yield f"{equipo.deporte}, Rendimiento: {equipo.rendimiento_promedio()}"
+            miembros = sorted(equipo.miembros, key=rendimientos.__getitem__, reverse=True)
+            yield "{" + ", ".join(f"{{{ids[i]}, {tabla.nombre(i)}, {rendimientos[i]}}}" for i in miembros) + "}"
+
+
+def generar_reporte_externo(filepath, memoria_mb=MEMORIA_MB, al_error=reportar_error, usar_cache=False, directorio=None):
+    salida = io.StringIO()
+    escribir_reporte_externo(filepath, salida, memoria_mb, al_error, usar_cache, directorio)
+    return salida.getvalue()
+
+
+# Escribe en file el mismo texto que escribir_reporte de la solución 2
+def escribir_reporte_externo(filepath, file, memoria_mb=MEMORIA_MB, al_error=reportar_error, usar_cache=False,
+                             directorio=None):
+    with fase("parse"):
+        tabla, sedes = leer_compacto(filepath, al_error, usar_cache)
+
+    with fase("render"):
+        for posicion, linea in enumerate(lineas_sedes(tabla, sedes)):
+            if posicion:
+                file.write("\n\n")
+            file.write(linea)
+        file.write("\n\n")
+
+    acumulador = AcumuladorEstadisticas()
+    ranking = ranking_externo(tabla, sedes, acumulador, "asc", False, memoria_mb, directorio)
+    file.write("Ranking Jugadores:\n{")
+    escribir_unidos(file, (str(registro[2]) for registro in ranking))
+    file.write("}")
+    file.write("\n\n")
+    file.write(formatear_estadisticas(acumulador.resultado()))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera el reporte de la solución 2 ordenando el ranking fuera de memoria.")
+    parser.add_argument("archivo")
+    parser.add_argument("--memoria-mb", type=float, default=MEMORIA_MB, help="presupuesto de memoria para ordenar el ranking; no incluye la tabla compacta de jugadores, "
+                             "que se carga completa (unos 40 bytes por jugador más sus ids)")
+    parser.add_argument("--salida", help="archivo del reporte (por defecto la salida estándar)")
+    parser.add_argument("--temporales", help="carpeta para las corridas (por defecto la del sistema)")
+    parser.add_argument("--instantanea", action="store_true", help="usar y crear instantáneas binarias (.snap junto a cada entrada)")
+    parser.add_argument("--verificar", action="store_true",
+                        help="comparar con el reporte en memoria de la solución 2 (carga todo el archivo)")
+    opciones = parser.parse_args(argumentos)
+
+    usar_cache = opciones.instantanea
+    if opciones.verificar:
+        reporte = generar_reporte_externo(opciones.archivo, opciones.memoria_mb, usar_cache=usar_cache,
+                                          directorio=opciones.temporales)
+        escribir = lambda file: file.write(reporte)
+    else:
+        escribir = lambda file: escribir_reporte_externo(opciones.archivo, file, opciones.memoria_mb,
+                                                         usar_cache=usar_cache, directorio=opciones.temporales)
+
+    if opciones.salida:
+        with open(opciones.salida, 'w', encoding='utf-8') as file:
+            escribir(file)
+            file.write("\n")
+    else:
+        escribir(sys.stdout)
+        sys.stdout.write("\n")
+
+    if opciones.verificar:
+        coincide = reporte == cargar_solucion(2).generar_reporte(opciones.archivo, usar_cache=usar_cache)
+        print("Verificación: " + ("igual al reporte en memoria" if coincide else "DIFERENTE del reporte en memoria"),
+              file=sys.stderr)
+        return 0 if coincide else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import csv
+import json
+from itertools import islice
+
+#Escritura incremental de los reportes en cualquier objeto tipo archivo.
+#El texto de cada solución se arma en su propio módulo; aquí están las
+#piezas comunes: escribir una secuencia larga separada por comas en bloques
+#(sin construir la línea completa en memoria), el texto de las estadísticas
+#de cada solución (también lo usan ranking_externo.py y almacen_columnar.py)
+#y los formatos estructurados JSON lines y CSV para otras herramientas.
+#Los formatos estructurados reciben las secciones ya ordenadas como
+#(sede, [(equipo, jugadores), ...]), el ranking y el diccionario de
+#calcular_estadisticas, y escriben un registro por sede, equipo, jugador,
+#posición del ranking y estadística.
+
+TAMANO_BLOQUE = 4096
+COLUMNAS = ("tipo", "estadistica", "posicion", "sede", "equipo", "id", "nombre", "deporte", "edad", "rendimiento", "valor")
+
+
+# Equivale a file.write(separador.join(textos)) pero por bloques
+def escribir_unidos(file, textos, separador=", "):
+    textos = iter(textos)
+    bloque = list(islice(textos, TAMANO_BLOQUE))
+    if not bloque:
+        return
+    file.write(separador.join(bloque))
+    while True:
+        bloque = list(islice(textos, TAMANO_BLOQUE))
+        if not bloque:
+            return
+        file.write(separador)
+        file.write(separador.join(bloque))
+
+
+# Texto de las estadísticas de la solución 2, a partir del diccionario de
+# calcular_estadisticas (solo usa los atributos de cada entidad)
+def formatear_estadisticas(estadisticas):
+    equipo_mayor_rendimiento = estadisticas["equipo_mayor_rendimiento"]
+    equipo_menor_rendimiento = estadisticas["equipo_menor_rendimiento"]
+    jugador_mayor_rendimiento = estadisticas["jugador_mayor_rendimiento"]
+    jugador_menor_rendimiento = estadisticas["jugador_menor_rendimiento"]
+    jugador_mas_joven = estadisticas["jugador_mas_joven"]
+    jugador_mas_veterano = estadisticas["jugador_mas_veterano"]
+
+    return (
+        f"Equipo con mayor rendimiento: {{{equipo_mayor_rendimiento.deporte} {equipo_mayor_rendimiento.id} {equipo_mayor_rendimiento.rendimiento_promedio()}}}\n"
+        f"Equipo con menor rendimiento: {{{equipo_menor_rendimiento.deporte} {equipo_menor_rendimiento.id} {equipo_menor_rendimiento.rendimiento_promedio()}}}\n"
+        f"Jugador con mayor rendimiento: {{{jugador_mayor_rendimiento.id}, {jugador_mayor_rendimiento.nombre}, {jugador_mayor_rendimiento.rendimiento}}}\n"
+        f"Jugador con menor rendimiento: {{{jugador_menor_rendimiento.id}, {jugador_menor_rendimiento.nombre}, {jugador_menor_rendimiento.rendimiento}}}\n"
+        f"Jugador más joven: {{{jugador_mas_joven.id}, {jugador_mas_joven.nombre}, {jugador_mas_joven.edad}}}\n"
+        f"Jugador más veterano: {{{jugador_mas_veterano.id}, {jugador_mas_veterano.nombre}, {jugador_mas_veterano.edad}}}\n"
+        f"Promedio de edad de los jugadores: {estadisticas['promedio_edad']}\n"
+        f"Promedio de rendimiento de los jugadores: {estadisticas['promedio_rendimiento']}"
+    )
+
+
+# Texto de las estadísticas de la solución 1; nombre_sede es el de la última
+# sede del reporte, como en su salida original
+def formatear_estadisticas_listas(estadisticas, nombre_sede):
+    resultados = []
+    resultados.append(f"Equipo con mayor rendimiento: {estadisticas['equipo_mayor_rendimiento'].deporte} {nombre_sede}")
+    resultados.append(f"Equipo con menor rendimiento: {estadisticas['equipo_menor_rendimiento'].deporte} {nombre_sede}")
+    resultados.append(f"Jugador con mayor rendimiento: {{{estadisticas['jugador_mayor_rendimiento'].id} , {estadisticas['jugador_mayor_rendimiento'].nombre} , {estadisticas['jugador_mayor_rendimiento'].rendimiento}}} {estadisticas['jugador_mayor_rendimiento']}")
+    resultados.append(f"Jugador con menor rendimiento: {{{estadisticas['jugador_menor_rendimiento'].id} , {estadisticas['jugador_menor_rendimiento'].nombre} , {estadisticas['jugador_menor_rendimiento'].rendimiento}}}")
+    resultados.append(f"Jugador más joven: {{{estadisticas['jugador_mas_joven'].id} , {estadisticas['jugador_mas_joven'].nombre} , {estadisticas['jugador_mas_joven'].edad}}}")
+    resultados.append(f"Jugador más veterano: {{{estadisticas['jugador_mas_veterano'].id} , {estadisticas['jugador_mas_veterano'].nombre} , {estadisticas['jugador_mas_veterano'].edad}}}")
+    resultados.append(f"Promedio de edad de los jugadores: {estadisticas['promedio_edad']}")
+    resultados.append(f"Promedio de rendimiento de los jugadores: {estadisticas['promedio_rendimiento']}")
+    return "\n".join(resultados)
+
+
+class EscritorRegistros:
+    def __init__(self, file):
+        self.file = file
+
+    def escribir(self, registro):
+        raise NotImplementedError
+
+    def escribir_reporte(self, secciones, ranking, estadisticas):
+        for posicion_sede, (sede, equipos) in enumerate(secciones, start=1):
+            self.escribir({"tipo": "sede", "posicion": posicion_sede, "sede": sede.id, "nombre": sede.nombre,
+                           "rendimiento": sede.rendimiento_promedio()})
+            for posicion_equipo, (equipo, jugadores) in enumerate(equipos, start=1):
+                self.escribir({"tipo": "equipo", "posicion": posicion_equipo, "sede": sede.id, "equipo": equipo.id,
+                               "deporte": equipo.deporte, "rendimiento": equipo.rendimiento_promedio()})
+                for posicion, jugador in enumerate(jugadores, start=1):
+                    self.escribir(registro_jugador("jugador", posicion, jugador, sede=sede.id, equipo=equipo.id))
+
+        for posicion, jugador in enumerate(ranking, start=1):
+            self.escribir(registro_jugador("ranking", posicion, jugador))
+
+        # Los extremos llevan la entidad (equipo o jugador); los promedios, su valor
+        for clave, valor in estadisticas.items():
+            registro = {"tipo": "estadistica", "estadistica": clave}
+            if valor is None or isinstance(valor, (int, float)):
+                registro["valor"] = valor
+            elif hasattr(valor, "deporte"):
+                registro.update(equipo=valor.id, deporte=valor.deporte, rendimiento=valor.rendimiento_promedio())
+            else:
+                registro.update(registro_jugador("estadistica", None, valor))
+            self.escribir(registro)
+
+
+def registro_jugador(tipo, posicion, jugador, sede=None, equipo=None):
+    return {"tipo": tipo, "posicion": posicion, "sede": sede, "equipo": equipo, "id": jugador.id,
+            "nombre": jugador.nombre, "edad": jugador.edad, "rendimiento": jugador.rendimiento}
+
+
+# Un objeto JSON por línea, sin los campos vacíos
+class EscritorJSONL(EscritorRegistros):
+    def escribir(self, registro):
+        self.file.write(json.dumps({clave: valor for clave, valor in registro.items() if valor is not None},
+                                   ensure_ascii=False))
+        self.file.write("\n")
+
+
+# CSV con las mismas columnas para todos los registros; el archivo debe
+# abrirse con newline=''
+class EscritorCSV(EscritorRegistros):
+    def __init__(self, file):
+        super().__init__(file)
+        self.escritor = csv.DictWriter(file, COLUMNAS, restval="")
+        self.escritor.writeheader()
+
+    def escribir(self, registro):
+        self.escritor.writerow({clave: valor for clave, valor in registro.items() if valor is not None})
+
+
+ESCRITORES = {"jsonl": EscritorJSONL, "csv": EscritorCSV}
+FORMATOS = ("texto",) + tuple(ESCRITORES)
+
+
+def crear_escritor(formato, file):
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato desconocido: {formato!r}, opciones: {', '.join(FORMATOS)}")
+    return ESCRITORES[formato](file)
@@ -0,0 +1,533 @@
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+
+from distribuciones import PERCENTILES, DistribucionJugadores
+from estadisticas import ArbolEstadisticas
+from lector_datos import reportar_error
+from soluciones import cargar_solucion
+
+#Servicio de consultas sobre una Asociacion viva (solución 2).
+#El archivo se carga una sola vez y el servidor atiende a muchos clientes a
+#la vez por TCP o por un socket Unix. El protocolo es una línea JSON por
+#solicitud y una por respuesta:
+#
+#   {"id": 1, "op": "top", "k": 10}
+#   {"id": 1, "ok": true, "resultado": [{"id": 7, "nombre": "...", ...}, ...]}
+#
+#Las consultas se responden en el momento sobre las estructuras que ya se
+#mantienen al día con cada cambio: el índice de ranking para el top-k, los
+#totales de equipos y sedes para los promedios, los índices secundarios
+#(indices_secundarios.py) para deporte, edad, nombre y ubicación de cada
+#jugador, las cachés de cada equipo y sede para sus órdenes, y dos
+#estructuras propias del servidor para lo que
+#abarca todas las sedes: el orden de las sedes (listas ordenadas que se
+#corrigen con bisect) y las estadísticas y distribuciones (árboles de
+#acumuladores e histogramas por sede), que tras un cambio se actualizan solo
+#en las sedes afectadas en lugar de recalcularse sobre todas. Las mutaciones se encolan y una sola
+#tarea las aplica por lotes, en orden de llegada; la respuesta de una
+#mutación se envía cuando su lote ya se aplicó, así que toda consulta
+#posterior la ve. Un cliente puede enviar varias solicitudes sin esperar
+#las respuestas (se emparejan por "id").
+#
+#   python servidor.py input1.txt --puerto 8765
+#   python servidor.py input1.txt --unix /tmp/ada.sock
+
+PUERTO = 8765
+# Espera opcional para juntar más mutaciones en cada lote (0 = aplicar lo encolado)
+VENTANA_MS = 0
+LOTE_MAXIMO = 1000
+
+
+class ErrorSolicitud(Exception):
+    pass
+
+
+class ServidorAsociacion:
+    def __init__(self, filepath, usar_cache=False, ventana_ms=VENTANA_MS, lote_maximo=LOTE_MAXIMO):
+        self.modulo = cargar_solucion(2)
+        self.jugadores, self.equipos, sedes = self.modulo.leer_datos(filepath, reportar_error, usar_cache)
+        self.sedes = sedes
+        self.asociacion = self.modulo.Asociacion()
+        for sede in sedes.values():
+            self.asociacion.agregar_sede(sede)
+        # Se construyen al cargar para que la primera consulta no las pague
+        self.indice = self.asociacion.indice_ranking()
+        self.indices = self.asociacion.indices_secundarios()
+        self.orden_sedes = OrdenSedes(sedes.values())
+        self.arbol = ArbolEstadisticas(sede.acumular_estadisticas() for sede in sedes.values())
+        self.posiciones = {id(sede): posicion for posicion, sede in enumerate(sedes.values())}
+        # Árbol de distribuciones por sede; se arma con la primera consulta
+        self.arbol_distribuciones = None
+        self.modificadas = set()
+        self.estadisticas_actuales = None
+
+        self.ventana = ventana_ms / 1000
+        self.lote_maximo = lote_maximo
+        self.pendientes = None
+        self.aplicador = None
+        self.estadisticas = {"consultas": 0, "mutaciones": 0, "lotes": 0, "errores": 0, "conexiones": 0}
+
+        self.consultas = {
+            "ping": self.ping,
+            "top": self.top,
+            "posicion": self.posicion,
+            "sedes": self.ranking_sedes,
+            "equipos": self.ranking_equipos,
+            "equipo": self.equipo,
+            "sede": self.sede,
+            "estadisticas": self.calcular_estadisticas,
+            "distribucion": self.distribucion,
+            "ids": self.ids,
+            "deporte": self.deporte,
+            "edad": self.por_edad,
+            "nombre": self.buscar_nombre,
+            "ubicar": self.ubicar,
+            "info": self.info,
+        }
+        self.mutaciones = {
+            "agregar_jugador": self.agregar_jugador,
+            "remover_jugador": self.remover_jugador,
+            "rendimiento": self.cambiar_rendimiento,
+            "mover": self.mover_jugador,
+        }
+
+    # --- Consultas ---
+
+    def ping(self, solicitud):
+        return "pong"
+
+    # Top-k de jugadores; sin filtros sale del índice de ranking y solo con
+    # deporte del índice de ese deporte, en O(rango + k); con sede, de
+    # ranking_jugadores (en caché). Los índices desempatan por el recorrido de
+    # ranking_jugadores, así que los tres caminos dan los empates en el mismo orden.
+    def top(self, solicitud):
+        k = entero(solicitud, "k", 10)
+        orden = solicitud.get("orden", "desc")
+        deporte = solicitud.get("deporte")
+        sede = solicitud.get("sede")
+        por_edad = bool(solicitud.get("por_edad", False))
+        if deporte is None and sede is None:
+            jugadores = self.indice.primeros(k, orden, por_edad)
+        elif sede is None:
+            jugadores = self.indices.jugadores_de_deporte(deporte, k, orden, por_edad)
+        else:
+            self.buscar(self.sedes, sede, "sede")
+            jugadores = self.asociacion.ranking_jugadores(k, orden, deporte, sede, por_edad)
+        return [datos_jugador(jugador) for jugador in jugadores]
+
+    def posicion(self, solicitud):
+        jugador = self.buscar(self.jugadores, solicitud.get("jugador"), "jugador")
+        if id(jugador) not in self.indice.ubicaciones:
+            raise ErrorSolicitud(f"El jugador {jugador.id} no está en ningún equipo")
+        return self.indice.posicion(jugador, solicitud.get("orden", "desc"), bool(solicitud.get("por_edad", False)))
+
+    # Mismo orden que ordenar_sedes
+    def ranking_sedes(self, solicitud):
+        k = solicitud.get("k")
+        sedes = self.orden_sedes.primeros(None if k is None else entero(solicitud, "k"), solicitud.get("orden", "desc"))
+        return [datos_sede(sede) for sede in sedes]
+
+    def ranking_equipos(self, solicitud):
+        sede = self.buscar(self.sedes, solicitud.get("sede"), "sede")
+        k = solicitud.get("k")
+        equipos = sede.ordenar_equipos(None if k is None else entero(solicitud, "k"), solicitud.get("orden", "desc"))
+        return [datos_equipo(equipo) for equipo in equipos]
+
+    def equipo(self, solicitud):
+        return datos_equipo(self.buscar(self.equipos, solicitud.get("equipo"), "equipo"))
+
+    def sede(self, solicitud):
+        return datos_sede(self.buscar(self.sedes, solicitud.get("sede"), "sede"))
+
+    # Todas las estadísticas de calcular_estadisticas, o solo la de "campo"
+    def calcular_estadisticas(self, solicitud):
+        if self.estadisticas_actuales is None:
+            self.estadisticas_actuales = self.arbol.total().resultado()
+        estadisticas = self.estadisticas_actuales
+        campo = solicitud.get("campo")
+        if campo is None:
+            return {clave: datos_estadistica(valor) for clave, valor in estadisticas.items()}
+        if campo not in estadisticas:
+            raise ErrorSolicitud(f"Estadística desconocida: {campo!r}, opciones: {', '.join(estadisticas)}")
+        return datos_estadistica(estadisticas[campo])
+
+    # Percentiles de rendimiento y edad e histograma de rendimiento de un
+    # equipo, una sede (opcionalmente de un deporte), un deporte o todas las sedes
+    def distribucion(self, solicitud):
+        percentiles = solicitud.get("percentiles", list(PERCENTILES))
+        if not isinstance(percentiles, list) or not all(
+                isinstance(p, (int, float)) and not isinstance(p, bool) for p in percentiles):
+            raise ErrorSolicitud("El campo 'percentiles' debe ser una lista de números")
+        ancho = entero(solicitud, "ancho", 10)
+        deporte = solicitud.get("deporte")
+        if solicitud.get("equipo") is not None:
+            distribucion = self.buscar(self.equipos, solicitud.get("equipo"), "equipo").distribucion()
+        elif solicitud.get("sede") is not None:
+            distribucion = self.buscar(self.sedes, solicitud.get("sede"), "sede").distribucion(deporte)
+        elif deporte is not None:
+            distribucion = self.asociacion.distribucion(deporte)
+        else:
+            if self.arbol_distribuciones is None:
+                self.arbol_distribuciones = ArbolEstadisticas(
+                    (sede.distribucion() for sede in self.sedes.values()), DistribucionJugadores)
+            distribucion = self.arbol_distribuciones.total()
+        return dict(distribucion.resumen(percentiles), histograma=distribucion.rendimiento.histograma(ancho))
+
+    # Equipos del deporte, de los índices secundarios
+    def deporte(self, solicitud):
+        return [datos_equipo(equipo) for equipo in self.indices.equipos_de_deporte(solicitud.get("deporte"))]
+
+    # Jugadores con edad entre "minimo" y "maximo" (opcionales), de un deporte
+    # o de todos, de menor a mayor edad salvo con orden "desc"
+    def por_edad(self, solicitud):
+        minimo = None if solicitud.get("minimo") is None else entero(solicitud, "minimo")
+        maximo = None if solicitud.get("maximo") is None else entero(solicitud, "maximo")
+        k = None if solicitud.get("k") is None else entero(solicitud, "k")
+        jugadores = self.indices.jugadores_por_edad(minimo, maximo, solicitud.get("deporte"), k, solicitud.get("orden", "asc"))
+        return [datos_jugador(jugador) for jugador in jugadores]
+
+    # Jugadores cuyo nombre empieza con "prefijo", en orden alfabético
+    def buscar_nombre(self, solicitud):
+        prefijo = solicitud.get("prefijo", "")
+        if not isinstance(prefijo, str):
+            raise ErrorSolicitud("El campo 'prefijo' debe ser un texto")
+        k = None if solicitud.get("k") is None else entero(solicitud, "k")
+        return {"total": self.indices.contar_nombre(prefijo),
+                "jugadores": [datos_jugador(jugador) for jugador in self.indices.buscar_nombre(prefijo, k)]}
+
+    # Sedes y equipos donde juega el jugador
+    def ubicar(self, solicitud):
+        jugador = self.buscar(self.jugadores, solicitud.get("jugador"), "jugador")
+        return [{"sede": sede.id, "equipo": equipo.id} for sede, equipo in self.indices.ubicar(jugador.id)]
+
+    def ids(self, solicitud):
+        return {"jugadores": list(self.jugadores), "equipos": list(self.equipos), "sedes": list(self.sedes)}
+
+    def info(self, solicitud):
+        return dict(self.estadisticas, jugadores=len(self.jugadores), equipos=len(self.equipos),
+                    sedes=len(self.sedes), cache=self.asociacion.contadores_cache())
+
+    # --- Mutaciones (solo las llama aplicar_lote) ---
+
+    def agregar_jugador(self, solicitud):
+        id = entero(solicitud, "id")
+        if id in self.jugadores:
+            raise ErrorSolicitud(f"El jugador {id} ya existe")
+        equipo = self.buscar(self.equipos, solicitud.get("equipo"), "equipo")
+        nombre = solicitud.get("nombre")
+        if not isinstance(nombre, str) or not nombre:
+            raise ErrorSolicitud("Falta el nombre del jugador")
+        jugador = self.modulo.Jugador(id, nombre, entero(solicitud, "edad"), entero(solicitud, "rendimiento"))
+        self.jugadores[id] = jugador
+        equipo.agregar_jugador(jugador)
+        self.marcar([equipo])
+        return datos_jugador(jugador)
+
+    # Quita al jugador de todos sus equipos (o solo del indicado)
+    def remover_jugador(self, solicitud):
+        jugador = self.buscar(self.jugadores, solicitud.get("jugador"), "jugador")
+        if solicitud.get("equipo") is not None:
+            equipos = [self.equipo_del_jugador(jugador, solicitud.get("equipo"))]
+        else:
+            equipos = list(jugador.equipos)
+        for equipo in equipos:
+            equipo.remover_jugador(jugador)
+        self.marcar(equipos)
+        if not jugador.equipos:
+            del self.jugadores[jugador.id]
+        return {"jugador": jugador.id, "equipos": [equipo.id for equipo in equipos]}
+
+    def cambiar_rendimiento(self, solicitud):
+        jugador = self.buscar(self.jugadores, solicitud.get("jugador"), "jugador")
+        rendimiento = entero(solicitud, "rendimiento")
+        if jugador.equipos:
+            # Corrige los totales de todos sus equipos
+            jugador.equipos[0].actualizar_rendimiento(jugador, rendimiento)
+            self.marcar(jugador.equipos)
+        else:
+            jugador.rendimiento = rendimiento
+        return datos_jugador(jugador)
+
+    # Mueve al jugador de "desde" (opcional si está en un solo equipo) a "hacia"
+    def mover_jugador(self, solicitud):
+        jugador = self.buscar(self.jugadores, solicitud.get("jugador"), "jugador")
+        hacia = self.buscar(self.equipos, solicitud.get("hacia"), "equipo")
+        if solicitud.get("desde") is not None:
+            desde = self.equipo_del_jugador(jugador, solicitud.get("desde"))
+        elif len(jugador.equipos) == 1:
+            desde = jugador.equipos[0]
+        else:
+            raise ErrorSolicitud(f"El jugador {jugador.id} está en {len(jugador.equipos)} equipos, falta 'desde'")
+        if desde is hacia:
+            return {"jugador": jugador.id, "desde": desde.id, "hacia": hacia.id}
+        if jugador.id in hacia.jugadores:
+            raise ErrorSolicitud(f"El jugador {jugador.id} ya está en el equipo {hacia.id}")
+        desde.remover_jugador(jugador)
+        hacia.agregar_jugador(jugador)
+        self.marcar([desde, hacia])
+        return {"jugador": jugador.id, "desde": desde.id, "hacia": hacia.id}
+
+    # Anota las sedes de los equipos cambiados para actualizar_vistas
+    def marcar(self, equipos):
+        for equipo in equipos:
+            self.modificadas.update(equipo.sedes)
+
+    # Corrige el orden de las sedes y los árboles de estadísticas y
+    # distribuciones solo en las sedes que cambiaron; se llama una vez por lote
+    def actualizar_vistas(self):
+        for sede in self.modificadas:
+            posicion = self.posiciones.get(id(sede))
+            if posicion is not None:
+                self.orden_sedes.actualizar(posicion)
+                self.arbol.actualizar(posicion, sede.acumular_estadisticas())
+                if self.arbol_distribuciones is not None:
+                    self.arbol_distribuciones.actualizar(posicion, sede.distribucion())
+        if self.modificadas:
+            self.estadisticas_actuales = None
+        self.modificadas.clear()
+
+    def buscar(self, entidades, id, tipo):
+        if id not in entidades:
+            raise ErrorSolicitud(f"No existe {tipo} con id {id!r}")
+        return entidades[id]
+
+    def equipo_del_jugador(self, jugador, equipo_id):
+        equipo = self.buscar(self.equipos, equipo_id, "equipo")
+        if equipo.jugadores.get(jugador.id) is not jugador:
+            raise ErrorSolicitud(f"El jugador {jugador.id} no pertenece al equipo {equipo.id}")
+        return equipo
+
+    # --- Lotes de mutaciones ---
+
+    async def iniciar(self):
+        self.pendientes = asyncio.Queue()
+        self.aplicador = asyncio.create_task(self.aplicar_mutaciones())
+
+    async def detener(self):
+        if self.aplicador is not None:
+            self.aplicador.cancel()
+            try:
+                await self.aplicador
+            except asyncio.CancelledError:
+                pass
+
+    async def mutar(self, solicitud):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.pendientes.put((solicitud, futuro))
+        return await futuro
+
+    # Aplica de una vez todas las mutaciones encoladas (hasta lote_maximo). El
+    # lote corre sin ceder el control, así que ninguna consulta ve un lote a
+    # medio aplicar.
+    async def aplicar_mutaciones(self):
+        while True:
+            lote = [await self.pendientes.get()]
+            if self.ventana:
+                await asyncio.sleep(self.ventana)
+            while len(lote) < self.lote_maximo and not self.pendientes.empty():
+                lote.append(self.pendientes.get_nowait())
+            self.aplicar_lote(lote)
+
+    def aplicar_lote(self, lote):
+        self.estadisticas["lotes"] += 1
+        for solicitud, futuro in lote:
+            if futuro.cancelled():
+                continue
+            try:
+                futuro.set_result(self.mutaciones[solicitud["op"]](solicitud))
+            except Exception as excepcion:
+                futuro.set_exception(excepcion)
+        self.actualizar_vistas()
+
+    # --- Conexiones ---
+
+    async def atender(self, reader, writer):
+        self.estadisticas["conexiones"] += 1
+        tareas = set()
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                solicitud, respuesta = self.responder(linea)
+                if respuesta is None:
+                    # Mutación: responde cuando su lote se aplique, sin frenar
+                    # las solicitudes siguientes de la misma conexión
+                    tarea = asyncio.create_task(self.responder_mutacion(solicitud, writer))
+                    tareas.add(tarea)
+                    tarea.add_done_callback(tareas.discard)
+                    continue
+                writer.write(respuesta)
+                if writer.transport.get_write_buffer_size() > 2**16:
+                    await writer.drain()
+            if tareas:
+                await asyncio.gather(*tareas, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # (solicitud, respuesta codificada de una consulta); la respuesta es None
+    # si la solicitud es una mutación, que se responde con responder_mutacion
+    def responder(self, linea):
+        try:
+            solicitud = leer_solicitud(linea)
+        except ErrorSolicitud as excepcion:
+            return None, self.respuesta_error(None, excepcion)
+        op = solicitud.get("op")
+        if op in self.mutaciones:
+            return solicitud, None
+        if op not in self.consultas:
+            return solicitud, self.respuesta_error(solicitud.get("id"), ErrorSolicitud(f"Operación desconocida: {op!r}"))
+        self.estadisticas["consultas"] += 1
+        try:
+            return solicitud, codificar({"id": solicitud.get("id"), "ok": True, "resultado": self.consultas[op](solicitud)})
+        except Exception as excepcion:
+            return solicitud, self.respuesta_error(solicitud.get("id"), excepcion)
+
+    async def responder_mutacion(self, solicitud, writer):
+        self.estadisticas["mutaciones"] += 1
+        try:
+            respuesta = codificar({"id": solicitud.get("id"), "ok": True, "resultado": await self.mutar(solicitud)})
+        except Exception as excepcion:
+            respuesta = self.respuesta_error(solicitud.get("id"), excepcion)
+        if not writer.is_closing():
+            writer.write(respuesta)
+
+    def respuesta_error(self, id, excepcion):
+        self.estadisticas["errores"] += 1
+        return codificar({"id": id, "ok": False, "error": str(excepcion)})
+
+
+# Sedes en el orden de ordenar_sedes, "desc" y "asc", como listas ordenadas
+# de claves (valor, valor, posición de carga); la posición reproduce el
+# desempate estable. Cambiar una sede cuesta O(log n) más el corrimiento de
+# la lista, en lugar de volver a ordenar todas.
+class OrdenSedes:
+    def __init__(self, sedes):
+        self.sedes = list(sedes)
+        self.claves = [self.clave(posicion) for posicion in range(len(self.sedes))]
+        self.ordenes = {
+            "desc": sorted(clave[0] for clave in self.claves),
+            "asc": sorted(clave[1] for clave in self.claves),
+        }
+
+    def clave(self, posicion):
+        sede = self.sedes[posicion]
+        rendimiento = sede.rendimiento_promedio()
+        cantidad = sede.cantidad_jugadores
+        return (-rendimiento, cantidad, posicion), (rendimiento, -cantidad, posicion)
+
+    def actualizar(self, posicion):
+        anterior = self.claves[posicion]
+        nueva = self.claves[posicion] = self.clave(posicion)
+        if nueva == anterior:
+            return
+        for orden, vieja, clave in (("desc", anterior[0], nueva[0]), ("asc", anterior[1], nueva[1])):
+            lista = self.ordenes[orden]
+            del lista[bisect.bisect_left(lista, vieja)]
+            bisect.insort(lista, clave)
+
+    def primeros(self, k=None, orden="desc"):
+        if orden not in self.ordenes:
+            raise ErrorSolicitud(f"Orden desconocido: {orden!r}, se esperaba 'asc' o 'desc'")
+        claves = self.ordenes[orden] if k is None else self.ordenes[orden][:max(k, 0)]
+        return [self.sedes[clave[2]] for clave in claves]
+
+
+def leer_solicitud(linea):
+    try:
+        solicitud = json.loads(linea)
+    except ValueError as excepcion:
+        raise ErrorSolicitud(f"JSON inválido: {excepcion}")
+    if not isinstance(solicitud, dict):
+        raise ErrorSolicitud("La solicitud debe ser un objeto JSON")
+    return solicitud
+
+
+def codificar(respuesta):
+    return json.dumps(respuesta, ensure_ascii=False).encode() + b"\n"
+
+
+def entero(solicitud, campo, defecto=None):
+    valor = solicitud.get(campo, defecto)
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        raise ErrorSolicitud(f"El campo {campo!r} debe ser un entero")
+    return valor
+
+
+def datos_jugador(jugador):
+    return {"id": jugador.id, "nombre": jugador.nombre, "edad": jugador.edad, "rendimiento": jugador.rendimiento}
+
+
+def datos_equipo(equipo):
+    return {"id": equipo.id, "deporte": equipo.deporte, "rendimiento": equipo.rendimiento_promedio(),
+            "jugadores": len(equipo.jugadores)}
+
+
+def datos_sede(sede):
+    return {"id": sede.id, "nombre": sede.nombre, "rendimiento": sede.rendimiento_promedio(),
+            "jugadores": sede.cantidad_jugadores}
+
+
+def datos_estadistica(valor):
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    if hasattr(valor, "deporte"):
+        return datos_equipo(valor)
+    return datos_jugador(valor)
+
+
+async def servir(servidor, host="127.0.0.1", puerto=PUERTO, unix=None, listo=None):
+    await servidor.iniciar()
+    if unix is not None:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        red = await asyncio.start_unix_server(servidor.atender, path=unix)
+    else:
+        red = await asyncio.start_server(servidor.atender, host, puerto)
+    if listo is not None:
+        listo(red)
+    try:
+        async with red:
+            await red.serve_forever()
+    finally:
+        await servidor.detener()
+        if unix is not None and os.path.exists(unix):
+            os.unlink(unix)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Atiende consultas y cambios sobre una asociación cargada en memoria.")
+    parser.add_argument("archivo", help="archivo de entrada")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--unix", help="ruta de un socket Unix (en lugar de TCP)")
+    parser.add_argument("--ventana-ms", type=float, default=VENTANA_MS, help="espera para juntar mutaciones en un lote")
+    parser.add_argument("--lote-maximo", type=int, default=LOTE_MAXIMO)
+    parser.add_argument("--instantanea", action="store_true", help="usar y crear instantáneas binarias (.snap junto a cada entrada)")
+    opciones = parser.parse_args(argumentos)
+
+    inicio = time.perf_counter()
+    servidor = ServidorAsociacion(opciones.archivo, opciones.instantanea, opciones.ventana_ms, opciones.lote_maximo)
+    carga = time.perf_counter() - inicio
+
+    def listo(red):
+        direcciones = [str(socket.getsockname()) for socket in red.sockets]
+        print(f"{len(servidor.jugadores)} jugadores cargados en {carga:.3f} s; escuchando en {', '.join(direcciones)}",
+              file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(servir(servidor, opciones.host, opciones.puerto, opciones.unix, listo))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import importlib.util
+import os
+import sys
+
+#Carga de los módulos de las dos soluciones desde otros scripts.
+#Los nombres de archivo tienen caracteres que no permiten un import normal
+#("&", tildes), así que se cargan por ruta y se registran en sys.modules
+#como solucion_1 y solucion_2.
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+ARCHIVOS = {
+    1: "Solución_1_Listas&OrdenamientoPersonalizado.py",
+    2: "Solución_2_Diccionarios&heapq.py",
+}
+
+
+def cargar_solucion(numero):
+    if numero not in ARCHIVOS:
+        raise ValueError(f"Solución desconocida: {numero!r}, se esperaba 1 o 2")
+    nombre = f"solucion_{numero}"
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+
+    if DIRECTORIO not in sys.path:
+        sys.path.insert(0, DIRECTORIO)
+    spec = importlib.util.spec_from_file_location(nombre, os.path.join(DIRECTORIO, ARCHIVOS[numero]))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    try:
+        spec.loader.exec_module(modulo)
+    except BaseException:
+        del sys.modules[nombre]
+        raise
+    return modulo